@@ -0,0 +1,61 @@
+"""asyncio front end for the query validators.
+
+`AsyncQueryValidator` runs the calls of a synchronous `QueryValidator` on a
+bounded thread pool, so an asyncio driver can keep LLM requests and
+validations in flight at the same time. With `DuckDBQueryExecutor`, give
+the worker pool as many workers as `max_concurrency` so that every
+in-flight validation runs in its own worker process.
+"""
+
+import asyncio
+import functools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from query_generator.database_connection.query_validator_abc import (
+  QueryValidator,
+)
+from query_generator.utils.definitions import ValidationLevel
+
+T = TypeVar("T")
+
+
+class AsyncQueryValidator:
+  """Awaitable version of a `QueryValidator`.
+
+  At most `max_concurrency` calls run at the same time; the rest wait
+  without blocking the event loop. The wrapped validator must be thread
+  safe, like the DuckDB worker pool.
+  """
+
+  def __init__(self, validator: QueryValidator, max_concurrency: int = 1):
+    self.validator = validator
+    self.max_concurrency = max_concurrency
+    self._executor = ThreadPoolExecutor(
+      max_workers=max_concurrency, thread_name_prefix="query-validator"
+    )
+
+  async def _run(self, function: Callable[..., T], *args: object) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+      self._executor, functools.partial(function, *args)
+    )
+
+  async def is_query_valid(
+    self, query: str, level: ValidationLevel = ValidationLevel.EXECUTE
+  ) -> tuple[bool, Exception | None]:
+    return await self._run(self.validator.is_query_valid, query, level)
+
+  async def get_query_output_size(self, query: str) -> tuple[int | None, bool]:
+    return await self._run(self.validator.get_query_output_size, query)
+
+  async def get_synthetic_query_cardinality(self, query: str) -> int:
+    return await self._run(
+      self.validator.get_synthetic_query_cardinality, query
+    )
+
+  def close(self) -> None:
+    """Wait for the running calls and close the wrapped validator."""
+    self._executor.shutdown(wait=True)
+    self.validator.close()
@@ -0,0 +1,197 @@
+"""Concurrent COUNT(*) evaluation on one DuckDB database instance.
+
+The synthetic stage runs one cardinality query per generated query. DuckDB
+serves many cursors of the same connection concurrently, so
+`CardinalityCursorPool` keeps `cursors` of them and a single
+`DeadlineWatchdog` thread interrupts the ones that run past the timeout,
+instead of starting a `threading.Timer` per query.
+
+Parameterized queries are executed through prepared statements once their
+template repeats, so DuckDB parses, binds and plans the template once.
+Templates seen only once are executed as plain SQL, which avoids paying an
+extra PREPARE for the (common) queries whose template is unique.
+"""
+
+import contextlib
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import duckdb
+
+from query_generator.utils.definitions import ParameterizedQuery
+
+logger = logging.getLogger(__name__)
+
+# Prepared statements kept per cursor, least recently used are deallocated.
+MAX_PREPARED_STATEMENTS = 256
+# Templates remembered to detect the ones that repeat.
+MAX_SEEN_TEMPLATES = 4096
+
+
+class DeadlineWatchdog:
+  """One thread that interrupts cursors whose deadline has passed."""
+
+  def __init__(self) -> None:
+    self._deadlines: list[tuple[float, int, duckdb.DuckDBPyConnection]] = []
+    # Running queries, mapped to whether they were interrupted.
+    self._timed_out: dict[int, bool] = {}
+    self._tokens = itertools.count()
+    self._condition = threading.Condition()
+    self._closed = False
+    self._thread = threading.Thread(
+      target=self._run, name="duckdb-deadline-watchdog", daemon=True
+    )
+    self._thread.start()
+
+  def watch(self, cursor: duckdb.DuckDBPyConnection, seconds: float) -> int:
+    """Interrupt `cursor` in `seconds` unless `release` is called first."""
+    token = next(self._tokens)
+    with self._condition:
+      self._timed_out[token] = False
+      heapq.heappush(
+        self._deadlines, (time.monotonic() + seconds, token, cursor)
+      )
+      self._condition.notify()
+    return token
+
+  def release(self, token: int) -> bool:
+    """Stop watching a query. Returns whether it was interrupted."""
+    with self._condition:
+      return self._timed_out.pop(token)
+
+  def _run(self) -> None:
+    with self._condition:
+      while not self._closed:
+        # Deadlines of released queries are dropped lazily.
+        while self._deadlines and self._deadlines[0][1] not in self._timed_out:
+          heapq.heappop(self._deadlines)
+        if not self._deadlines:
+          self._condition.wait()
+          continue
+        deadline, token, cursor = self._deadlines[0]
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+          self._condition.wait(remaining)
+          continue
+        heapq.heappop(self._deadlines)
+        self._timed_out[token] = True
+        with contextlib.suppress(Exception):
+          cursor.interrupt()
+
+  def close(self) -> None:
+    with self._condition:
+      self._closed = True
+      self._condition.notify()
+    self._thread.join()
+
+
+class CardinalityCursorPool:
+  """Run COUNT(*) queries on `cursors` cursors of a shared connection.
+
+  `count` is thread safe: up to `cursors` calls run at the same time and
+  the rest wait for a free cursor. DuckDB's `threads` setting of the
+  connection is shared by all the running queries.
+  """
+
+  def __init__(
+    self,
+    con: duckdb.DuckDBPyConnection,
+    timeout_seconds: float,
+    cursors: int = 1,
+  ) -> None:
+    self.timeout_seconds = timeout_seconds
+    self._cursors: queue.Queue[duckdb.DuckDBPyConnection] = queue.Queue()
+    # Prepared statement name of each template, per cursor.
+    self._prepared: dict[int, OrderedDict[str, str]] = {}
+    for _ in range(cursors):
+      cursor = con.cursor()
+      self._prepared[id(cursor)] = OrderedDict()
+      self._cursors.put(cursor)
+    self._seen_templates: OrderedDict[str, None] = OrderedDict()
+    self._statement_names = itertools.count()
+    self._lock = threading.Lock()
+    self._watchdog = DeadlineWatchdog()
+
+  def _count_on(self, cursor: duckdb.DuckDBPyConnection, query: str) -> int:
+    token = self._watchdog.watch(cursor, self.timeout_seconds)
+    try:
+      rows = cursor.execute(query).fetchall()
+    except Exception as exc:
+      logger.debug("Cardinality query failed: %s | query: %s", exc, query)
+      rows = []
+    finally:
+      timed_out = self._watchdog.release(token)
+    if timed_out or not rows:
+      return -1
+    return int(rows[0][0])
+
+  def count(self, query: str) -> int:
+    """Return the scalar result of `query`, or -1 on error or timeout."""
+    cursor = self._cursors.get()
+    try:
+      return self._count_on(cursor, query)
+    finally:
+      self._cursors.put(cursor)
+
+  def _is_repeated(self, template: str) -> bool:
+    with self._lock:
+      repeated = template in self._seen_templates
+      self._seen_templates[template] = None
+      self._seen_templates.move_to_end(template)
+      if len(self._seen_templates) > MAX_SEEN_TEMPLATES:
+        self._seen_templates.popitem(last=False)
+    return repeated
+
+  def _prepare(
+    self, cursor: duckdb.DuckDBPyConnection, template: str
+  ) -> str | None:
+    """Name of the prepared statement of `template` on `cursor`."""
+    prepared = self._prepared[id(cursor)]
+    name = prepared.get(template)
+    if name is not None:
+      prepared.move_to_end(template)
+      return name
+    name = f"synthetic_template_{next(self._statement_names)}"
+    try:
+      cursor.execute(f"PREPARE {name} AS {template}")
+    except Exception as exc:
+      logger.debug("Failed to prepare template: %s", exc)
+      return None
+    prepared[template] = name
+    if len(prepared) > MAX_PREPARED_STATEMENTS:
+      _, evicted = prepared.popitem(last=False)
+      with contextlib.suppress(Exception):
+        cursor.execute(f"DEALLOCATE {evicted}")
+    return name
+
+  def count_parameterized(
+    self, query: str, parameterized: ParameterizedQuery
+  ) -> int:
+    """Like `count`, through a prepared statement if the template repeats.
+
+    `query` is the rendered form of `parameterized`; it is executed directly
+    the first time a template is seen.
+    """
+    if not parameterized.literals or not self._is_repeated(
+      parameterized.template
+    ):
+      return self.count(query)
+    cursor = self._cursors.get()
+    try:
+      name = self._prepare(cursor, parameterized.template)
+      if name is not None:
+        query = f"EXECUTE {name}({', '.join(parameterized.literals)})"
+      return self._count_on(cursor, query)
+    finally:
+      self._cursors.put(cursor)
+
+  def close(self) -> None:
+    self._watchdog.close()
+    while not self._cursors.empty():
+      with contextlib.suppress(Exception):
+        self._cursors.get_nowait().close()
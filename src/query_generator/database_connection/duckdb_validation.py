@@ -1,44 +1,357 @@
 import contextlib
+import json
 import logging
 import multiprocessing
+import os
 import threading
+import time
+from collections import deque
+from collections.abc import Iterator
 from dataclasses import dataclass
-from multiprocessing import Queue
+from enum import StrEnum
+from multiprocessing.connection import Connection
+from pathlib import Path
 
 import duckdb
+import pyarrow as pa
 
+from query_generator.database_connection.duckdb_cardinality import (
+  CardinalityCursorPool,
+)
 from query_generator.database_connection.query_validator_abc import (
   QueryValidator,
 )
-from query_generator.utils.exceptions import DuckDBTimeoutError
+from query_generator.utils.definitions import (
+  ParameterizedQuery,
+  ValidationLevel,
+)
+from query_generator.utils.exceptions import (
+  DuckDBTimeoutError,
+  InvalidQueryError,
+  WorkerCrashedError,
+)
 
 logger = logging.getLogger(__name__)
 
 _MP_CTX = multiprocessing.get_context("spawn")
 
+# Message sent by a DuckDB worker once its connection is ready.
+DUCKDB_WORKER_READY = "READY"
+
+# DuckDB compresses tables on disk but not in memory, so an in-memory copy
+# takes a few times the size of the database file.
+IN_MEMORY_EXPANSION = 3
+# Share of a worker's memory limit the in-memory copy may take; the rest is
+# left for query execution.
+IN_MEMORY_BUDGET_FRACTION = 0.5
+# Statements that cannot modify the database.
+READ_ONLY_STATEMENTS = (
+  duckdb.StatementType.SELECT,
+  duckdb.StatementType.EXPLAIN,
+)
+
+
+# Rows per Arrow record batch fetched from a query result.
+ARROW_BATCH_ROWS = 1024
+
+
+class ResultFormat(StrEnum):
+  """What a worker sends back for a successful query.
+
+  - count: only the number of rows, up to the output limit.
+  - arrow: the rows themselves, as an Arrow IPC stream.
+  - profile: the rows as strings and the JSON profile of the query, for
+      workers started with `profiling`.
+  - timings: the elapsed seconds of `timed_runs` runs of the query after
+      `warmup_runs` untimed runs, all with profiling off. Every row is read
+      and dropped.
+  - prewarm: nothing; the tables of the query that the worker has not
+      scanned yet are read into its buffer pool, each scan under the
+      timeout, with profiling off.
+  """
+
+  COUNT = "count"
+  ARROW = "arrow"
+  PROFILE = "profile"
+  TIMINGS = "timings"
+  PREWARM = "prewarm"
+
 
 @dataclass
 class QueryExecution:
-  result: list[tuple] | None
+  row_count: int | None
   exception: Exception | None
   timed_out: bool
+  arrow_ipc: bytes | None = None
+  rows: list[str] | None = None
+  profile: str = ""
+  elapsed_seconds: float | None = None
+  timings: list[float] | None = None
+  # The tables were to be prewarmed first, but the prewarm failed.
+  prewarm_failed: bool = False
+
+  def to_arrow(self) -> pa.Table | None:
+    """Rows of an execution requested with `ResultFormat.ARROW`."""
+    if self.arrow_ipc is None:
+      return None
+    return pa.ipc.open_stream(self.arrow_ipc).read_all()
 
 
 @dataclass
 class QueryWorkerInput:
   database_path: str
-  memory_gb: int
+  memory_gb: float
   timeout_seconds: float
   limit_output_size: int
+  in_memory: bool = False
+  parquet: bool = False
+  profiling: bool = False
+  profiling_metrics: tuple[str, ...] | None = None
+  threads: int | None = None
+  warmup_runs: int = 0
+  timed_runs: int = 0
+  prewarm_tables: bool = False
+
+
+@dataclass
+class WorkerPoolSettings:
+  """How the validation worker pool is laid out.
+
+  - workers: maximum number of worker processes.
+  - in_memory: load the database into the memory of each worker.
+  - cardinality_cursors: COUNT(*) queries of the synthetic stage that run
+      at the same time on the shared connection.
+  - duckdb_threads: DuckDB `threads` setting of the shared connection,
+      split among the running cardinality queries. None keeps the default.
+  """
+
+  workers: int = 1
+  in_memory: bool = False
+  cardinality_cursors: int = 1
+  duckdb_threads: int | None = None
+
+
+def is_parquet_database(database_path: str) -> bool:
+  """Whether the database is a `table_name/data.parquet` directory."""
+  return Path(database_path).is_dir()
+
+
+def _database_size(database_path: str) -> int:
+  if not is_parquet_database(database_path):
+    return os.path.getsize(database_path)
+  return sum(p.stat().st_size for p in Path(database_path).rglob("*.parquet"))
+
+
+def register_parquet_tables(
+  conn: duckdb.DuckDBPyConnection, database_path: str, *, materialize: bool
+) -> None:
+  """Expose each `table_name/*.parquet` directory as a view named after it.
+
+  Scans through the views read only the columns and row groups a query
+  needs. With `materialize`, tables are loaded into memory instead.
+  """
+  kind = "TABLE" if materialize else "VIEW"
+  for table_dir in sorted(Path(database_path).iterdir()):
+    if not table_dir.is_dir():
+      continue
+    files = (table_dir / "*.parquet").as_posix()
+    conn.execute(
+      f'CREATE {kind} "{table_dir.name}" AS '
+      f"SELECT * FROM read_parquet('{files}');"
+    )
+
+
+def connect_read_only(database_path: str) -> duckdb.DuckDBPyConnection:
+  """Connect to a DuckDB file read-only, or to views over a parquet folder."""
+  if not is_parquet_database(database_path):
+    return duckdb.connect(database=database_path, read_only=True)
+  conn = duckdb.connect(database=":memory:")
+  register_parquet_tables(conn, database_path, materialize=False)
+  return conn
+
+
+def fits_in_memory(database_path: str, memory_gb: float) -> bool:
+  """Whether an in-memory copy of the database fits the worker budget."""
+  estimated_bytes = _database_size(database_path) * IN_MEMORY_EXPANSION
+  budget_bytes = memory_gb * 1024**3 * IN_MEMORY_BUDGET_FRACTION
+  return estimated_bytes <= budget_bytes
+
+
+def _custom_profiling_settings(metrics: tuple[str, ...]) -> str:
+  settings = json.dumps(dict.fromkeys(metrics, "true"))
+  return f"SET custom_profiling_settings = '{settings}';"
+
+
+def check_profiling_metrics(metrics: tuple[str, ...]) -> None:
+  """Raise ValueError if DuckDB does not know one of the metrics.
+
+  Workers would otherwise fail to start.
+  """
+  conn = duckdb.connect(database=":memory:")
+  try:
+    conn.execute("PRAGMA enable_profiling = 'no_output';")
+    conn.execute(_custom_profiling_settings(metrics))
+  except duckdb.Error as e:
+    msg = f"Invalid DuckDB profiling metrics {list(metrics)}: {e}"
+    raise ValueError(msg) from e
+  finally:
+    conn.close()
+
+
+def _connect_worker(params: QueryWorkerInput) -> duckdb.DuckDBPyConnection:
+  """Open the connection kept by a worker process.
+
+  By default the database file is opened read-only. In in-memory mode the
+  worker copies every table and view into its own in-memory database once,
+  so later queries never touch the disk. A parquet folder is exposed as
+  views over its files, or loaded as tables in in-memory mode.
+  """
+  if params.in_memory or params.parquet:
+    conn = duckdb.connect(database=":memory:")
+  else:
+    conn = duckdb.connect(database=params.database_path, read_only=True)
+  conn.execute(f"SET memory_limit = '{params.memory_gb}GB';")
+  if params.threads is not None:
+    conn.execute(f"SET threads = {params.threads};")
+  conn.execute("SET enable_progress_bar = false;")
+  conn.execute("SET enable_progress_bar_print = false;")
+  if params.profiling:
+    # Profiles are kept in memory and read with get_profiling_information.
+    conn.execute("PRAGMA enable_profiling = 'no_output';")
+    if params.profiling_metrics is None:
+      conn.execute("PRAGMA profiling_mode = 'detailed';")
+    else:
+      conn.execute(_custom_profiling_settings(params.profiling_metrics))
+  if params.parquet:
+    register_parquet_tables(
+      conn, params.database_path, materialize=params.in_memory
+    )
+  elif params.in_memory:
+    conn.execute(f"ATTACH '{params.database_path}' AS source_db (READ_ONLY);")
+    conn.execute("COPY FROM DATABASE source_db TO memory;")
+    conn.execute("DETACH source_db;")
+  return conn
+
+
+def _explained_statement(explain: str) -> tuple[bool, str]:
+  """Whether an EXPLAIN statement runs the statement it explains, and it.
+
+  `EXPLAIN ANALYZE` and `EXPLAIN (ANALYZE, ...)` execute the statement.
+  """
+  tokens = duckdb.tokenize(explain)
+  offsets = [offset for offset, _ in tokens] + [len(explain)]
+  words = [
+    explain[start:end].strip().upper()
+    for start, end in zip(offsets, offsets[1:], strict=False)
+  ]
+  # words[0] is EXPLAIN.
+  position = 1
+  analyze = False
+  if position < len(words) and words[position] == "ANALYZE":
+    analyze = True
+    position += 1
+  elif position < len(words) and words[position] == "(":
+    while position < len(words) and words[position] != ")":
+      analyze = analyze or words[position] == "ANALYZE"
+      position += 1
+    position += 1
+  return analyze, explain[offsets[min(position, len(tokens))] :]
+
+
+def _check_read_only(query: str) -> None:
+  """Reject statements that would modify the in-memory database.
+
+  The in-memory copy (or the parquet views) is shared by every query the
+  worker runs, so it must stay unchanged, like the read-only file. The
+  statement of an `EXPLAIN ANALYZE` is executed, so it is checked too.
+  """
+  for statement in duckdb.extract_statements(query):
+    if statement.type not in READ_ONLY_STATEMENTS:
+      msg = (
+        f'Cannot execute statement of type "{statement.type.name}" on the '
+        "in-memory copy of the database."
+      )
+      raise duckdb.InvalidInputException(msg)
+    if statement.type == duckdb.StatementType.EXPLAIN:
+      analyze, explained = _explained_statement(statement.query)
+      if analyze:
+        _check_read_only(explained)
+
+
+def _arrow_reader(
+  cur: duckdb.DuckDBPyConnection,
+) -> pa.RecordBatchReader:
+  # `to_arrow_reader` replaces `fetch_record_batch` in recent DuckDB.
+  if hasattr(cur, "to_arrow_reader"):
+    return cur.to_arrow_reader(ARROW_BATCH_ROWS)
+  return cur.fetch_record_batch(ARROW_BATCH_ROWS)
+
+
+def _fetch_profile(
+  cur: duckdb.DuckDBPyConnection, limit: int
+) -> QueryExecution:
+  """Read up to `limit` rows as strings and the profile of the query.
+
+  DuckDB only finishes the profile of a query whose result was read to the
+  end, so the profile is empty when the query returns more rows.
+  """
+  rows = cur.fetchmany(limit)
+  finished = len(rows) < limit or cur.fetchone() is None
+  return QueryExecution(
+    row_count=len(rows),
+    exception=None,
+    timed_out=False,
+    rows=[str(row) for row in rows],
+    profile=cur.get_profiling_information(format="json") if finished else "",
+  )
+
+
+def _fetch_result(
+  cur: duckdb.DuckDBPyConnection,
+  limit: int,
+  result_format: ResultFormat,
+) -> QueryExecution:
+  """Read up to `limit` rows as Arrow batches, without Python tuples.
+
+  Batches are only kept (and serialized to an Arrow IPC stream) when the
+  caller asked for the rows.
+  """
+  if result_format == ResultFormat.PROFILE:
+    return _fetch_profile(cur, limit)
+  reader = _arrow_reader(cur)
+  row_count = 0
+  if result_format == ResultFormat.TIMINGS:
+    # Timed runs read the whole result, so the query runs to the end.
+    for batch in reader:
+      row_count += batch.num_rows
+    return QueryExecution(row_count=row_count, exception=None, timed_out=False)
+  batches: list[pa.RecordBatch] = []
+  for full_batch in reader:
+    if row_count >= limit:
+      break
+    batch = full_batch.slice(0, limit - row_count)
+    row_count += batch.num_rows
+    if result_format == ResultFormat.ARROW:
+      batches.append(batch)
+  arrow_ipc = None
+  if result_format == ResultFormat.ARROW:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, reader.schema) as writer:
+      for batch in batches:
+        writer.write_batch(batch)
+    arrow_ipc = sink.getvalue().to_pybytes()
+  return QueryExecution(
+    row_count=row_count, exception=None, timed_out=False, arrow_ipc=arrow_ipc
+  )
 
 
 def _run_query_worker(
+  conn: duckdb.DuckDBPyConnection,
   query: str,
-  q: Queue,
   params: QueryWorkerInput,
-) -> None:
-  """Execute a query in an isolated process and return results via queue."""
-  conn = None
+  result_format: ResultFormat = ResultFormat.COUNT,
+) -> QueryExecution:
+  """Execute one query on the worker connection under the timeout."""
   timer: threading.Timer | None = None
   timed_out = False
 
@@ -46,112 +359,518 @@ def _run_query_worker(
     nonlocal timed_out
     timed_out = True
     with contextlib.suppress(Exception):
-      assert conn is not None
       conn.interrupt()
 
   try:
-    conn = duckdb.connect(database=params.database_path, read_only=True)
-    conn.execute(f"SET memory_limit = '{params.memory_gb}GB';")
-    conn.execute("SET enable_progress_bar = false;")
-    conn.execute("SET enable_progress_bar_print = false;")
-
+    if params.in_memory or params.parquet:
+      _check_read_only(query)
     if params.timeout_seconds and params.timeout_seconds > 0:
       timer = threading.Timer(params.timeout_seconds, _interrupt)
       timer.daemon = True
       timer.start()
 
+    start = time.perf_counter()
     cur = conn.execute(query)
-    rows = cur.fetchmany(params.limit_output_size)
-    q.put(QueryExecution(result=rows, exception=None, timed_out=timed_out))
-  except Exception as exc:  # pragma: no cover - defensive
-    q.put(QueryExecution(result=None, exception=exc, timed_out=timed_out))
+    execution = _fetch_result(cur, params.limit_output_size, result_format)
+    execution.elapsed_seconds = time.perf_counter() - start
+  except Exception as exc:
+    exception = DuckDBTimeoutError(params.timeout_seconds) if timed_out else exc
+    return QueryExecution(
+      row_count=None, exception=exception, timed_out=timed_out
+    )
+  finally:
+    if timer is not None:
+      # Join so a late interrupt can never hit the next query.
+      timer.cancel()
+      timer.join()
+  execution.timed_out = timed_out
+  return execution
+
+
+@contextlib.contextmanager
+def _profiling_disabled(
+  conn: duckdb.DuckDBPyConnection, *, profiling: bool
+) -> Iterator[None]:
+  if not profiling:
+    yield
+    return
+  conn.execute("PRAGMA disable_profiling;")
+  try:
+    yield
   finally:
+    conn.execute("PRAGMA enable_profiling = 'no_output';")
+
+
+def _time_query_worker(
+  conn: duckdb.DuckDBPyConnection, query: str, params: QueryWorkerInput
+) -> QueryExecution:
+  """Warm-up runs, then timed runs of a query, each under the timeout.
+
+  Profiling is turned off so its overhead is not measured.
+  """
+  timings: list[float] = []
+  execution = QueryExecution(row_count=None, exception=None, timed_out=False)
+  with _profiling_disabled(conn, profiling=params.profiling):
+    for run in range(params.warmup_runs + params.timed_runs):
+      execution = _run_query_worker(conn, query, params, ResultFormat.TIMINGS)
+      if execution.exception is not None:
+        return execution
+      if run >= params.warmup_runs and execution.elapsed_seconds is not None:
+        timings.append(execution.elapsed_seconds)
+  execution.timings = timings
+  return execution
+
+
+def _prewarm_tables(
+  conn: duckdb.DuckDBPyConnection,
+  query: str,
+  params: QueryWorkerInput,
+  warmed: set[str],
+) -> QueryExecution:
+  """Scan the tables of `query` not scanned yet into the buffer pool.
+
+  Each scan runs under the timeout. The error of the last failed scan is
+  returned, if any.
+  """
+  execution = QueryExecution(row_count=None, exception=None, timed_out=False)
+  try:
+    tables = duckdb.get_table_names(query) - warmed
+  except Exception:
+    # The query itself reports the error.
+    return execution
+  with _profiling_disabled(conn, profiling=params.profiling):
+    for table in sorted(tables):
+      warmed.add(table)
+      scan = _run_query_worker(
+        conn, f'SELECT * FROM "{table}"', params, ResultFormat.TIMINGS
+      )
+      if scan.exception is not None:
+        execution = scan
+  return execution
+
+
+def _persistent_query_worker(
+  pipe: Connection, params: QueryWorkerInput
+) -> None:
+  """Serve queries received through `pipe` until a None sentinel arrives."""
+  conn = None
+  warmed: set[str] = set()
+  try:
+    conn = _connect_worker(params)
+    pipe.send(DUCKDB_WORKER_READY)
+    while (request := pipe.recv()) is not None:
+      query, result_format = request
+      if result_format == ResultFormat.PREWARM:
+        execution = _prewarm_tables(conn, query, params, warmed)
+      elif result_format == ResultFormat.TIMINGS:
+        execution = _time_query_worker(conn, query, params)
+      else:
+        execution = _run_query_worker(conn, query, params, result_format)
+      try:
+        pipe.send(execution)
+      except Exception as exc:
+        # Some DuckDB exceptions or values cannot be pickled.
+        pipe.send(
+          QueryExecution(
+            row_count=None,
+            exception=Exception(str(execution.exception or exc)),
+            timed_out=execution.timed_out,
+          )
+        )
+  except EOFError:
+    # The parent closed its end of the pipe.
+    pass
+  except Exception as exc:  # pragma: no cover - defensive
     with contextlib.suppress(Exception):
-      if timer is not None:
-        timer.cancel()
+      pipe.send(QueryExecution(row_count=None, exception=exc, timed_out=False))
+  finally:
     with contextlib.suppress(Exception):
       if conn is not None:
         conn.close()
 
 
+class _QueryWorker:
+  """Parent-side handle of one long-lived worker process."""
+
+  def __init__(self, params: QueryWorkerInput) -> None:
+    self.pipe, child_pipe = _MP_CTX.Pipe()
+    self.process = _MP_CTX.Process(
+      target=_persistent_query_worker,
+      args=(child_pipe, params),
+      daemon=True,
+    )
+    self.process.start()
+    child_pipe.close()
+    self.ready = False
+
+  def wait_ready(self, timeout_seconds: float) -> Exception | None:
+    """Wait until the worker has connected; the error if it did not.
+
+    Connecting may copy the whole database into memory, so it gets its own
+    timeout instead of eating into the one of the first query.
+    """
+    try:
+      message = self.pipe.recv() if self.pipe.poll(timeout_seconds) else None
+    except (EOFError, OSError):
+      message = None
+    if message == DUCKDB_WORKER_READY:
+      self.ready = True
+      return None
+    if isinstance(message, QueryExecution) and message.exception is not None:
+      return message.exception
+    logger.warning(
+      "DuckDB worker (pid=%s) did not connect within %s seconds.",
+      self.process.pid,
+      timeout_seconds,
+    )
+    return WorkerCrashedError("DuckDB")
+
+  def is_alive(self) -> bool:
+    return self.process.is_alive()
+
+  def kill(self) -> None:
+    with contextlib.suppress(Exception):
+      self.process.kill()
+      self.process.join()
+    self.pipe.close()
+
+  def stop(self) -> None:
+    with contextlib.suppress(Exception):
+      self.pipe.send(None)
+      self.process.join(1)
+    self.kill()
+
+
+class DuckDBWorkerPool:
+  """Supervised pool of long-lived DuckDB worker processes.
+
+  Each worker keeps a read-only connection open and receives queries over a
+  pipe. Timeouts are enforced inside the worker with `interrupt()`, so a
+  worker is only killed and respawned when it hangs past the timeout or
+  crashes. Workers are spawned lazily, up to `workers` at the same time.
+  With `recycle_workers`, each worker is stopped after one query, so every
+  query starts from a fresh process. A new worker has
+  `startup_timeout_seconds` to connect before its first query is sent.
+
+  With `prewarm_tables`, the tables of each query are scanned by a separate
+  request before the query is sent, with the timeout once per table. Its
+  time and errors do not count against the query; if it fails, the query
+  still runs and its execution has `prewarm_failed` set.
+  """
+
+  def __init__(
+    self,
+    params: QueryWorkerInput,
+    workers: int = 1,
+    hang_grace_seconds: float = 5.0,
+    *,
+    recycle_workers: bool = False,
+    startup_timeout_seconds: float = 300.0,
+  ) -> None:
+    self.params = params
+    self.workers = workers
+    self.hang_grace_seconds = hang_grace_seconds
+    self.recycle_workers = recycle_workers
+    self.startup_timeout_seconds = startup_timeout_seconds
+    # Guards `_idle` and `_spawned`; waiters are woken whenever a worker
+    # becomes idle or a slot to spawn one frees up.
+    self._condition = threading.Condition()
+    self._idle: deque[_QueryWorker] = deque()
+    self._spawned = 0
+
+  def _can_acquire(self) -> bool:
+    return bool(self._idle) or self._spawned < self.workers
+
+  def _acquire(self) -> _QueryWorker:
+    while True:
+      with self._condition:
+        self._condition.wait_for(self._can_acquire)
+        if not self._idle:
+          self._spawned += 1
+          worker = None
+        else:
+          worker = self._idle.popleft()
+      if worker is None:
+        return _QueryWorker(self.params)
+      if worker.is_alive():
+        return worker
+      logger.warning(
+        "DuckDB worker (pid=%s) died while idle.", worker.process.pid
+      )
+      self._discard(worker)
+
+  def start_workers(self) -> None:
+    """Spawn the missing workers and wait until they have connected."""
+    with self._condition:
+      missing = self.workers - self._spawned
+      self._spawned += max(missing, 0)
+    started = [_QueryWorker(self.params) for _ in range(missing)]
+    for worker in started:
+      startup_error = worker.wait_ready(self.startup_timeout_seconds)
+      if startup_error is None:
+        self._put_idle(worker)
+      else:
+        logger.warning("DuckDB worker failed to start: %s", startup_error)
+        self._discard(worker)
+
+  def _put_idle(self, worker: _QueryWorker) -> None:
+    with self._condition:
+      self._idle.append(worker)
+      self._condition.notify()
+
+  def _forget(self) -> None:
+    """Free the slot of a stopped worker, so a waiter can spawn one."""
+    with self._condition:
+      self._spawned -= 1
+      self._condition.notify()
+
+  def _discard(self, worker: _QueryWorker) -> None:
+    worker.kill()
+    self._forget()
+
+  def _release(self, worker: _QueryWorker) -> None:
+    if not self.recycle_workers:
+      self._put_idle(worker)
+      return
+    worker.stop()
+    self._forget()
+
+  def _wait_seconds(self, result_format: ResultFormat) -> float | None:
+    if not self.params.timeout_seconds or self.params.timeout_seconds <= 0:
+      return None
+    runs = 1
+    if result_format == ResultFormat.TIMINGS:
+      runs = max(1, self.params.warmup_runs + self.params.timed_runs)
+    return self.params.timeout_seconds * runs + self.hang_grace_seconds
+
+  def _prewarm_wait_seconds(self, query: str) -> float | None:
+    """Budget of the prewarm of `query`: the timeout for each table."""
+    if not self.params.timeout_seconds or self.params.timeout_seconds <= 0:
+      return None
+    try:
+      tables = len(duckdb.get_table_names(query))
+    except Exception:
+      tables = 0
+    return self.params.timeout_seconds * max(tables, 1) + (
+      self.hang_grace_seconds
+    )
+
+  def _acquire_ready(self) -> tuple[_QueryWorker | None, Exception | None]:
+    """A connected worker, or the error of a worker that did not start."""
+    worker = self._acquire()
+    if worker.ready:
+      return worker, None
+    startup_error = worker.wait_ready(self.startup_timeout_seconds)
+    if startup_error is None:
+      return worker, None
+    self._discard(worker)
+    return None, startup_error
+
+  def execute(
+    self,
+    query: str,
+    description: str,
+    result_format: ResultFormat = ResultFormat.COUNT,
+  ) -> QueryExecution:
+    worker, startup_error = self._acquire_ready()
+    prewarm_failed = False
+    if worker is not None and self.params.prewarm_tables:
+      prewarm, usable = self._request(
+        worker,
+        (query, ResultFormat.PREWARM),
+        self._prewarm_wait_seconds(query),
+        f"Prewarm of {description}",
+      )
+      prewarm_failed = prewarm.exception is not None
+      if prewarm_failed:
+        logger.warning(
+          "%s: prewarming the tables failed: %s",
+          description,
+          prewarm.exception,
+        )
+      if not usable:
+        # The query still runs, on a fresh worker with cold caches.
+        worker, startup_error = self._acquire_ready()
+    if worker is None:
+      return QueryExecution(
+        row_count=None, exception=startup_error, timed_out=False
+      )
+    execution, usable = self._request(
+      worker,
+      (query, result_format),
+      self._wait_seconds(result_format),
+      description,
+    )
+    if usable:
+      self._release(worker)
+    execution.prewarm_failed = prewarm_failed
+    return execution
+
+  def _request(
+    self,
+    worker: _QueryWorker,
+    request: tuple[str, ResultFormat],
+    wait_seconds: float | None,
+    description: str,
+  ) -> tuple[QueryExecution, bool]:
+    """Send `request` to `worker`; its reply and whether it can be reused.
+
+    A worker that crashes, or does not reply within `wait_seconds`, is
+    discarded.
+    """
+    try:
+      worker.pipe.send(request)
+      if worker.pipe.poll(wait_seconds):
+        return worker.pipe.recv(), True
+    except (EOFError, OSError):
+      logger.warning(
+        "%s: worker process (pid=%s) crashed; respawning.",
+        description,
+        worker.process.pid,
+      )
+      self._discard(worker)
+      crashed = QueryExecution(
+        row_count=None,
+        exception=WorkerCrashedError("DuckDB"),
+        timed_out=False,
+      )
+      return crashed, False
+    logger.warning(
+      "%s exceeded %s seconds and did not react to interrupt; "
+      "worker process killed.",
+      description,
+      wait_seconds,
+    )
+    self._discard(worker)
+    timed_out = QueryExecution(
+      row_count=None,
+      exception=DuckDBTimeoutError(self.params.timeout_seconds),
+      timed_out=True,
+    )
+    return timed_out, False
+
+  def close(self) -> None:
+    """Stop all idle workers."""
+    while True:
+      with self._condition:
+        if not self._idle:
+          return
+        worker = self._idle.popleft()
+      worker.stop()
+      self._forget()
+
+
 class DuckDBQueryExecutor(QueryValidator):
   """Simple class for executing queries under timeout constraints.
 
-  It works with a DuckDB database in read-only mode. Each query is executed in
-  a separate process to isolate potential crashes."""
+  It works with a DuckDB database in read-only mode, or with a folder of
+  parquet files laid out as `database_path/table_name/data.parquet`.
+  Queries are executed by a pool of long-lived worker processes (see
+  `DuckDBWorkerPool`) to isolate potential crashes without paying a process
+  start per query. Workers read results as Arrow batches and only send
+  back the row count, unless the rows are requested with
+  `get_query_output`.
+
+  With `pool_settings.in_memory` each worker loads the database into memory
+  once when it starts. If the estimated copy does not fit in half of
+  `memory_gb`, the workers read from disk instead."""
 
   def __init__(
     self,
     database_path: str,
     timeout_seconds: float,
-    memory_gb: int = 5,
+    memory_gb: float = 5,
     limit_output_size: int = 1_000,
+    pool_settings: WorkerPoolSettings | None = None,
   ) -> None:
     output_size_buffer = 100
     self.database_path = database_path
     self.timeout_seconds = timeout_seconds
     self.memory_gb = memory_gb
     self.limit_output_size = limit_output_size + output_size_buffer
+    pool_settings = pool_settings or WorkerPoolSettings()
+    in_memory = pool_settings.in_memory
+    if in_memory and not fits_in_memory(database_path, memory_gb):
+      logger.warning(
+        "Database %s does not fit in the %sGB memory limit of the workers; "
+        "falling back to reading it from disk.",
+        database_path,
+        memory_gb,
+      )
+      in_memory = False
+    self.in_memory = in_memory
+    self.pool_settings = pool_settings
     self.query_worker_input = QueryWorkerInput(
       database_path=database_path,
       memory_gb=memory_gb,
       timeout_seconds=timeout_seconds,
       limit_output_size=self.limit_output_size,
+      in_memory=in_memory,
+      parquet=is_parquet_database(database_path),
+    )
+    self.worker_pool = DuckDBWorkerPool(
+      self.query_worker_input, pool_settings.workers
     )
     self._persistent_con: duckdb.DuckDBPyConnection | None = None
+    self._cardinality_pool: CardinalityCursorPool | None = None
+    self._cardinality_lock = threading.Lock()
 
   def _execute_with_timeout(
-    self, query: str, description: str
+    self,
+    query: str,
+    description: str,
+    result_format: ResultFormat = ResultFormat.COUNT,
   ) -> QueryExecution:
     logger.debug("Start %s.", description)
-    q: Queue = _MP_CTX.Queue()
-
-    p = _MP_CTX.Process(
-      target=_run_query_worker,
-      args=(
-        query,
-        q,
-        self.query_worker_input,
-      ),
-    )
-    p.start()
-    p.join(self.timeout_seconds)
-
-    if p.is_alive():
-      logger.warning(
-        "%s exceeded %s seconds; process terminated.",
-        description,
-        self.timeout_seconds,
-      )
-      p.terminate()
-      p.join()
-      return QueryExecution(
-        result=None,
-        exception=DuckDBTimeoutError(self.timeout_seconds),
-        timed_out=True,
-      )
-
-    execution = (
-      q.get()
-      if not q.empty()
-      else QueryExecution(
-        result=None,
-        exception=Exception("No result returned from worker process."),
-        timed_out=False,
-      )
-    )
-
+    execution = self.worker_pool.execute(query, description, result_format)
     logger.debug(
       "%s finished with timed_out=%s ,exception=%s",
       description,
       execution.timed_out,
       execution.exception,
     )
-
     return execution
 
-  def is_query_valid(self, query: str) -> tuple[bool, Exception | None]:
-    execution = self._execute_with_timeout(query, "DuckDB query validation")
+  def settings_fingerprint(self) -> str:
+    return (
+      f"{type(self).__name__}(timeout={self.timeout_seconds}, "
+      f"memory_gb={self.memory_gb}, limit={self.limit_output_size})"
+    )
+
+  def start_workers(self) -> None:
+    self.worker_pool.start_workers()
+
+  def close(self) -> None:
+    """Stop the worker processes and the persistent connection."""
+    self.worker_pool.close()
+    if self._cardinality_pool is not None:
+      self._cardinality_pool.close()
+      self._cardinality_pool = None
+    if self._persistent_con is not None:
+      self._persistent_con.close()
+      self._persistent_con = None
+
+  def is_query_valid(
+    self, query: str, level: ValidationLevel = ValidationLevel.EXECUTE
+  ) -> tuple[bool, Exception | None]:
+    """Validate a query at the given level.
+
+    Parsing happens in this process. Planning runs `EXPLAIN` on every
+    statement in a worker, which binds and optimizes without executing.
+    """
+    if level != ValidationLevel.EXECUTE:
+      try:
+        statements = duckdb.extract_statements(query)
+      except Exception as exc:
+        return False, exc
+      if not statements:
+        return False, InvalidQueryError(query)
+      if level == ValidationLevel.PARSE:
+        return True, None
+      query = ";\n".join(f"EXPLAIN {s.query}" for s in statements)
+    execution = self._execute_with_timeout(
+      query, f"DuckDB query validation ({level})"
+    )
     if execution.exception:
       return False, execution.exception
     return True, None
@@ -166,32 +885,64 @@ class DuckDBQueryExecutor(QueryValidator):
       query,
       "DuckDB output size calculation",
     )
-    result = len(execution.result) if execution.result is not None else None
     logger.debug(
       "Query exception: %s",
       execution.exception,
     )
-    return result, execution.timed_out
+    return execution.row_count, execution.timed_out
+
+  def get_query_output_size_and_error(
+    self, query: str
+  ) -> tuple[int | None, Exception | None]:
+    execution = self._execute_with_timeout(
+      query, "DuckDB output size calculation"
+    )
+    return execution.row_count, execution.exception
+
+  def get_query_output(self, query: str) -> tuple[pa.Table | None, bool]:
+    """Get up to the output limit of rows of a query as an Arrow table.
+
+    The rows travel from the worker as an Arrow IPC stream. It returns a
+    tuple of (table, timed_out); table is None if the query fails.
+    """
+    execution = self._execute_with_timeout(
+      query, "DuckDB output fetch", ResultFormat.ARROW
+    )
+    return execution.to_arrow(), execution.timed_out
+
+  def _get_cardinality_pool(self) -> CardinalityCursorPool:
+    with self._cardinality_lock:
+      if self._cardinality_pool is None:
+        if self._persistent_con is None:
+          self._persistent_con = connect_read_only(self.database_path)
+          if self.pool_settings.duckdb_threads is not None:
+            self._persistent_con.execute(
+              f"SET threads = {self.pool_settings.duckdb_threads};"
+            )
+        self._cardinality_pool = CardinalityCursorPool(
+          self._persistent_con,
+          self.timeout_seconds,
+          self.pool_settings.cardinality_cursors,
+        )
+      return self._cardinality_pool
 
   def get_synthetic_query_cardinality(self, query: str) -> int:
     """Run a COUNT(*) query and return its scalar result.
 
-    Uses a persistent connection — no new process per call. Timeout via
-    threading.Timer + con.interrupt(). Returns -1 on error or timeout.
+    Uses cursors of a persistent connection — no new process per call. It
+    is thread safe, up to `cardinality_cursors` queries run at the same
+    time. Returns -1 on error or timeout.
     """
-    if self._persistent_con is None:
-      self._persistent_con = duckdb.connect(
-        database=self.database_path, read_only=True
-      )
-    timer = threading.Timer(
-      self.timeout_seconds, self._persistent_con.interrupt
+    return self._get_cardinality_pool().count(query)
+
+  def get_parameterized_query_cardinality(
+    self, query: str, parameterized: ParameterizedQuery
+  ) -> int:
+    """Run a parameterized COUNT(*) query through a prepared statement.
+
+    The template is prepared on the cursor once it repeats and then executed
+    with the literals of each query. Returns -1 on error or timeout.
+    """
+    return self._get_cardinality_pool().count_parameterized(
+      query, parameterized
     )
-    timer.start()
-    try:
-      rows = self._persistent_con.execute(query).fetchall()
-      return int(rows[0][0]) if rows else -1
-    except Exception as exc:
-      logger.debug("Cardinality query failed: %s | query: %s", exc, query)
-      return -1
-    finally:
-      timer.cancel()
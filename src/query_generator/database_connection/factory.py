@@ -1,29 +1,91 @@
+from pathlib import Path
+
 from query_generator.database_connection.duckdb_validation import (
   DuckDBQueryExecutor,
+  WorkerPoolSettings,
 )
 from query_generator.database_connection.pyspark_validation import (
   PySparkQueryValidator,
+  SparkSessionSettings,
 )
 from query_generator.database_connection.query_validator_abc import (
   QueryValidator,
 )
+from query_generator.database_connection.validation_cache import (
+  CachedQueryValidator,
+  ValidationCache,
+)
 from query_generator.utils.definitions import ValidatorEngine
+from query_generator.utils.params import (
+  SparkValidationParams,
+  ValidationCacheParams,
+)
+
+
+def with_validation_cache(
+  validator: QueryValidator,
+  database_path: str,
+  cache_params: ValidationCacheParams | None,
+) -> QueryValidator:
+  """Wrap the validator with the disk cache when it is configured."""
+  if cache_params is None:
+    return validator
+  return CachedQueryValidator(
+    validator,
+    database_path,
+    ValidationCache(cache_params.path, cache_params.max_entries),
+    bypass=cache_params.bypass,
+  )
 
 
-def build_query_validator(
+def build_query_validator(  # noqa: PLR0913
   database_path: str,
   validation_timeout_seconds: int | float,
   validator_engine: ValidatorEngine,
+  cache_params: ValidationCacheParams | None = None,
+  pool_settings: WorkerPoolSettings | None = None,
+  spark_params: SparkValidationParams | None = None,
 ) -> QueryValidator:
   """Build the appropriate query validator based on validator_engine.
 
   When validator_engine is DUCKDB, database_path should point to a .duckdb file.
+  When validator_engine is DUCKDB_PARQUET, database_path should point to a
+  parquet directory with structure: database_path/table_name/data.parquet,
+  which DuckDB queries through views.
   When validator_engine is PYSPARK, database_path should point to a parquet
   directory with structure: database_path/table_name/data.parquet
+  When cache_params is given, results are served from a disk cache.
+  pool_settings applies to the DuckDB engines, see `DuckDBQueryExecutor`;
+  with PYSPARK only its cardinality_cursors is used, as the number of
+  concurrent Spark jobs. spark_params tunes the SparkSession of PYSPARK.
   """
+  validator: QueryValidator
   if validator_engine == ValidatorEngine.DUCKDB:
-    return DuckDBQueryExecutor(database_path, validation_timeout_seconds)
-  if validator_engine == ValidatorEngine.PYSPARK:
-    return PySparkQueryValidator(database_path, validation_timeout_seconds)
-  msg = f"Unknown validator engine: {validator_engine}"
-  raise ValueError(msg)
+    validator = DuckDBQueryExecutor(
+      database_path,
+      validation_timeout_seconds,
+      pool_settings=pool_settings,
+    )
+  elif validator_engine == ValidatorEngine.DUCKDB_PARQUET:
+    if not Path(database_path).is_dir():
+      msg = f"{database_path} is not a parquet directory."
+      raise ValueError(msg)
+    validator = DuckDBQueryExecutor(
+      database_path,
+      validation_timeout_seconds,
+      pool_settings=pool_settings,
+    )
+  elif validator_engine == ValidatorEngine.PYSPARK:
+    pool_settings = pool_settings or WorkerPoolSettings()
+    validator = PySparkQueryValidator(
+      database_path,
+      validation_timeout_seconds,
+      session_settings=SparkSessionSettings(
+        concurrent_jobs=pool_settings.cardinality_cursors,
+        tuning=spark_params or SparkValidationParams(),
+      ),
+    )
+  else:
+    msg = f"Unknown validator engine: {validator_engine}"
+    raise ValueError(msg)
+  return with_validation_cache(validator, database_path, cache_params)
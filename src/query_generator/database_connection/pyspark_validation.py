@@ -1,13 +1,18 @@
+import contextlib
 import logging
 import multiprocessing
 import os
+import queue
 import threading
 import uuid
-from dataclasses import dataclass
-from multiprocessing import Queue
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
 from pathlib import Path
 
 import pyspark
+from py4j.protocol import Py4JJavaError
+from pyspark.errors.exceptions.captured import convert_exception
 from pyspark.sql import SparkSession
 
 from query_generator.database_connection.duckdb_validation import (
@@ -16,62 +21,241 @@ from query_generator.database_connection.duckdb_validation import (
 from query_generator.database_connection.query_validator_abc import (
   QueryValidator,
 )
+from query_generator.utils.definitions import ValidationLevel
+from query_generator.utils.exceptions import WorkerCrashedError
+from query_generator.utils.params import SparkValidationParams
 
 logger = logging.getLogger(__name__)
 
 _MP_CTX = multiprocessing.get_context("spawn")
 
+# Message sent by the Spark worker once its session and views are ready.
+SPARK_WORKER_READY = "READY"
+
+
+@dataclass
+class SparkSessionSettings:
+  """How the local SparkSession of the validator runs its jobs.
+
+  - concurrent_jobs: COUNT(*) queries of the synthetic stage submitted to
+      the session at the same time. With more than one, the session uses
+      the FAIR scheduler and every running query gets its own pool, so
+      small queries are not queued behind a large one.
+  - shuffle_partitions: `spark.sql.shuffle.partitions`. None uses one per
+      local core instead of Spark's default of 200, which is meant for
+      clusters and mostly schedules empty tasks in local mode.
+  - tuning: table caching, statistics and join settings.
+  """
+
+  concurrent_jobs: int = 1
+  shuffle_partitions: int | None = None
+  tuning: SparkValidationParams = field(default_factory=SparkValidationParams)
+
 
 @dataclass
 class PySparkWorkerInput:
   parquet_path: str
   timeout_seconds: float
   limit_output_size: int
+  session_settings: SparkSessionSettings = field(
+    default_factory=SparkSessionSettings
+  )
 
 
-def _run_pyspark_query_worker(
-  query: str,
-  q: Queue,
-  params: PySparkWorkerInput,
-  ready_queue: Queue,
+def _create_spark_session(
+  parquet_path: str, settings: SparkSessionSettings
+) -> SparkSession:
+  """Start a local SparkSession with every parquet directory as a view."""
+  os.environ["SPARK_HOME"] = pyspark.__path__[0]
+  logging.getLogger("py4j").setLevel(logging.INFO)
+  shuffle_partitions = settings.shuffle_partitions or os.cpu_count() or 1
+  builder = (
+    SparkSession.builder.master("local[*]")
+    .appName("query-validator")
+    .config("spark.ui.showConsoleProgress", "false")
+    .config("spark.log.level", "WARN")
+    .config("spark.sql.shuffle.partitions", str(shuffle_partitions))
+  )
+  if settings.concurrent_jobs > 1:
+    builder = builder.config("spark.scheduler.mode", "FAIR")
+  tuning = settings.tuning
+  if tuning.compute_statistics:
+    builder = builder.config("spark.sql.cbo.enabled", "true").config(
+      "spark.sql.cbo.joinReorder.enabled", "true"
+    )
+  if tuning.broadcast_threshold_mb is not None:
+    builder = builder.config(
+      "spark.sql.autoBroadcastJoinThreshold",
+      str(tuning.broadcast_threshold_mb * 1024**2),
+    )
+  spark = builder.getOrCreate()
+  base = Path(parquet_path)
+  for table_dir in sorted(base.iterdir()):
+    if table_dir.is_dir():
+      table = spark.read.parquet(str(table_dir))
+      table.createOrReplaceTempView(table_dir.name)
+      if (
+        tuning.cache_tables_max_mb > 0
+        and _parquet_size_mb(table_dir) <= tuning.cache_tables_max_mb
+      ):
+        _cache_table(spark, table_dir.name, tuning)
+  return spark
+
+
+def _parquet_size_mb(table_dir: Path) -> float:
+  return sum(p.stat().st_size for p in table_dir.rglob("*.parquet")) / 1024**2
+
+
+def _cache_table(
+  spark: SparkSession, table_name: str, tuning: SparkValidationParams
 ) -> None:
-  """Execute a Spark SQL query in an isolated process."""
-  spark = None
-  try:
-    os.environ["SPARK_HOME"] = pyspark.__path__[0]
-    logging.getLogger("py4j").setLevel(logging.INFO)
-    spark = (
-      SparkSession.builder.master("local[*]")
-      .appName("query-validator")
-      .config("spark.ui.showConsoleProgress", "false")
-      .config("spark.log.level", "WARN")
-      .getOrCreate()
+  """Load a view into memory and, if requested, compute its statistics.
+
+  Temporary views have no metastore entry, so Spark only keeps statistics
+  of cached views; they last as long as the session.
+  """
+  spark.sql(f"CACHE TABLE `{table_name}`")
+  if tuning.compute_statistics:
+    spark.sql(
+      f"ANALYZE TABLE `{table_name}` COMPUTE STATISTICS FOR ALL COLUMNS"
     )
+  logger.debug("Cached Spark table %s.", table_name)
 
-    base = Path(params.parquet_path)
-    for table_dir in sorted(base.iterdir()):
-      if table_dir.is_dir():
-        table = spark.read.parquet(str(table_dir))
-        table.createOrReplaceTempView(table_dir.name)
 
-    ready_queue.put("READY")
+def _parse_spark_query(spark: SparkSession, query: str) -> None:
+  """Parse `query` with Spark's parser, accepting only queries.
+
+  DDL and DML statements fail to parse as a query. Views of the worker's
+  session are shared by every query it runs, so statements that would
+  change them must never reach `spark.sql`, which runs them eagerly.
+  """
+  parser = spark._jsparkSession.sessionState().sqlParser()
+  try:
+    parser.parseQuery(query.strip().rstrip(";"))
+  except Py4JJavaError as exc:
+    # Raise the same Python exception `spark.sql` raises.
+    raise convert_exception(exc.java_exception) from None
+
 
-    result_df = spark.sql(query)
-    rows = result_df.limit(params.limit_output_size).take(
-      params.limit_output_size
+def _analyze_spark_query(
+  spark: SparkSession, query: str, level: ValidationLevel
+) -> QueryExecution:
+  """Parse, or parse, analyze and optimize `query` without running a job."""
+  try:
+    _parse_spark_query(spark, query)
+    if level == ValidationLevel.PLAN:
+      # `spark.sql` resolves the analyzed plan; the optimized plan is built
+      # lazily, so it is requested explicitly.
+      spark.sql(query)._jdf.queryExecution().optimizedPlan()
+  except Exception as exc:
+    return QueryExecution(
+      row_count=None, exception=Exception(str(exc)), timed_out=False
     )
-    row_tuples = [tuple(row) for row in rows]
-    q.put(QueryExecution(result=row_tuples, exception=None, timed_out=False))
+  return QueryExecution(row_count=None, exception=None, timed_out=False)
+
+
+def _run_spark_validation_job(  # noqa: PLR0913
+  spark: SparkSession,
+  query: str,
+  job_group: str,
+  params: PySparkWorkerInput,
+  q: queue.Queue[QueryExecution],
+  *,
+  count_only: bool = False,
+) -> None:
+  """Run `query` under `job_group` and put its row count in q.
+
+  With `count_only` the rows are counted in Spark, which may prune the
+  output columns. Otherwise the rows are fetched, so every output column
+  is computed and errors raised by the projection (ANSI casts,
+  `raise_error`, UDFs) fail the validation.
+  """
+  try:
+    _parse_spark_query(spark, query)
+    spark.sparkContext.setJobGroup(job_group, query, interruptOnCancel=True)
+    limited_df = spark.sql(query).limit(params.limit_output_size)
+    if count_only:
+      row_count = limited_df.count()
+    else:
+      row_count = len(limited_df.take(params.limit_output_size))
+    q.put(QueryExecution(row_count=row_count, exception=None, timed_out=False))
   except Exception as exc:
     # Convert to plain Exception so it can be pickled across processes.
     # PySpark exceptions often fail to deserialize in the parent process.
-    # timed_out is always False here — timeouts are detected at the
-    # parent-process level via p.join(timeout) in _execute_with_timeout.
     q.put(
       QueryExecution(
-        result=None, exception=Exception(str(exc)), timed_out=False
+        row_count=None, exception=Exception(str(exc)), timed_out=False
       )
     )
+
+
+def _run_spark_query_with_timeout(
+  spark: SparkSession,
+  query: str,
+  params: PySparkWorkerInput,
+  *,
+  count_only: bool = False,
+) -> QueryExecution:
+  """Run one validation job, cancelling its job group on timeout.
+
+  The cancelled job is waited for, so a worker that does not react to
+  the cancellation stays busy and is killed by its supervisor.
+  """
+  job_group = str(uuid.uuid4())
+  q: queue.Queue[QueryExecution] = queue.Queue()
+  t = threading.Thread(
+    target=_run_spark_validation_job,
+    args=(spark, query, job_group, params, q),
+    kwargs={"count_only": count_only},
+    daemon=True,
+  )
+  t.start()
+  t.join(params.timeout_seconds)
+  if t.is_alive():
+    spark.sparkContext.cancelJobGroup(job_group)
+    t.join()
+    return QueryExecution(
+      row_count=None,
+      exception=TimeoutError(
+        f"PySpark query exceeded {params.timeout_seconds}s"
+      ),
+      timed_out=True,
+    )
+  return q.get()
+
+
+def _persistent_spark_worker(
+  pipe: Connection, params: PySparkWorkerInput
+) -> None:
+  """Serve queries received through `pipe` until a None sentinel arrives.
+
+  The SparkSession and the views are created once, when the worker starts.
+  Requests are `(query, level)` tuples; only the execute level launches a
+  Spark job.
+  """
+  spark = None
+  try:
+    spark = _create_spark_session(params.parquet_path, params.session_settings)
+    pipe.send(SPARK_WORKER_READY)
+    while (request := pipe.recv()) is not None:
+      query, level, count_only = request
+      if level == ValidationLevel.EXECUTE:
+        execution = _run_spark_query_with_timeout(
+          spark, query, params, count_only=count_only
+        )
+      else:
+        execution = _analyze_spark_query(spark, query, level)
+      pipe.send(execution)
+  except EOFError:
+    # The parent closed its end of the pipe.
+    pass
+  except Exception as exc:  # pragma: no cover - defensive
+    with contextlib.suppress(Exception):
+      pipe.send(
+        QueryExecution(
+          row_count=None, exception=Exception(str(exc)), timed_out=False
+        )
+      )
   finally:
     if spark is not None:
       spark.stop()
@@ -81,11 +265,17 @@ def _run_persistent_spark_query(
   spark: SparkSession,
   query: str,
   job_group: str,
-  q: Queue,
+  pool: str,
+  q: queue.Queue[int],
 ) -> None:
-  """Run a COUNT(*) query on a persistent SparkSession, put result in q."""
+  """Run a COUNT(*) query on a persistent SparkSession, put result in q.
+
+  Job groups and scheduler pools are thread-local properties, so they are
+  set by the thread that submits the job.
+  """
   try:
     spark.sparkContext.setJobGroup(job_group, query, interruptOnCancel=True)
+    spark.sparkContext.setLocalProperty("spark.scheduler.pool", pool)
     rows = spark.sql(query).take(1)
     q.put(int(rows[0][0]) if rows else -1)
   except Exception as exc:
@@ -93,12 +283,132 @@ def _run_persistent_spark_query(
     q.put(-1)
 
 
+class SparkWorker:
+  """Supervised long-lived process holding one SparkSession.
+
+  The JVM start and the view registration are paid once, when the worker
+  is first used. Timeouts cancel the job group of the query inside the
+  worker, so the process is only killed and restarted when it crashes or
+  does not finish the cancellation within `hang_grace_seconds`.
+  """
+
+  def __init__(
+    self,
+    params: PySparkWorkerInput,
+    startup_timeout_seconds: float = 300.0,
+    hang_grace_seconds: float = 30.0,
+  ) -> None:
+    self.params = params
+    self.startup_timeout_seconds = startup_timeout_seconds
+    self.hang_grace_seconds = hang_grace_seconds
+    self.process: BaseProcess | None = None
+    self._pipe: Connection | None = None
+    self._lock = threading.Lock()
+
+  def _start(self) -> Connection | None:
+    """Start the worker and wait for its session; None if it failed."""
+    pipe, child_pipe = _MP_CTX.Pipe()
+    self.process = _MP_CTX.Process(
+      target=_persistent_spark_worker,
+      args=(child_pipe, self.params),
+      daemon=True,
+    )
+    self.process.start()
+    child_pipe.close()
+    self._pipe = pipe
+    logger.debug("PySpark worker process started (pid=%s).", self.process.pid)
+    try:
+      ready = pipe.poll(self.startup_timeout_seconds) and pipe.recv()
+    except (EOFError, OSError):
+      ready = None
+    if ready != SPARK_WORKER_READY:
+      logger.warning("PySpark worker failed to start its Spark session.")
+      self._kill()
+      return None
+    logger.debug("Spark session ready (pid=%s).", self.process.pid)
+    return pipe
+
+  def _kill(self) -> None:
+    if self.process is not None:
+      with contextlib.suppress(Exception):
+        self.process.kill()
+        self.process.join()
+    if self._pipe is not None:
+      self._pipe.close()
+    self.process = None
+    self._pipe = None
+
+  def _connection(self) -> Connection | None:
+    if self._pipe is not None and self.process is not None:
+      if self.process.is_alive():
+        return self._pipe
+      logger.warning(
+        "PySpark worker (pid=%s) died while idle.", self.process.pid
+      )
+      self._kill()
+    return self._start()
+
+  def execute(
+    self,
+    query: str,
+    description: str,
+    level: ValidationLevel = ValidationLevel.EXECUTE,
+    *,
+    count_only: bool = False,
+  ) -> QueryExecution:
+    with self._lock:
+      try:
+        pipe = self._connection()
+        if pipe is not None:
+          pipe.send((query, level, count_only))
+          if pipe.poll(self.params.timeout_seconds + self.hang_grace_seconds):
+            return pipe.recv()
+      except (EOFError, OSError):
+        pipe = None
+      if pipe is None:
+        logger.warning("%s: PySpark worker crashed; restarting.", description)
+        self._kill()
+        return QueryExecution(
+          row_count=None,
+          exception=WorkerCrashedError("PySpark"),
+          timed_out=False,
+        )
+      logger.warning(
+        "%s exceeded %s seconds and did not react to job cancellation; "
+        "worker process killed.",
+        description,
+        self.params.timeout_seconds,
+      )
+      self._kill()
+      return QueryExecution(
+        row_count=None,
+        exception=TimeoutError(
+          f"PySpark query exceeded {self.params.timeout_seconds}s"
+        ),
+        timed_out=True,
+      )
+
+  def start(self) -> None:
+    """Start the worker and its Spark session if it is not running."""
+    with self._lock:
+      self._connection()
+
+  def stop(self) -> None:
+    with self._lock:
+      if self._pipe is not None and self.process is not None:
+        with contextlib.suppress(Exception):
+          self._pipe.send(None)
+          self.process.join(self.hang_grace_seconds)
+      self._kill()
+
+
 class PySparkQueryValidator(QueryValidator):
   """Query validator using PySpark with parquet files as data source.
 
   Reads parquet directories structured as database_path/table_name/data.parquet
   and registers each as a temporary view (metadata-only, no data loaded).
-  Each query runs in a separate process for isolation against crashes and hangs.
+  Queries run in a long-lived worker process (see `SparkWorker`) for
+  isolation against crashes and hangs, without starting a JVM per query.
   """
 
   def __init__(
@@ -106,6 +416,7 @@ class PySparkQueryValidator(QueryValidator):
     parquet_path: str,
     timeout_seconds: float,
     limit_output_size: int = 1_000,
+    session_settings: SparkSessionSettings | None = None,
   ) -> None:
     output_size_buffer = 100
     self.parquet_path = parquet_path
@@ -115,122 +426,122 @@ class PySparkQueryValidator(QueryValidator):
       parquet_path=parquet_path,
       timeout_seconds=timeout_seconds,
       limit_output_size=self.limit_output_size,
+      session_settings=session_settings or SparkSessionSettings(),
     )
+    self.worker = SparkWorker(self.worker_input)
     self._spark: SparkSession | None = None
+    self._spark_lock = threading.Lock()
+    # One FAIR scheduler pool per concurrent cardinality query.
+    self._pools: queue.Queue[str] = queue.Queue()
+    for i in range(self.worker_input.session_settings.concurrent_jobs):
+      self._pools.put(f"cardinality_{i}")
 
   def _execute_with_timeout(
-    self, query: str, description: str
+    self,
+    query: str,
+    description: str,
+    level: ValidationLevel = ValidationLevel.EXECUTE,
+    *,
+    count_only: bool = False,
   ) -> QueryExecution:
     logger.debug("Start %s.", description)
-    q: Queue = _MP_CTX.Queue()
-    ready_queue: Queue = _MP_CTX.Queue()
-
-    p = _MP_CTX.Process(
-      target=_run_pyspark_query_worker,
-      args=(query, q, self.worker_input, ready_queue),
-    )
-    p.start()
-    logger.debug("PySpark worker process started (pid=%s).", p.pid)
-
-    ready_queue.get()
-    logger.debug(
-      "Spark session ready, starting %ss query timeout (pid=%s).",
-      self.timeout_seconds,
-      p.pid,
-    )
-
-    p.join(self.timeout_seconds)
-
-    if p.is_alive():
-      logger.warning(
-        "%s exceeded %s seconds; process terminated.",
-        description,
-        self.timeout_seconds,
-      )
-      p.terminate()
-      p.join(5)
-      if p.is_alive():
-        p.kill()
-        p.join()
-      return QueryExecution(
-        result=None,
-        exception=TimeoutError(
-          f"PySpark query exceeded {self.timeout_seconds}s"
-        ),
-        timed_out=True,
-      )
-
-    execution = (
-      q.get()
-      if not q.empty()
-      else QueryExecution(
-        result=None,
-        exception=Exception("No result returned from PySpark worker."),
-        timed_out=False,
-      )
+    execution = self.worker.execute(
+      query, description, level, count_only=count_only
     )
-
     logger.debug(
       "%s finished with timed_out=%s, exception=%s",
       description,
       execution.timed_out,
       execution.exception,
     )
-
     return execution
 
-  def is_query_valid(self, query: str) -> tuple[bool, Exception | None]:
-    execution = self._execute_with_timeout(query, "PySpark query validation")
+  def settings_fingerprint(self) -> str:
+    return (
+      f"{type(self).__name__}(timeout={self.timeout_seconds}, "
+      f"limit={self.limit_output_size})"
+    )
+
+  def start_workers(self) -> None:
+    self.worker.start()
+
+  def close(self) -> None:
+    """Stop the worker process and the persistent session."""
+    self.worker.stop()
+    if self._spark is not None:
+      self._spark.stop()
+      self._spark = None
+
+  def is_query_valid(
+    self, query: str, level: ValidationLevel = ValidationLevel.EXECUTE
+  ) -> tuple[bool, Exception | None]:
+    """Validate a query at the given level.
+
+    Parsing uses Spark's SQL parser and planning resolves the analyzed and
+    optimized logical plans, so neither launches a Spark job; analysis
+    errors such as unknown tables or columns are returned right away.
+    Only the execute level runs the query.
+    """
+    execution = self._execute_with_timeout(
+      query, f"PySpark query validation ({level})", level
+    )
     if execution.exception:
       return False, execution.exception
     return True, None
 
   def get_query_output_size(self, query: str) -> tuple[int | None, bool]:
     execution = self._execute_with_timeout(
-      query, "PySpark output size calculation"
+      query, "PySpark output size calculation", count_only=True
     )
-    result = len(execution.result) if execution.result is not None else None
+    result = execution.row_count
     logger.debug("Query exception: %s", execution.exception)
     return result, execution.timed_out
 
+  def get_query_output_size_and_error(
+    self, query: str
+  ) -> tuple[int | None, Exception | None]:
+    execution = self._execute_with_timeout(
+      query, "PySpark output size calculation", count_only=True
+    )
+    return execution.row_count, execution.exception
+
+  def _get_spark(self) -> SparkSession:
+    with self._spark_lock:
+      if self._spark is None:
+        self._spark = _create_spark_session(
+          self.parquet_path, self.worker_input.session_settings
+        )
+      return self._spark
+
   def get_synthetic_query_cardinality(self, query: str) -> int:
     """Run a COUNT(*) query and return its scalar result.
 
     Uses a persistent SparkSession — no new process per call. Timeout via
-    Spark job group cancellation. Returns -1 on error or timeout.
+    Spark job group cancellation. It is thread safe, up to
+    `concurrent_jobs` queries run at the same time, each in its own
+    scheduler pool. Returns -1 on error or timeout.
     """
-    if self._spark is None:
-      os.environ["SPARK_HOME"] = pyspark.__path__[0]
-      logging.getLogger("py4j").setLevel(logging.INFO)
-      self._spark = (
-        SparkSession.builder.master("local[*]")
-        .appName("query-validator")
-        .config("spark.ui.showConsoleProgress", "false")
-        .config("spark.log.level", "WARN")
-        .getOrCreate()
-      )
-      base = Path(self.parquet_path)
-      for table_dir in sorted(base.iterdir()):
-        if table_dir.is_dir():
-          table = self._spark.read.parquet(str(table_dir))
-          table.createOrReplaceTempView(table_dir.name)
-
-    job_group = str(uuid.uuid4())
-    q: Queue = Queue()
-    t = threading.Thread(
-      target=_run_persistent_spark_query,
-      args=(self._spark, query, job_group, q),
-      daemon=True,
-    )
-    t.start()
-    t.join(self.timeout_seconds)
-    if t.is_alive():
-      self._spark.sparkContext.cancelJobGroup(job_group)
-      t.join()
-      logger.debug(
-        "Cardinality query timed out after %ss | query: %s",
-        self.timeout_seconds,
-        query,
+    spark = self._get_spark()
+    pool = self._pools.get()
+    try:
+      job_group = str(uuid.uuid4())
+      q: queue.Queue[int] = queue.Queue()
+      t = threading.Thread(
+        target=_run_persistent_spark_query,
+        args=(spark, query, job_group, pool, q),
+        daemon=True,
       )
-      return -1
-    return q.get() if not q.empty() else -1
+      t.start()
+      t.join(self.timeout_seconds)
+      if t.is_alive():
+        spark.sparkContext.cancelJobGroup(job_group)
+        t.join()
+        logger.debug(
+          "Cardinality query timed out after %ss | query: %s",
+          self.timeout_seconds,
+          query,
+        )
+        return -1
+      return q.get() if not q.empty() else -1
+    finally:
+      self._pools.put(pool)
@@ -1,17 +1,42 @@
 from abc import ABC, abstractmethod
 
+from query_generator.utils.definitions import (
+  ParameterizedQuery,
+  ValidationLevel,
+)
+
 
 class QueryValidator(ABC):
   """Abstract base class for query validators."""
 
   @abstractmethod
-  def is_query_valid(self, query: str) -> tuple[bool, Exception | None]:
-    """Validate a query. Returns (is_valid, exception_or_none)."""
+  def is_query_valid(
+    self, query: str, level: ValidationLevel = ValidationLevel.EXECUTE
+  ) -> tuple[bool, Exception | None]:
+    """Validate a query. Returns (is_valid, exception_or_none).
+
+    `level` selects how far the query is taken: parsed, planned or executed.
+    """
 
   @abstractmethod
   def get_query_output_size(self, query: str) -> tuple[int | None, bool]:
     """Get query output row count. Returns (row_count_or_none, timed_out)."""
 
+  def get_query_output_size_and_error(
+    self, query: str
+  ) -> tuple[int | None, Exception | None]:
+    """Like `get_query_output_size`, with the exception of a failure.
+
+    Returns (row_count_or_none, exception_or_none). A timeout is reported
+    as a `TimeoutError`. The default cannot tell why a query failed and
+    returns (None, None) then; validators that keep the exception override
+    it.
+    """
+    output_size, timed_out = self.get_query_output_size(query)
+    if timed_out:
+      return None, TimeoutError(query)
+    return output_size, None
+
   @abstractmethod
   def get_synthetic_query_cardinality(self, query: str) -> int:
     """Run a COUNT(*) query and return its scalar result.
@@ -19,3 +44,28 @@ class QueryValidator(ABC):
     Uses a persistent connection — no new process per call. Returns -1 on
     error or timeout.
     """
+
+  def get_parameterized_query_cardinality(
+    self, query: str, parameterized: ParameterizedQuery
+  ) -> int:
+    """Like `get_synthetic_query_cardinality` for a parameterized query.
+
+    `query` is the rendered SQL of `parameterized`. Validators that support
+    prepared statements execute the template with the bound literals; the
+    default runs the rendered query.
+    """
+    return self.get_synthetic_query_cardinality(query)
+
+  def settings_fingerprint(self) -> str:
+    """Describe the settings that can change the validation results."""
+    return type(self).__name__
+
+  def start_workers(self) -> None:  # noqa: B027
+    """Start the processes that run the queries ahead of the first query.
+
+    Validators that start them lazily override it, so that callers timing
+    the queries do not measure the start-up.
+    """
+
+  def close(self) -> None:  # noqa: B027
+    """Release the resources held by the validator."""
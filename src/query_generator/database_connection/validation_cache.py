@@ -0,0 +1,272 @@
+"""Disk-backed cache of validation results.
+
+LLM retries, reruns of a configuration and the batch flow often submit the
+same SQL again. `CachedQueryValidator` wraps any `QueryValidator` and stores
+the outcome of `is_query_valid` and `get_query_output_size` in a SQLite
+file, keyed by a hash of the normalized query, a fingerprint of the
+database files and the validator settings.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import sqlparse
+
+from query_generator.database_connection.query_validator_abc import (
+  QueryValidator,
+)
+from query_generator.utils.definitions import (
+  ParameterizedQuery,
+  ValidationLevel,
+)
+from query_generator.utils.exceptions import (
+  DuckDBTimeoutError,
+  WorkerCrashedError,
+)
+
+logger = logging.getLogger(__name__)
+
+# Fraction of `max_entries` kept after an eviction, so eviction does not
+# run again on the next insert.
+EVICTION_TARGET = 0.9
+# Errors that depend on the machine load rather than on the query.
+TIMEOUT_ERRORS = (DuckDBTimeoutError, TimeoutError)
+TRANSIENT_ERRORS = (*TIMEOUT_ERRORS, WorkerCrashedError)
+
+
+def normalize_query(query: str) -> str:
+  """Strip comments, redundant whitespace and trailing semicolons."""
+  formatted = sqlparse.format(query, strip_comments=True, strip_whitespace=True)
+  return formatted.strip().rstrip(";").strip()
+
+
+def database_fingerprint(database_path: str) -> str:
+  """Fingerprint a database file or a directory of parquet files.
+
+  It changes whenever a file is added, removed, resized or modified.
+  """
+  path = Path(database_path)
+  files = (
+    sorted(p for p in path.rglob("*") if p.is_file())
+    if path.is_dir()
+    else [path]
+  )
+  digest = hashlib.sha256(str(path.resolve()).encode())
+  for file in files:
+    if not file.exists():
+      continue
+    stat = file.stat()
+    digest.update(f"{file}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+  return digest.hexdigest()
+
+
+@dataclass
+class CachedValidation:
+  """One cached validation outcome."""
+
+  valid: bool
+  exception: str
+  output_size: int | None
+  elapsed_seconds: float
+
+
+class ValidationCache:
+  """SQLite table of validation outcomes with least-recently-used eviction."""
+
+  def __init__(self, cache_path: str, max_entries: int = 100_000) -> None:
+    Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._con = sqlite3.connect(cache_path, timeout=30, check_same_thread=False)
+    self._con.execute("PRAGMA journal_mode=WAL;")
+    self._con.execute("""
+      CREATE TABLE IF NOT EXISTS validation_cache (
+        key TEXT PRIMARY KEY,
+        valid INTEGER NOT NULL,
+        exception TEXT NOT NULL,
+        output_size INTEGER,
+        elapsed_seconds REAL NOT NULL,
+        last_used REAL NOT NULL
+      )
+    """)
+    self._con.execute(
+      "CREATE INDEX IF NOT EXISTS idx_last_used ON validation_cache (last_used)"
+    )
+    self._con.commit()
+    self._entries: int = self._con.execute(
+      "SELECT COUNT(*) FROM validation_cache"
+    ).fetchone()[0]
+
+  def get(self, key: str) -> CachedValidation | None:
+    with self._lock:
+      row = self._con.execute(
+        "SELECT valid, exception, output_size, elapsed_seconds "
+        "FROM validation_cache WHERE key = ?",
+        (key,),
+      ).fetchone()
+      if row is None:
+        return None
+      self._con.execute(
+        "UPDATE validation_cache SET last_used = ? WHERE key = ?",
+        (time.time(), key),
+      )
+      self._con.commit()
+    return CachedValidation(
+      valid=bool(row[0]),
+      exception=row[1],
+      output_size=row[2],
+      elapsed_seconds=row[3],
+    )
+
+  def put(self, key: str, value: CachedValidation) -> None:
+    with self._lock:
+      exists = self._con.execute(
+        "SELECT 1 FROM validation_cache WHERE key = ?", (key,)
+      ).fetchone()
+      self._con.execute(
+        "INSERT OR REPLACE INTO validation_cache VALUES (?, ?, ?, ?, ?, ?)",
+        (
+          key,
+          int(value.valid),
+          value.exception,
+          value.output_size,
+          value.elapsed_seconds,
+          time.time(),
+        ),
+      )
+      if exists is None:
+        self._entries += 1
+      if self._entries > self.max_entries:
+        self._evict()
+      self._con.commit()
+
+  def _evict(self) -> None:
+    keep = int(self.max_entries * EVICTION_TARGET)
+    self._con.execute(
+      "DELETE FROM validation_cache WHERE key NOT IN ("
+      "SELECT key FROM validation_cache ORDER BY last_used DESC LIMIT ?)",
+      (keep,),
+    )
+    self._entries = self._con.execute(
+      "SELECT COUNT(*) FROM validation_cache"
+    ).fetchone()[0]
+    logger.debug("Validation cache evicted down to %d entries.", self._entries)
+
+  def __len__(self) -> int:
+    return self._entries
+
+  def close(self) -> None:
+    with self._lock:
+      self._con.close()
+
+
+class CachedQueryValidator(QueryValidator):
+  """Serve repeated validations from a `ValidationCache`.
+
+  Timeouts, worker crashes and output sizes that failed for an unknown
+  reason are not cached since they may depend on the load of the machine.
+  With `bypass=True` the cache is never read, but fresh results are still
+  written to it.
+  """
+
+  def __init__(
+    self,
+    validator: QueryValidator,
+    database_path: str,
+    cache: ValidationCache,
+    *,
+    bypass: bool = False,
+  ) -> None:
+    self.validator = validator
+    self.cache = cache
+    self.bypass = bypass
+    self._prefix = (
+      f"{database_fingerprint(database_path)}|"
+      f"{validator.settings_fingerprint()}"
+    )
+
+  def _key(self, kind: str, query: str) -> str:
+    text = f"{self._prefix}|{kind}|{normalize_query(query)}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+  def _lookup(self, key: str) -> CachedValidation | None:
+    if self.bypass:
+      return None
+    cached = self.cache.get(key)
+    if cached is not None:
+      logger.debug(
+        "Validation cache hit (saved %.3fs).", cached.elapsed_seconds
+      )
+    return cached
+
+  def is_query_valid(
+    self, query: str, level: ValidationLevel = ValidationLevel.EXECUTE
+  ) -> tuple[bool, Exception | None]:
+    key = self._key(f"valid:{level}", query)
+    cached = self._lookup(key)
+    if cached is not None:
+      return cached.valid, None if cached.valid else Exception(cached.exception)
+
+    start = time.perf_counter()
+    valid, exception = self.validator.is_query_valid(query, level)
+    if not isinstance(exception, TRANSIENT_ERRORS):
+      self.cache.put(
+        key,
+        CachedValidation(
+          valid=valid,
+          exception=str(exception) if exception is not None else "",
+          output_size=None,
+          elapsed_seconds=time.perf_counter() - start,
+        ),
+      )
+    return valid, exception
+
+  def get_query_output_size(self, query: str) -> tuple[int | None, bool]:
+    key = self._key("output_size", query)
+    cached = self._lookup(key)
+    if cached is not None:
+      return cached.output_size, False
+
+    start = time.perf_counter()
+    output_size, exception = self.validator.get_query_output_size_and_error(
+      query
+    )
+    transient = isinstance(exception, TRANSIENT_ERRORS) or (
+      output_size is None and exception is None
+    )
+    if not transient:
+      self.cache.put(
+        key,
+        CachedValidation(
+          valid=output_size is not None,
+          exception=str(exception) if exception is not None else "",
+          output_size=output_size,
+          elapsed_seconds=time.perf_counter() - start,
+        ),
+      )
+    return output_size, isinstance(exception, TIMEOUT_ERRORS)
+
+  def get_synthetic_query_cardinality(self, query: str) -> int:
+    return self.validator.get_synthetic_query_cardinality(query)
+
+  def get_parameterized_query_cardinality(
+    self, query: str, parameterized: ParameterizedQuery
+  ) -> int:
+    return self.validator.get_parameterized_query_cardinality(
+      query, parameterized
+    )
+
+  def settings_fingerprint(self) -> str:
+    return self.validator.settings_fingerprint()
+
+  def start_workers(self) -> None:
+    self.validator.start_workers()
+
+  def close(self) -> None:
+    self.validator.close()
+    self.cache.close()
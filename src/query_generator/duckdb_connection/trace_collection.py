@@ -1,28 +1,59 @@
 """Collect DuckDB JSON profiles (full trace).
 
-- Runs each query in a separate process (robustness) **and** uses an in-process
-    timer to call `conn.interrupt()` for precise per-query timeouts.
-- Captures **DETAILED** JSON profile fully in memory using
-    `SET explain_output='json'; EXPLAIN ANALYZE <query>` (no temp files).
-- Output Parquet schema: (relative_path, query_folder, query_name, duckdb_trace)
+- Runs the queries on a pool of long-lived worker processes (robustness),
+    each keeping a read-only connection with profiling enabled; a timer in
+    the worker calls `conn.interrupt()` for precise per-query timeouts.
+- Captures the **DETAILED** JSON profile in memory with
+    `get_profiling_information`, or only the metrics the trace parser
+    reads (see `TraceProfilingMode`); JSON files are only written on
+    request.
+- Optionally measures the latency again with profiling off: warm-up runs,
+    then timed runs whose median, minimum and deviation are stored.
+- `DuckDBTraceScheduler` retries the queries that run out of memory on a
+    worker's share of the budget alone, with the whole budget.
+- The cache mode (see `TraceCacheMode`) fixes whether queries see warm or
+    cold caches, and is recorded in each row.
+- Rows are streamed to part files every `CHECKPOINT_FREQUENCY` rows and
+    compacted at the end (see `ParquetPartWriter`), so a run can resume.
+- Output Parquet schema: `TRACE_SCHEMA`.
 """
 
 from __future__ import annotations
 
 import contextlib
 import logging
+import os
+import shutil
+import statistics
 import threading
-from dataclasses import dataclass
+from collections.abc import Iterator
+from dataclasses import dataclass, field, replace
 from enum import StrEnum
-from multiprocessing import Process, Queue
 from pathlib import Path
-
-import duckdb
+from typing import Any
+
+import polars as pl
+
+from query_generator.database_connection.duckdb_validation import (
+  DuckDBWorkerPool,
+  QueryWorkerInput,
+  ResultFormat,
+  check_profiling_metrics,
+  fits_in_memory,
+)
+from query_generator.metrics.duckdb_parser import PARSER_PROFILING_METRICS
+from query_generator.utils.definitions import (
+  TraceCacheMode,
+  TraceProfilingMode,
+)
 
 logger = logging.getLogger(__name__)
 
 
 CHECKPOINT_FREQUENCY = 100  # Save Parquet every N queries
+DROP_CACHES_PATH = Path("/proc/sys/vm/drop_caches")
+# Start of the message of the DuckDB OutOfMemoryException.
+OUT_OF_MEMORY_ERROR = "Out of Memory Error"
 
 
 @dataclass
@@ -34,7 +65,16 @@ class DuckDBTraceParams:
   timeout_seconds: float
   fetch_limit: int
   output_folder: str
-  max_memory_gb: int
+  max_memory_gb: float
+  write_trace_files: bool = False
+  threads: int | None = None
+  in_memory: bool = False
+  warmup_runs: int = 0
+  timed_runs: int = 0
+  cache_mode: TraceCacheMode = TraceCacheMode.DEFAULT
+  drop_os_page_cache: bool = False
+  profiling_mode: TraceProfilingMode = TraceProfilingMode.DETAILED
+  extra_profiling_metrics: list[str] = field(default_factory=list)
 
   def get_queries_path(self) -> Path:
     """Get the queries path as a Path object."""
@@ -47,6 +87,13 @@ class DuckDBTraceParams:
   def get_output_path(self) -> Path:
     return Path(self.output_folder)
 
+  def get_profiling_metrics(self) -> tuple[str, ...] | None:
+    """DuckDB metrics to profile, None for the detailed mode."""
+    if self.profiling_mode == TraceProfilingMode.DETAILED:
+      return None
+    extras = [metric.upper() for metric in self.extra_profiling_metrics]
+    return tuple(dict.fromkeys([*PARSER_PROFILING_METRICS, *extras]))
+
 
 class DuckDBTraceEnum(StrEnum):
   """Rows for DuckDBTraceOuputDataFrameRow."""
@@ -58,6 +105,11 @@ class DuckDBTraceEnum(StrEnum):
   error = "error"
   trace_success = "trace_success"
   duckdb_output = "duckdb_output"
+  latency_runs_seconds = "latency_runs_seconds"
+  latency_median_seconds = "latency_median_seconds"
+  latency_min_seconds = "latency_min_seconds"
+  latency_stddev_seconds = "latency_stddev_seconds"
+  cache_mode = "cache_mode"
 
 
 @dataclass
@@ -71,150 +123,370 @@ class DuckDBTraceOuputDataFrameRow:
   error: str
   trace_success: bool
   duckdb_output: list[str]
-
-
-@dataclass
-class ExecutionQueueResult:
-  """Result of executing one query in a separate process.
-
-  Attributes:
-      ok (bool): Whether the execution was successful.
-      result (list[str]): The output rows from the query execution.
-      json_path (Path | None): The path to the JSON trace file, if successful.
-      error (str): The error message, if any.
+  latency_runs_seconds: list[float] = field(default_factory=list)
+  latency_median_seconds: float | None = None
+  latency_min_seconds: float | None = None
+  latency_stddev_seconds: float | None = None
+  cache_mode: str = TraceCacheMode.DEFAULT
+
+
+TRACE_SCHEMA = pl.Schema(
+  {
+    DuckDBTraceEnum.relative_path: pl.String,
+    DuckDBTraceEnum.query_folder: pl.String,
+    DuckDBTraceEnum.query_name: pl.String,
+    DuckDBTraceEnum.duckdb_trace: pl.String,
+    DuckDBTraceEnum.error: pl.String,
+    DuckDBTraceEnum.trace_success: pl.Boolean,
+    DuckDBTraceEnum.duckdb_output: pl.List(pl.String),
+    DuckDBTraceEnum.latency_runs_seconds: pl.List(pl.Float64),
+    DuckDBTraceEnum.latency_median_seconds: pl.Float64,
+    DuckDBTraceEnum.latency_min_seconds: pl.Float64,
+    DuckDBTraceEnum.latency_stddev_seconds: pl.Float64,
+    DuckDBTraceEnum.cache_mode: pl.String,
+  }
+)
+
+
+class ParquetPartWriter:
+  """Stream rows to numbered part files, then compact them into one file.
+
+  Rows are written to `<output>.parts/part-NNNNN.parquet` every
+  `flush_every` rows, so memory does not grow with the number of rows and a
+  crash loses at most `flush_every` rows. With `resume`, the parts of a
+  previous run (and its compacted output) are kept and included in the
+  final file; otherwise they are removed.
   """
 
-  ok: bool
-  result: list[str]
-  json_path: Path | None
-  error: str
+  def __init__(
+    self,
+    output_path: Path,
+    schema: pl.Schema,
+    flush_every: int = CHECKPOINT_FREQUENCY,
+    *,
+    resume: bool = False,
+  ) -> None:
+    self.output_path = output_path
+    self.parts_folder = output_path.with_name(f"{output_path.name}.parts")
+    self.schema = schema
+    self.flush_every = flush_every
+    self.resume = resume
+    self._rows: list[dict[str, Any]] = []
+    if not resume:
+      shutil.rmtree(self.parts_folder, ignore_errors=True)
+    self._next_part = len(self._part_files())
+
+  def _part_files(self) -> list[Path]:
+    return sorted(self.parts_folder.glob("part-*.parquet"))
+
+  def _written_files(self) -> list[Path]:
+    files = self._part_files()
+    if self.resume and self.output_path.exists():
+      files.insert(0, self.output_path)
+    return files
+
+  def _scan(self) -> pl.LazyFrame:
+    frames = [pl.scan_parquet(path) for path in self._written_files()]
+    if not frames:
+      return pl.LazyFrame(schema=self.schema)
+    rows = pl.concat(frames, how="diagonal_relaxed")
+    # An output of an older release may lack the newer columns.
+    columns = rows.collect_schema().names()
+    return rows.select(
+      pl.col(name).cast(dtype)
+      if name in columns
+      else pl.lit(None, dtype).alias(name)
+      for name, dtype in self.schema.items()
+    )
 
-  def get_trace(self) -> str:
-    """Get the trace content as a string, if available."""
-    if self.ok and self.json_path is not None and self.json_path.is_file():
-      return self.json_path.read_text()
-    return ""
-
-  def get_result(self) -> list[str]:
-    """Get the result rows."""
-    if self.ok:
-      return self.result
-    return []
-
-  def get_error(self) -> str:
-    """Get the error message, if any."""
-    if not self.ok:
-      return self.error
-    return ""
-
-
-def _profile_worker(
-  query: str,
-  query_path: Path,
-  params: DuckDBTraceParams,
-  out_q: Queue[ExecutionQueueResult],
-) -> None:
-  """Execute one SQL with DuckDB JSON profiling.
-
-  This mirrors the server pattern you shared: enable JSON profiling to a
-  concrete path, run the query (with `.show()`), then read the profile file
-  and send the JSON string via the queue. We still keep per‑query timeouts via
-  `conn.interrupt()`.
+  def written_values(self, column: str) -> set[Any]:
+    """Values of `column` in the rows written so far, by any run."""
+    self.flush()
+    return set(self._scan().select(column).collect()[column].to_list())
+
+  def append(self, row: dict[str, Any]) -> None:
+    self._rows.append(row)
+    if len(self._rows) >= self.flush_every:
+      self.flush()
+
+  def flush(self) -> None:
+    """Write the buffered rows to a new part file."""
+    if not self._rows:
+      return
+    self.parts_folder.mkdir(parents=True, exist_ok=True)
+    part = self.parts_folder / f"part-{self._next_part:05d}.parquet"
+    # Write then rename, so a crash never leaves a truncated part.
+    tmp = part.with_suffix(".tmp")
+    pl.DataFrame(self._rows, schema=self.schema).write_parquet(tmp)
+    tmp.replace(part)
+    self._next_part += 1
+    self._rows = []
+
+  def compact(self) -> None:
+    """Merge every part into `output_path` and remove the parts."""
+    self.flush()
+    tmp = self.output_path.with_name(f"{self.output_path.name}.tmp")
+    self._scan().sink_parquet(tmp)
+    tmp.replace(self.output_path)
+    shutil.rmtree(self.parts_folder, ignore_errors=True)
+
+
+def drop_os_page_cache() -> bool:
+  """Flush dirty pages and drop the Linux page cache.
+
+  Needs root. Returns whether the cache was dropped.
   """
-  base_path: Path = params.get_queries_path()
-  output_path: Path = params.get_output_path()
-  db_path: str = params.get_duckdb_path().as_posix()
-  timeout_seconds = float(params.timeout_seconds)
-  con = None
-  timer: threading.Timer | None = None
+  os.sync()
   try:
+    # 1 drops the page cache only, not dentries and inodes.
+    DROP_CACHES_PATH.write_text("1\n")
+  except OSError:
+    return False
+  return True
+
+
+class DuckDBTraceCollector:
+  """Profile queries on long-lived DuckDB worker processes.
+
+  Workers connect once, with profiling enabled, and send the rows and the
+  JSON profile back through their pipe, so collecting a trace costs about
+  as much as running the query. A worker is only respawned when it crashes
+  or hangs past the timeout. With `write_trace_files` the profiles are also
+  written to the DUCKDB_TRACES folder of the output folder. With
+  `in_memory` each worker loads the database into memory once, if it fits.
+
+  In the warm cache mode workers scan the tables of each query into their
+  buffer pool first, and traces whose scans failed are recorded with the
+  default cache mode; in the cold mode every query gets a fresh worker. In
+  the metrics profiling mode, unknown extra metrics raise ValueError here.
+  """
+
+  def __init__(self, params: DuckDBTraceParams, workers: int = 1) -> None:
+    self.params = params
+    in_memory = params.in_memory
+    if in_memory and not fits_in_memory(
+      params.duckdb_path, params.max_memory_gb
+    ):
+      logger.warning(
+        "Database %s does not fit in the %sGB memory limit of the workers; "
+        "falling back to reading it from disk.",
+        params.duckdb_path,
+        params.max_memory_gb,
+      )
+      in_memory = False
+    profiling_metrics = params.get_profiling_metrics()
+    if profiling_metrics is not None:
+      check_profiling_metrics(profiling_metrics)
+    self.worker_pool = DuckDBWorkerPool(
+      QueryWorkerInput(
+        database_path=params.get_duckdb_path().as_posix(),
+        memory_gb=params.max_memory_gb,
+        timeout_seconds=float(params.timeout_seconds),
+        limit_output_size=params.fetch_limit + 10,
+        in_memory=in_memory,
+        profiling=True,
+        profiling_metrics=profiling_metrics,
+        threads=params.threads,
+        warmup_runs=params.warmup_runs,
+        timed_runs=params.timed_runs,
+        prewarm_tables=params.cache_mode == TraceCacheMode.WARM,
+      ),
+      workers,
+      recycle_workers=params.cache_mode == TraceCacheMode.COLD,
+    )
+    self._drop_os_page_cache = (
+      params.cache_mode == TraceCacheMode.COLD and params.drop_os_page_cache
+    )
+
+  def _write_trace_file(self, sql_file: Path, trace: str) -> None:
     trace_file = (
-      output_path
+      self.params.get_output_path()
       / "DUCKDB_TRACES"
-      / query_path.relative_to(base_path).with_suffix(".json")
+      / sql_file.relative_to(self.params.get_queries_path()).with_suffix(
+        ".json"
+      )
     )
     trace_file.parent.mkdir(parents=True, exist_ok=True)
-
-    con = duckdb.connect(db_path, read_only=True)
-    # Match the detailed JSON profiling behavior
-    con.execute("PRAGMA profiling_mode='detailed';")
-    con.execute("PRAGMA enable_profiling=json;")
-    con.execute(f"PRAGMA profiling_output='{trace_file.as_posix()}';")
-    con.execute(f"SET memory_limit = '{params.max_memory_gb}GB';")
-    con.execute("SET enable_progress_bar = false;")
-    con.execute("SET enable_progress_bar_print = false;")
-    if timeout_seconds and timeout_seconds > 0:
-
-      def _interrupt() -> None:
-        with contextlib.suppress(Exception):
-          assert con is not None
-          con.interrupt()
-
-      timer = threading.Timer(timeout_seconds, _interrupt)
-      timer.daemon = True
-      timer.start()
-
-    # Execute the original text and force materialization/printing
-    cur = con.execute(query)
-    rows = cur.fetchmany(params.fetch_limit + 10)
-    result = [str(r) for r in rows]
-
-    out_q.put(
-      ExecutionQueueResult(
-        ok=True, result=result, json_path=trace_file, error=""
+    trace_file.write_text(trace)
+
+  def collect(self, sql: str, sql_file: Path) -> DuckDBTraceOuputDataFrameRow:
+    """Run `sql` under profiling and return its trace row."""
+    if self._drop_os_page_cache and not drop_os_page_cache():
+      logger.warning(
+        "Cannot drop the OS page cache (it needs root); cold traces only "
+        "start from a fresh process."
       )
+      self._drop_os_page_cache = False
+    execution = self.worker_pool.execute(
+      sql, f"Trace collection of {sql_file}", ResultFormat.PROFILE
     )
-  except Exception as e:
-    out_q.put(
-      ExecutionQueueResult(ok=False, result=[], json_path=None, error=str(e))
+    if execution.timed_out:
+      logger.error("Trace collection timeout. Query execution interrupted.")
+    ok = execution.exception is None
+    if ok and self.params.write_trace_files and execution.profile:
+      self._write_trace_file(sql_file, execution.profile)
+    return DuckDBTraceOuputDataFrameRow(
+      relative_path=str(sql_file.relative_to(self.params.get_queries_path())),
+      query_folder=sql_file.parent.name,
+      query_name=sql_file.stem,
+      duckdb_trace=execution.profile if ok else "",
+      duckdb_output=(execution.rows or []) if ok else [],
+      error="" if ok else str(execution.exception),
+      trace_success=ok,
+      # A failed prewarm leaves the caches as the previous queries left them.
+      cache_mode=(
+        TraceCacheMode.DEFAULT
+        if execution.prewarm_failed
+        else self.params.cache_mode
+      ),
     )
-  finally:
-    with contextlib.suppress(Exception):
-      assert timer is not None
-      assert con is not None
-      timer.cancel()
-      timer.join(timeout=0.1)
-      con.close()
-
-
-def duckdb_collect_one_trace(
-  sql: str, sql_file: Path, params: DuckDBTraceParams
-) -> DuckDBTraceOuputDataFrameRow:
-  """Get DuckDB traces for the queries and store them in a Parquet file.
-
-  Uses only the fields/methods provided by DuckDBTracesParams:
-      - queries_path, duckdb_path, timeout_seconds
+
+  @property
+  def measures_latency(self) -> bool:
+    return self.params.timed_runs > 0
+
+  def measure_latency(
+    self, trace: DuckDBTraceOuputDataFrameRow, sql: str, sql_file: Path
+  ) -> DuckDBTraceOuputDataFrameRow:
+    """Add the timed runs of `sql` to its trace.
+
+    The runs follow `warmup_runs` untimed runs on the same worker, which
+    is any idle worker of the pool, not necessarily the one that collected
+    the trace. If a run fails or times out, the trace is returned without
+    timings.
+    """
+    execution = self.worker_pool.execute(
+      sql, f"Latency measurement of {sql_file}", ResultFormat.TIMINGS
+    )
+    if execution.exception is not None or not execution.timings:
+      logger.warning(
+        "Latency measurement of %s failed: %s", sql_file, execution.exception
+      )
+      return trace
+    timings = execution.timings
+    return replace(
+      trace,
+      latency_runs_seconds=timings,
+      latency_median_seconds=statistics.median(timings),
+      latency_min_seconds=min(timings),
+      latency_stddev_seconds=(
+        statistics.stdev(timings) if len(timings) > 1 else 0.0
+      ),
+    )
+
+  def close(self) -> None:
+    """Stop the worker processes."""
+    self.worker_pool.close()
+
+
+class ExclusiveGate:
+  """Lets many shared holders or one exclusive holder in at a time.
+
+  A waiting exclusive holder blocks new shared holders, so it cannot be
+  starved by a steady stream of them.
   """
-  queries_path = Path(params.queries_path)
-
-  execution_output = ExecutionQueueResult(
-    ok=False, result=[], json_path=None, error=""
-  )
-  q: Queue[ExecutionQueueResult] = Queue()
-  p = Process(
-    target=_profile_worker,
-    args=(
-      sql,
-      sql_file,
-      params,
-      q,
-    ),
-  )
-  p.start()
-  p.join(params.timeout_seconds)
-
-  if p.is_alive():
-    logger.error("Trace collection timeout. Query execution interrupted.")
-    p.terminate()
-    p.join()
-  elif not q.empty():
-    execution_output: ExecutionQueueResult = q.get()
-  return DuckDBTraceOuputDataFrameRow(
-    relative_path=str(sql_file.relative_to(queries_path)),
-    query_folder=sql_file.parent.name,
-    query_name=sql_file.stem,
-    duckdb_trace=execution_output.get_trace(),
-    duckdb_output=execution_output.get_result(),
-    error=execution_output.get_error(),
-    trace_success=execution_output.ok,
-  )
+
+  def __init__(self) -> None:
+    self._condition = threading.Condition()
+    self._shared = 0
+    self._exclusive = False
+    self._exclusive_waiting = 0
+
+  @contextlib.contextmanager
+  def shared(self) -> Iterator[None]:
+    with self._condition:
+      self._condition.wait_for(
+        lambda: not self._exclusive and not self._exclusive_waiting
+      )
+      self._shared += 1
+    try:
+      yield
+    finally:
+      with self._condition:
+        self._shared -= 1
+        self._condition.notify_all()
+
+  @contextlib.contextmanager
+  def exclusive(self) -> Iterator[None]:
+    with self._condition:
+      self._exclusive_waiting += 1
+      self._condition.wait_for(
+        lambda: not self._exclusive and self._shared == 0
+      )
+      self._exclusive_waiting -= 1
+      self._exclusive = True
+    try:
+      yield
+    finally:
+      with self._condition:
+        self._exclusive = False
+        self._condition.notify_all()
+
+
+class DuckDBTraceScheduler:
+  """Trace queries concurrently without exceeding a memory budget.
+
+  Queries run on `shared`, whose workers split the memory and threads of
+  the machine. A query that runs out of memory on its share is retried
+  alone on `exclusive`, a single worker with the whole budget: it waits for
+  the running queries, the idle shared workers are stopped to free their
+  buffer pools, and new queries wait until it ends. Later runs of the same
+  query file (the LIMIT rerun, the latency runs) go to `exclusive` directly.
+  """
+
+  def __init__(
+    self, shared: DuckDBTraceCollector, exclusive: DuckDBTraceCollector
+  ) -> None:
+    self.shared = shared
+    self.exclusive = exclusive
+    self._gate = ExclusiveGate()
+    self._memory_heavy: set[Path] = set()
+    self._lock = threading.Lock()
+
+  @contextlib.contextmanager
+  def _exclusive_run(self) -> Iterator[None]:
+    with self._gate.exclusive():
+      self.shared.close()
+      try:
+        yield
+      finally:
+        self.exclusive.close()
+
+  def _is_memory_heavy(self, sql_file: Path) -> bool:
+    with self._lock:
+      return sql_file in self._memory_heavy
+
+  def collect(self, sql: str, sql_file: Path) -> DuckDBTraceOuputDataFrameRow:
+    """Trace `sql` on a shared worker, or alone if it needs more memory."""
+    if not self._is_memory_heavy(sql_file):
+      with self._gate.shared():
+        trace = self.shared.collect(sql, sql_file)
+      if not trace.error.startswith(OUT_OF_MEMORY_ERROR):
+        return trace
+      logger.info(
+        "%s ran out of memory on a shared worker; retrying it alone.",
+        sql_file,
+      )
+      with self._lock:
+        self._memory_heavy.add(sql_file)
+    with self._exclusive_run():
+      return self.exclusive.collect(sql, sql_file)
+
+  @property
+  def measures_latency(self) -> bool:
+    return self.shared.measures_latency
+
+  def measure_latency(
+    self, trace: DuckDBTraceOuputDataFrameRow, sql: str, sql_file: Path
+  ) -> DuckDBTraceOuputDataFrameRow:
+    """Time `sql` with the same kind of worker as its trace."""
+    if self._is_memory_heavy(sql_file):
+      with self._exclusive_run():
+        return self.exclusive.measure_latency(trace, sql, sql_file)
+    with self._gate.shared():
+      return self.shared.measure_latency(trace, sql, sql_file)
+
+  def close(self) -> None:
+    """Stop the worker processes."""
+    self.shared.close()
+    self.exclusive.close()
@@ -7,6 +7,9 @@ from typing import Any
 
 from tqdm import tqdm
 
+from query_generator.database_connection.duckdb_validation import (
+  WorkerPoolSettings,
+)
 from query_generator.database_connection.factory import build_query_validator
 from query_generator.database_connection.query_validator_abc import (
   QueryValidator,
@@ -25,8 +28,10 @@ from query_generator.extensions.llm_extension import (
   get_random_queries,
   log_not_valid_query,
   save_parquet,
+  validate_query,
   write_query_llm_and_get_row,
 )
+from query_generator.utils.definitions import ValidationLevel
 from query_generator.utils.params import LLMParams
 
 logger = logging.getLogger(__name__)
@@ -108,6 +113,7 @@ def _validate_results(
   metadata: dict[str, dict[str, Any]],
   query_validator: QueryValidator,
   round_num: int,
+  validation_level: ValidationLevel = ValidationLevel.EXECUTE,
 ) -> tuple[
   list[dict[str, Any]],
   list[dict[str, Any]],
@@ -180,7 +186,9 @@ def _validate_results(
       {"role": "assistant", "content": result.content}
     )
     sql = extract_sql(result.content)
-    valid, duckdb_exception = query_validator.is_query_valid(sql)
+    valid, duckdb_exception = validate_query(
+      query_validator, sql, validation_level
+    )
 
     if valid:
       valid_entries.append(
@@ -255,70 +263,84 @@ def batch_llm_extension(
     database_path=llm_params.engine_params.database_path,
     validation_timeout_seconds=llm_params.engine_params.validation_timeout_seconds,
     validator_engine=llm_params.engine_params.validator_engine,
+    cache_params=llm_params.engine_params.validation_cache,
+    pool_settings=WorkerPoolSettings(
+      in_memory=llm_params.engine_params.in_memory_database
+    ),
+    spark_params=llm_params.engine_params.spark,
   )
 
-  sampled_queries = get_random_queries(input_queries_base_path, llm_params)
-  requests, metadata = build_batch_requests(sampled_queries, llm_params)
+  try:
+    sampled_queries = get_random_queries(input_queries_base_path, llm_params)
+    requests, metadata = build_batch_requests(sampled_queries, llm_params)
 
-  # Set model on all requests (already set in build_batch_requests)
-  all_valid: list[dict[str, Any]] = []
-  all_logs: list[dict[str, Any]] = []
-  rows: list[dict[str, str]] = []
+    # Set model on all requests (already set in build_batch_requests)
+    all_valid: list[dict[str, Any]] = []
+    all_logs: list[dict[str, Any]] = []
+    rows: list[dict[str, str]] = []
 
-  current_requests = requests
-  current_metadata = metadata
+    current_requests = requests
+    current_metadata = metadata
 
-  for round_num in range(llm_params.retry + 1):
-    if not current_requests:
-      break
-
-    logger.info(
-      "Batch round %d: submitting %d requests.",
-      round_num,
-      len(current_requests),
-    )
+    for round_num in range(llm_params.retry + 1):
+      if not current_requests:
+        break
 
-    results = _submit_and_collect(
-      batch_client,
-      current_requests,
-      llm_params.batch_size,
-      llm_params.batch_poll_interval_seconds,
-      round_num,
-    )
+      logger.info(
+        "Batch round %d: submitting %d requests.",
+        round_num,
+        len(current_requests),
+      )
 
-    valid_entries, log_entries, retry_requests, retry_metadata = (
-      _validate_results(results, current_metadata, query_validator, round_num)
-    )
+      results = _submit_and_collect(
+        batch_client,
+        current_requests,
+        llm_params.batch_size,
+        llm_params.batch_poll_interval_seconds,
+        round_num,
+      )
 
-    # Save valid queries
-    for entry in valid_entries:
-      row = write_query_llm_and_get_row(
-        destination_path,
-        entry["extension_type"],
-        entry["idx"],
-        entry["original_path"],
-        entry["query"],
+      valid_entries, log_entries, retry_requests, retry_metadata = (
+        _validate_results(
+          results,
+          current_metadata,
+          query_validator,
+          round_num,
+          llm_params.engine_params.validation_level,
+        )
       )
-      row["retries"] = str(entry["retries"])
-      row["function_names"] = entry["function_names"]
-      rows.append(row)
 
-    all_valid.extend(valid_entries)
-    all_logs.extend(log_entries)
+      # Save valid queries
+      for entry in valid_entries:
+        row = write_query_llm_and_get_row(
+          destination_path,
+          entry["extension_type"],
+          entry["idx"],
+          entry["original_path"],
+          entry["query"],
+        )
+        row["retries"] = str(entry["retries"])
+        row["function_names"] = entry["function_names"]
+        rows.append(row)
+
+      all_valid.extend(valid_entries)
+      all_logs.extend(log_entries)
 
-    # Incremental save
-    save_parquet(destination_path / "llm_extension.parquet", rows)
-    save_parquet(destination_path / "logs.parquet", all_logs)
+      # Incremental save
+      save_parquet(destination_path / "llm_extension.parquet", rows)
+      save_parquet(destination_path / "logs.parquet", all_logs)
 
-    current_requests = retry_requests
-    current_metadata = retry_metadata
+      current_requests = retry_requests
+      current_metadata = retry_metadata
 
-    logger.info(
-      "Round %d: %d valid, %d to retry.",
-      round_num,
-      len(valid_entries),
-      len(retry_requests),
-    )
+      logger.info(
+        "Round %d: %d valid, %d to retry.",
+        round_num,
+        len(valid_entries),
+        len(retry_requests),
+      )
+  finally:
+    query_validator.close()
 
   logger.info("Total batch LLM queries generated: %d.", len(rows))
   return len(rows)
@@ -1,5 +1,9 @@
+import functools
 import logging
+import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from enum import StrEnum
 from pathlib import Path
 
@@ -10,13 +14,14 @@ from sqlglot import exp, parse_one
 from sqlglot.expressions import Expression
 from tqdm import tqdm
 
-from query_generator.database_connection.duckdb_validation import (
-  DuckDBQueryExecutor,
-)
 from query_generator.duckdb_connection.trace_collection import (
+  TRACE_SCHEMA,
+  DuckDBTraceCollector,
+  DuckDBTraceEnum,
   DuckDBTraceOuputDataFrameRow,
   DuckDBTraceParams,
-  duckdb_collect_one_trace,
+  DuckDBTraceScheduler,
+  ParquetPartWriter,
 )
 from query_generator.utils.exceptions import (
   ColumnNotFoundError,
@@ -26,6 +31,12 @@ from query_generator.utils.params import FixTransformEndpoint
 
 logger = logging.getLogger(__name__)
 CTE_NAME = "cte_for_limit"
+RANDOM_SEED = 42
+# Distinct query texts whose parse tree is kept.
+PARSE_CACHE_SIZE = 4096
+TRACES_FILE_NAME = "traces_duckdb.parquet"
+TRANSFORMATION_LOG_FILE_NAME = "transformation_log.parquet"
+TraceCollector = DuckDBTraceCollector | DuckDBTraceScheduler
 
 
 class TransformEnum(StrEnum):
@@ -38,6 +49,17 @@ class TransformEnum(StrEnum):
   new_query = "new_query"
 
 
+TRANSFORMATION_LOG_SCHEMA = pl.Schema(
+  {
+    TransformEnum.relative_path: pl.String,
+    TransformEnum.error_group_by_sqlglot: pl.String,
+    TransformEnum.original_query: pl.String,
+    TransformEnum.new_query: pl.String,
+    TransformEnum.was_transformed: pl.Boolean,
+  }
+)
+
+
 class TransformationCount(StrEnum):
   COUNT = "COUNT"
   MAX = "MAX "
@@ -88,20 +110,50 @@ def get_duckdb_schema(duckdb_database: str) -> dict[str, dict[str, str]]:
   return out
 
 
-def wrap_query_with_limit(sql: str, limit: int) -> str:
-  original: exp.Expression = parse_one(sql)
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(sql: str) -> exp.Expression:
+  return parse_one(sql)
+
+
+def parse_query(query: exp.ExpOrStr) -> exp.Expression:
+  """Parse a query, reusing the tree of an identical text parsed before.
+
+  Returns a copy that the caller may modify. Trees are returned as is.
+  """
+  if isinstance(query, exp.Expression):
+    return query
+  return _parse_cached(query).copy()
 
-  cte_alias = exp.TableAlias(this=exp.to_identifier(CTE_NAME))
-  cte = exp.CTE(this=original.copy(), alias=cte_alias)
-  with_clause = exp.With(expressions=[cte])
 
-  outer_select = exp.select("*").from_(exp.to_table(CTE_NAME)).limit(limit)
+def wrap_query_with_limit(query: exp.ExpOrStr, limit: int) -> str:
+  original = parse_query(query)
 
-  outer_select.set("with", with_clause)
+  outer_select = (
+    exp.select("*")
+    .from_(exp.to_table(CTE_NAME))
+    .limit(limit)
+    .with_(CTE_NAME, as_=original.copy())
+  )
 
   return outer_select.sql(pretty=True)
 
 
+def load_count_stars(params: FixTransformEndpoint) -> dict[str, int]:
+  """`count_star` of each query of the synthetic metadata, by relative path."""
+  if params.queries_metadata is None:
+    return {}
+  metadata = pl.read_parquet(
+    params.queries_metadata, columns=["relative_path", "count_star"]
+  )
+  return dict(
+    zip(
+      metadata["relative_path"].to_list(),
+      metadata["count_star"].to_list(),
+      strict=True,
+    )
+  )
+
+
 def get_only_columns_in_select(tree: Expression):
   cols = []
   select = tree.find(exp.Select)
@@ -138,11 +190,12 @@ def retrieve_column_name(table_dot_columns: list[str]) -> list[str]:
   return result
 
 
-def get_subquery(tree: exp.Expression, column: str) -> str:
-  select_values = get_select_attributes(tree)
-  for select_value in select_values:
-    if column in select_value:
-      return select_value
+def get_projection(tree: exp.Expression, column: str) -> exp.Expression:
+  select_clause = tree.find(exp.Select)
+  assert select_clause is not None
+  for projection in select_clause.expressions:
+    if "*" not in projection.sql() and column in projection.sql():
+      return projection
   raise ColumnNotFoundError(column)
 
 
@@ -157,16 +210,17 @@ def get_table_from_column(
 
 
 def change_select_attribute(
-  sql: str, sub_sql: str, new_column: str, old_column: str
-) -> str:
+  projection: exp.Expression, new_column: str, old_column: str
+) -> None:
   if any(
-    keyword in sub_sql.lower()
+    keyword in projection.sql().lower()
     for keyword in ["order by", "grouping(", " over "]
   ):
-    return sql
+    return
   old_column = old_column.split(".")[1] if "." in old_column else old_column
-  new_sub_sql = sub_sql.replace(old_column, new_column)
-  return sql.replace(sub_sql, new_sub_sql)
+  for column in projection.find_all(exp.Column):
+    if column.name == old_column:
+      column.set("this", exp.to_identifier(new_column))
 
 
 def get_repeated_columns(tree: exp.Expression) -> list[str]:
@@ -191,11 +245,10 @@ def get_different_column(
 
 
 def make_select_group_by_clause_disjoint(
-  query: str, schema: dict[str, dict[str, str]]
-) -> tuple[str, Exception | None]:
-  """Disjoint the select and group by clause."""
+  tree: exp.Expression, schema: dict[str, dict[str, str]]
+) -> Exception | None:
+  """Disjoint the select and group by clause, modifying `tree`."""
   try:
-    tree = parse_one(query)
     if tree.find(exp.Group) is not None:
       for repeated_column in get_repeated_columns(tree):
         table = get_table_from_column(repeated_column, schema)
@@ -207,31 +260,47 @@ def make_select_group_by_clause_disjoint(
           get_group_by_attributes(tree),
           schema,
         )
-        sub_sql = get_subquery(tree, repeated_column)
-        query = change_select_attribute(
-          query, sub_sql, new_column, repeated_column
+        change_select_attribute(
+          get_projection(tree, repeated_column), new_column, repeated_column
         )
   except Exception as e:
     logger.warning("Failed to make select and group by disjoint")
-    logger.debug(f"Query that failed:\n{query}", exc_info=True)
-    return query, e
-  return query, None
+    logger.debug(f"Query that failed:\n{tree.sql()}", exc_info=True)
+    return e
+  return None
 
 
-def get_transformation(*, is_numeric: bool) -> TransformationCount:
+def get_transformation(
+  *, is_numeric: bool, rng: random.Random | None = None
+) -> TransformationCount:
   possibilites = [TransformationCount.COUNT, TransformationCount.DISTINCT]
   if is_numeric:
     possibilites.append(TransformationCount.MIN)
     possibilites.append(TransformationCount.MAX)
-  return random.choice(possibilites)
+  return (rng or random).choice(possibilites)
+
 
+def query_rng(relative_path: Path) -> random.Random:
+  """Random generator of one query, seeded by its path.
 
-def replace_min_max(sql: str, schema: dict[str, dict[str, str]]) -> str:
-  root = parse_one(sql)
+  The random transformations of a query do not depend on the order in
+  which the queries are processed.
+  """
+  return random.Random(f"{RANDOM_SEED}:{relative_path.as_posix()}")
+
+
+def replace_min_max(
+  tree: exp.Expression,
+  schema: dict[str, dict[str, str]],
+  rng: random.Random | None = None,
+) -> None:
+  """Replace COUNT with MIN/MAX/DISTINCT/COUNT randomly, modifying `tree`.
 
-  select = root.find(exp.Select)
+  `tree` is left unchanged if the transformation fails.
+  """
+  select = tree.find(exp.Select)
   if not select:
-    return root.sql()
+    return
 
   def transformer(node: exp.Expression) -> exp.Expression:  # noqa: PLR0911
     if not isinstance(node, exp.Count):
@@ -255,7 +324,7 @@ def replace_min_max(sql: str, schema: dict[str, dict[str, str]]) -> str:
     is_numeric = any(
       keyword in schema[table][name.lower()] for keyword in ["INT", "DECIMAL"]
     )
-    transformation = get_transformation(is_numeric=is_numeric)
+    transformation = get_transformation(is_numeric=is_numeric, rng=rng)
     if transformation == TransformationCount.COUNT:
       return node
     if transformation == TransformationCount.DISTINCT:
@@ -273,181 +342,360 @@ def replace_min_max(sql: str, schema: dict[str, dict[str, str]]) -> str:
     [proj.transform(transformer) for proj in select.expressions],
   )
 
-  return root.sql(pretty=True)
 
+@dataclass
+class WorkerResources:
+  """Share of the machine given to each DuckDB worker process."""
 
-def get_trace_from_transform(
-  query: str, query_path: Path, params: FixTransformEndpoint
-) -> tuple[DuckDBTraceOuputDataFrameRow, bool]:
-  """Try to get trace from transformed query, if fails, fall back to original.
+  memory_gb: float
+  threads: int | None
+
+
+def get_worker_resources(params: FixTransformEndpoint) -> WorkerResources:
+  """Split `max_memory_gb` and `max_threads` among the running queries.
+
+  `max_threads` defaults to the cores of the machine. With a single worker
+  and no `max_threads`, DuckDB keeps its default number of threads.
+  """
+  if params.workers <= 1:
+    return WorkerResources(
+      memory_gb=params.max_memory_gb, threads=params.max_threads
+    )
+  total_threads = params.max_threads or os.cpu_count() or 1
+  if params.workers > total_threads:
+    logger.warning(
+      f"{params.workers} workers share {total_threads} threads; "
+      "each still gets one thread, so the cores are oversubscribed."
+    )
+  return WorkerResources(
+    memory_gb=params.max_memory_gb / params.workers,
+    threads=max(1, total_threads // params.workers),
+  )
+
+
+def get_trace_collector(params: FixTransformEndpoint) -> TraceCollector:
+  """Collector of the traces of `fix_transform`.
 
-  Returns the trace and whether the transformed query was successful.
+  With `serialize_memory_heavy_queries` and several workers, queries that
+  run out of memory on their share are retried alone with the whole budget
+  (see `DuckDBTraceScheduler`).
   """
+  resources = get_worker_resources(params)
+  measurement = params.latency_measurement
   trace_params = DuckDBTraceParams(
     queries_path=params.queries_folder,
     duckdb_path=params.duckdb_database,
     timeout_seconds=params.timeout_seconds,
     fetch_limit=params.max_output_size,
     output_folder=params.destination_folder,
-    max_memory_gb=params.max_memory_gb,
+    max_memory_gb=resources.memory_gb,
+    write_trace_files=params.write_trace_files,
+    threads=resources.threads,
+    in_memory=params.in_memory_database,
+    warmup_runs=measurement.warmup_runs if measurement else 0,
+    timed_runs=measurement.timed_runs if measurement else 0,
+    cache_mode=params.trace_cache_mode,
+    drop_os_page_cache=params.drop_os_page_cache,
+    profiling_mode=params.trace_profiling_mode,
+    extra_profiling_metrics=params.extra_profiling_metrics,
   )
+  shared = DuckDBTraceCollector(trace_params, params.workers)
+  if not params.serialize_memory_heavy_queries or params.workers <= 1:
+    return shared
+  exclusive_params = replace(
+    trace_params, max_memory_gb=params.max_memory_gb, threads=params.max_threads
+  )
+  return DuckDBTraceScheduler(shared, DuckDBTraceCollector(exclusive_params))
+
+
+def get_trace_from_transform(
+  query: str,
+  query_path: Path,
+  trace_collector: TraceCollector,
+  known_traces: dict[str, DuckDBTraceOuputDataFrameRow],
+) -> tuple[DuckDBTraceOuputDataFrameRow, bool]:
+  """Try to get trace from transformed query, if fails, fall back to original.
 
-  trace = duckdb_collect_one_trace(query, query_path, trace_params)
+  The original query is only run again if its trace is not in
+  `known_traces`. Returns the trace and whether the transformed query was
+  successful.
+  """
+  trace = trace_collector.collect(query, query_path)
   if trace.trace_success:
     return trace, True
   # Transformation failed, fall back to previous query
   logger.info("Transformation failed, falling back to original query trace.")
-  return duckdb_collect_one_trace(
-    query_path.read_text(), query_path, trace_params
-  ), False
+  original_query = query_path.read_text()
+  if original_query in known_traces:
+    return known_traces[original_query], False
+  return trace_collector.collect(original_query, query_path), False
 
 
 def apply_transformation_make_group_by_disjoint(
-  query: str, schema: dict[str, dict[str, str]], *, apply_transformation: bool
-) -> tuple[str, Exception | None]:
+  tree: exp.Expression,
+  schema: dict[str, dict[str, str]],
+  *,
+  apply_transformation: bool,
+) -> Exception | None:
   if not apply_transformation:
     logger.debug("Skipping make group by disjoint transformation.")
-    return query, None
-  query, exception = make_select_group_by_clause_disjoint(query, schema)
-  return query, exception
+    return None
+  return make_select_group_by_clause_disjoint(tree, schema)
 
 
 def apply_replace_min_max(
-  sql: str, schema: dict[str, dict[str, str]], *, apply_transformation: bool
-) -> str:
+  tree: exp.Expression,
+  schema: dict[str, dict[str, str]],
+  rng: random.Random | None = None,
+  *,
+  apply_transformation: bool,
+) -> None:
   """Replace COUNT with MIN/MAX/DISTINCT/COUNT randomly.
 
-  If apply_transformation is False, it returns the original sql.
-  If the transformation fails, it returns the original sql."""
+  If apply_transformation is False, or the transformation fails, the tree
+  is left unchanged."""
   if not apply_transformation:
     logger.debug("Skipping replace min/max transformation.")
-    return sql
+    return
   try:
-    return replace_min_max(sql, schema)
+    replace_min_max(tree, schema, rng)
   except Exception:
     logger.info("Failed to replace min/max transformation.")
-    logger.debug("Query that failed:\n%s", sql, exc_info=True)
-    return sql
+    logger.debug("Query that failed:\n%s", tree.sql(), exc_info=True)
 
 
-def apply_output_size_transformation(
+@dataclass
+class TransformedQuery:
+  """A query after the sqlglot transformations.
+
+  `tree` is the parse tree of `sql`, or None when the query could not be
+  parsed.
+  """
+
+  sql: str
+  tree: exp.Expression | None
+  exception_group_by: Exception | None
+
+
+def transform_query(
   query: str,
-  query_executor: DuckDBQueryExecutor,
+  schema: dict[str, dict[str, str]],
+  rng: random.Random,
+  params: FixTransformEndpoint,
+) -> TransformedQuery:
+  """Apply the enabled transformations to one parse tree of the query.
+
+  The tree is rendered back to SQL once, and only if a transformation is
+  enabled, so untransformed queries keep their original text.
+  """
+  try:
+    tree = parse_query(query)
+  except Exception as e:
+    logger.warning("Failed to parse query, it is not transformed.")
+    logger.debug(f"Query that failed:\n{query}", exc_info=True)
+    exception = e if params.make_select_group_by_disjoint else None
+    return TransformedQuery(sql=query, tree=None, exception_group_by=exception)
+  exception_group_by = apply_transformation_make_group_by_disjoint(
+    tree, schema, apply_transformation=params.make_select_group_by_disjoint
+  )
+  apply_replace_min_max(
+    tree,
+    schema,
+    rng,
+    apply_transformation=params.make_count_statement_diverse,
+  )
+  transformed = (
+    params.make_select_group_by_disjoint or params.make_count_statement_diverse
+  )
+  return TransformedQuery(
+    sql=tree.sql(pretty=True) if transformed else query,
+    tree=tree,
+    exception_group_by=exception_group_by,
+  )
+
+
+def apply_output_size_transformation(
+  query: TransformedQuery,
+  trace: DuckDBTraceOuputDataFrameRow,
   params: FixTransformEndpoint,
   query_path: Path,
 ) -> str | None:
   """Wrap query with limit if output size exceeds limit
 
+  The output size is the number of rows fetched while collecting the trace
+  of the query, which is capped a few rows above the limit.
+
   When queries give empty result set as answer, if the filter
   `filter_empty_set` is True, we ignore the query.
 
-  When the output size is non positive, it returns the original query.
+  When the limit is non positive, it returns the original query.
   When the output size exceeds the limit, it wraps the query with a limit.
   When the output size is within the limit, it returns the original query.
   """
   upper_limit = params.max_output_size
-  if upper_limit <= 0 and not params.filter_empty_set:
-    return query
-
-  logger.debug(f"Getting output size for query {query_path}.")
-  output_size, timeout = query_executor.get_query_output_size(query)
+  output_size = len(trace.duckdb_output)
   logger.debug(f"Output size for query {query_path}: {output_size} ")
-  if output_size is None:
-    if not timeout:
-      logger.error(f"Failed to get output size for query {query_path}.")
-    else:
-      logger.info(f"Timeout while getting output size for query {query_path}.")
-    return None
 
   if output_size == 0 and params.filter_empty_set:
     logger.info(f"Skipping query {query_path} due to empty result set.")
     return None
-  if output_size > upper_limit:
+  if upper_limit > 0 and output_size > upper_limit:
     try:
-      return wrap_query_with_limit(query, upper_limit)
+      return wrap_query_with_limit(query.tree or query.sql, upper_limit)
     except Exception:
       logger.exception(
         f"Failed to wrap query {query_path} with limit {upper_limit}"
       )
-      logger.debug(f"Original query:\n{query}", exc_info=True)
+      logger.debug(f"Original query:\n{query.sql}", exc_info=True)
       return None
-  return query
+  return query.sql
 
 
-def fix_transform(params: FixTransformEndpoint) -> None:
-  """Add LIMIT to sql queries according to output size."""
-  random.seed(42)
-  queries_folder: Path = Path(params.queries_folder)
-  destination_folder = Path(params.destination_folder)
-  queries_paths = list(queries_folder.glob("**/*.sql"))
-  query_executor = DuckDBQueryExecutor(
-    params.duckdb_database,
-    params.timeout_seconds,
-    params.max_memory_gb,
-    params.max_output_size,
+def process_query(
+  query_path: Path,
+  params: FixTransformEndpoint,
+  schema: dict[str, dict[str, str]],
+  trace_collector: TraceCollector,
+  count_stars: dict[str, int],
+) -> tuple[DuckDBTraceOuputDataFrameRow, dict[str, str | bool]] | None:
+  """Transform one query, write it and collect its trace.
+
+  The transformed query is run once under profiling, which gives both its
+  output size and its trace. Only queries whose output exceeds
+  `max_output_size` are run a second time, wrapped with a LIMIT. With
+  `filter_empty_set`, queries whose `count_star` is 0 are skipped without
+  running them.
+
+  Returns the trace and the transformation log row, or None when the
+  query is skipped.
+  """
+  logger.debug(f"Processing query: {query_path}")
+  queries_folder = Path(params.queries_folder)
+  relative_path = query_path.relative_to(queries_folder)
+  if params.filter_empty_set and count_stars.get(str(relative_path)) == 0:
+    logger.info(f"Skipping query {query_path} due to a count_star of 0.")
+    return None
+  original_query = query_path.read_text()
+  # Apply transformations
+  transformed = transform_query(
+    original_query, schema, query_rng(relative_path), params
   )
-  rows = []
+  query = transformed.sql
 
-  schema = get_duckdb_schema(params.duckdb_database)
-  traces = []
-  for query_path in tqdm(queries_paths, total=len(queries_paths)):  # type: ignore
-    logger.debug(f"Processing query: {query_path}")
-    query = query_path.read_text()
-    # Apply transformations
-    query, exception_group_by = apply_transformation_make_group_by_disjoint(
-      query, schema, apply_transformation=params.make_select_group_by_disjoint
-    )
-    query = apply_replace_min_max(
-      query, schema, apply_transformation=params.make_count_statement_diverse
+  logger.debug("Starting trace collection.")
+  trace = trace_collector.collect(query, query_path)
+  if not trace.trace_success:
+    logger.info(f"Failed to run query {query_path}: {trace.error}")
+    return None
+  limited_query = apply_output_size_transformation(
+    transformed, trace, params, query_path
+  )
+  if limited_query is None:
+    return None
+  transformation_success = True
+  if limited_query != query:
+    trace, transformation_success = get_trace_from_transform(
+      limited_query, query_path, trace_collector, {query: trace}
     )
-    query = apply_output_size_transformation(
-      query, query_executor, params, query_path
+    query = limited_query
+  logger.debug("Trace collection finished.")
+
+  if not transformation_success:
+    # If transformation failed, we revert to original query
+    query = original_query
+  if not trace.trace_success:
+    logger.warning(
+      f"Trace collection failed for query: {query_path}. Skipping."
     )
-    if query is None:
-      continue
+    return None
+  if trace_collector.measures_latency:
+    trace = trace_collector.measure_latency(trace, query, query_path)
+
+  new_query_path = Path(params.destination_folder) / relative_path
+  new_query_path.parent.mkdir(parents=True, exist_ok=True)
+  new_query_path.write_text(query)
+  return trace, {
+    TransformEnum.relative_path: str(relative_path),
+    TransformEnum.error_group_by_sqlglot: str(transformed.exception_group_by)
+    if transformed.exception_group_by is not None
+    else "",
+    TransformEnum.original_query: original_query,
+    TransformEnum.new_query: query,
+    TransformEnum.was_transformed: transformation_success,
+  }
 
-    logger.debug("Starting trace collection.")
-    trace, transformation_success = get_trace_from_transform(
-      query, query_path, params
+
+def fix_transform(params: FixTransformEndpoint) -> None:
+  """Add LIMIT to sql queries according to output size.
+
+  With `workers` > 1 the queries are processed by that many threads, each
+  running its queries on its own DuckDB worker process. Results keep the
+  order of the queries and do not depend on the number of workers.
+
+  Traces and transformation rows are streamed to part files while the
+  queries run. With `resume`, the queries already traced by a previous run
+  of the same destination folder are skipped.
+  """
+  queries_folder: Path = Path(params.queries_folder)
+  destination_folder = Path(params.destination_folder)
+  destination_folder.mkdir(parents=True, exist_ok=True)
+  traces_writer = ParquetPartWriter(
+    destination_folder / TRACES_FILE_NAME, TRACE_SCHEMA, resume=params.resume
+  )
+  log_writer = ParquetPartWriter(
+    destination_folder / TRANSFORMATION_LOG_FILE_NAME,
+    TRANSFORMATION_LOG_SCHEMA,
+    resume=params.resume,
+  )
+  queries_paths = sorted(queries_folder.glob("**/*.sql"))
+  if params.resume:
+    traced = traces_writer.written_values(DuckDBTraceEnum.relative_path)
+    queries_paths = [
+      path
+      for path in queries_paths
+      if str(path.relative_to(queries_folder)) not in traced
+    ]
+    logger.info(
+      f"Resuming: {len(traced)} queries already traced, "
+      f"{len(queries_paths)} left."
     )
-    logger.debug("Trace collection finished.")
-
-    if not transformation_success:
-      # If transformation failed, we revert to original query
-      query = query_path.read_text()
-    if not trace.trace_success:
-      logger.warning(
-        f"Trace collection failed for query: {query_path}. Skipping."
-      )
-      continue
-
-    traces.append(trace)
-    new_query_path = destination_folder / query_path.relative_to(queries_folder)
-    new_query_path.parent.mkdir(parents=True, exist_ok=True)
-    new_query_path.write_text(query)
-    rows.append(
-      {
-        TransformEnum.relative_path: str(
-          Path(query_path).relative_to(queries_folder)
+  trace_collector = get_trace_collector(params)
+  schema = get_duckdb_schema(params.duckdb_database)
+  count_stars = load_count_stars(params)
+
+  try:
+    with ThreadPoolExecutor(
+      params.workers, thread_name_prefix="fix-transform"
+    ) as executor:
+      results = executor.map(
+        lambda query_path: process_query(
+          query_path, params, schema, trace_collector, count_stars
         ),
-        TransformEnum.error_group_by_sqlglot: str(exception_group_by)
-        if exception_group_by is not None
-        else "",
-        TransformEnum.original_query: query_path.read_text(),
-        TransformEnum.new_query: query,
-        TransformEnum.was_transformed: transformation_success,
-      }
-    )
-  df_traces = pl.DataFrame([unstructure(t) for t in traces])
-  df_traces.write_parquet(destination_folder / "traces_duckdb.parquet")
-  df_transformation = pl.DataFrame(rows)
-  df_transformation.write_parquet(
-    destination_folder / "transformation_log.parquet"
-  )
+        queries_paths,
+      )
+      for result in tqdm(results, total=len(queries_paths)):
+        if result is None:
+          continue
+        trace, row = result
+        traces_writer.append(unstructure(trace))
+        log_writer.append(row)
+  finally:
+    trace_collector.close()
+    traces_writer.flush()
+    log_writer.flush()
+  traces_writer.compact()
+  log_writer.compact()
+
   logger.info(f"Total queries processed: {len(queries_paths)}.")
-  logger.info(
-    f"Total queries succesfully transformed: {
-      df_transformation.filter(pl.col(TransformEnum.was_transformed)).height
-    }."
+  transformed = (
+    pl.scan_parquet(log_writer.output_path)
+    .filter(pl.col(TransformEnum.was_transformed))
+    .select(pl.len())
+    .collect()
+    .item()
+  )
+  logger.info(f"Total queries succesfully transformed: {transformed}.")
+  traces = (
+    pl.scan_parquet(traces_writer.output_path).select(pl.len()).collect().item()
   )
-  logger.info(f"Total traces collected: {df_traces.height}.")
+  logger.info(f"Total traces collected: {traces}.")
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import random
 import re
@@ -8,6 +9,12 @@ from typing import Any
 import polars as pl
 from tqdm import tqdm
 
+from query_generator.database_connection.async_validator import (
+  AsyncQueryValidator,
+)
+from query_generator.database_connection.duckdb_validation import (
+  WorkerPoolSettings,
+)
 from query_generator.database_connection.factory import build_query_validator
 from query_generator.database_connection.query_validator_abc import (
   QueryValidator,
@@ -17,6 +24,7 @@ from query_generator.extensions.llm_clients import (
   LLMClientFactory,
 )
 from query_generator.tools.format_histogram import get_histogram_as_str
+from query_generator.utils.definitions import ValidationLevel
 from query_generator.utils.params import (
   LLMParams,
 )
@@ -41,7 +49,7 @@ class QueryProcessor:
   llm_client_factory: LLMClientFactory
   llm_config_params: str
   llm_params: LLMParams
-  query_validator: QueryValidator
+  query_validator: AsyncQueryValidator
   schema_context: str
 
 
@@ -209,6 +217,30 @@ def get_schema_from_statistics(
   return get_histogram_as_str(df_stats)
 
 
+def validate_query(
+  query_validator: QueryValidator, query: str, level: ValidationLevel
+) -> tuple[bool, Exception | None]:
+  """Validate a query at `level`, then execute it as the acceptance check.
+
+  Cheaper levels catch syntax and binder errors without running the query;
+  only queries that pass them are executed.
+  """
+  valid, exception = query_validator.is_query_valid(query, level)
+  if not valid or level == ValidationLevel.EXECUTE:
+    return valid, exception
+  return query_validator.is_query_valid(query, ValidationLevel.EXECUTE)
+
+
+async def validate_query_async(
+  query_validator: AsyncQueryValidator, query: str, level: ValidationLevel
+) -> tuple[bool, Exception | None]:
+  """Awaitable version of `validate_query`."""
+  valid, exception = await query_validator.is_query_valid(query, level)
+  if not valid or level == ValidationLevel.EXECUTE:
+    return valid, exception
+  return await query_validator.is_query_valid(query, ValidationLevel.EXECUTE)
+
+
 def log_not_valid_query(duckdb_exception: Exception | None, query: str) -> None:
   logger.warning(
     f"Generated query is not valid. Exception:\n{
@@ -266,12 +298,16 @@ class QueryResult:
     }
 
 
-def process_single_query(
+async def process_single_query(
   processor: QueryProcessor,
   cnt: int,
   sampled: SampledQuery,
 ) -> QueryResult:
-  """Run LLM + retry loop for one query. Returns the outcome."""
+  """Run LLM + retry loop for one query. Returns the outcome.
+
+  The LLM call runs in a thread and the validation on the validator pool,
+  so other queries progress while this one waits.
+  """
   llm_client = processor.llm_client_factory.build()
   messages = get_random_prompt(
     processor.llm_params,
@@ -289,11 +325,15 @@ def process_single_query(
     if attempt > 0:
       add_retry_query_to_messages(messages, duckdb_exception)
     logger.info("Starting query #%d, attempt #%d", cnt, attempt + 1)
-    llm_client.query(messages, processor.llm_config_params)
+    await asyncio.to_thread(
+      llm_client.query, messages, processor.llm_config_params
+    )
     logger.debug("LLM response received.")
     llm_extracted_query = extract_sql(messages[-1]["content"])
-    valid_query, duckdb_exception = processor.query_validator.is_query_valid(
-      llm_extracted_query
+    valid_query, duckdb_exception = await validate_query_async(
+      processor.query_validator,
+      llm_extracted_query,
+      processor.llm_params.engine_params.validation_level,
     )
     if valid_query:
       break
@@ -313,6 +353,55 @@ def process_single_query(
   )
 
 
+async def process_queries(
+  processor: QueryProcessor,
+  sampled_queries: list[SampledQuery],
+  destination_path: Path,
+) -> int:
+  """Process the sampled queries, up to `concurrent_queries` at a time.
+
+  Results are saved as they complete, in the order of `sampled_queries`
+  whatever the order in which they complete. Returns the number of valid
+  queries.
+  """
+  llm_params = processor.llm_params
+  slots = asyncio.Semaphore(llm_params.concurrent_queries)
+  rows: dict[int, dict[str, Any]] = {}
+  log_rows: dict[int, dict[str, Any]] = {}
+
+  async def run(cnt: int, sampled: SampledQuery) -> tuple[int, QueryResult]:
+    async with slots:
+      return cnt, await process_single_query(processor, cnt, sampled)
+
+  tasks = [run(cnt, sampled) for cnt, sampled in enumerate(sampled_queries)]
+  for task in tqdm(  # type:ignore
+    asyncio.as_completed(tasks),
+    desc="LLM-Extension",
+    total=len(sampled_queries),
+  ):
+    cnt, result = await task
+
+    if result.valid:
+      logger.debug("Generated a valid query.")
+      rows[cnt] = result.to_row(destination_path)
+    else:
+      logger.error(
+        "Failed to generate a valid query after %d retries.",
+        llm_params.retry,
+      )
+
+    log_rows[cnt] = result.to_log_row()
+    save_parquet(
+      destination_path / "llm_extension.parquet",
+      [rows[i] for i in sorted(rows)],
+    )
+    save_parquet(
+      destination_path / "logs.parquet",
+      [log_rows[i] for i in sorted(log_rows)],
+    )
+  return len(rows)
+
+
 def llm_extension(
   llm_params: LLMParams,
   llm_client_factory: LLMClientFactory,
@@ -330,38 +419,31 @@ def llm_extension(
     database_path=llm_params.engine_params.database_path,
     validation_timeout_seconds=llm_params.engine_params.validation_timeout_seconds,
     validator_engine=llm_params.engine_params.validator_engine,
+    cache_params=llm_params.engine_params.validation_cache,
+    pool_settings=WorkerPoolSettings(
+      workers=llm_params.concurrent_queries,
+      in_memory=llm_params.engine_params.in_memory_database,
+    ),
+    spark_params=llm_params.engine_params.spark,
+  )
+  async_validator = AsyncQueryValidator(
+    query_validator, llm_params.concurrent_queries
   )
 
   processor = QueryProcessor(
     llm_client_factory=llm_client_factory,
     llm_config_params=llm_config_params,
     llm_params=llm_params,
-    query_validator=query_validator,
+    query_validator=async_validator,
     schema_context=get_schema_from_statistics(llm_params),
   )
-  rows: list[dict[str, str]] = []
-  log_rows: list[dict[str, Any]] = []
   sampled_queries = get_random_queries(input_queries_base_path, llm_params)
+  try:
+    total = asyncio.run(
+      process_queries(processor, sampled_queries, destination_path)
+    )
+  finally:
+    async_validator.close()
 
-  for cnt, sampled in tqdm(  # type:ignore
-    enumerate(sampled_queries),
-    desc="LLM-Extension",
-    total=len(sampled_queries),
-  ):
-    result = process_single_query(processor, cnt, sampled)
-
-    if result.valid:
-      logger.debug("Generated a valid query.")
-      rows.append(result.to_row(destination_path))
-    else:
-      logger.error(
-        "Failed to generate a valid query after %d retries.",
-        llm_params.retry,
-      )
-
-    log_rows.append(result.to_log_row())
-    save_parquet(destination_path / "llm_extension.parquet", rows)
-    save_parquet(destination_path / "logs.parquet", log_rows)
-
-  logger.info("Total LLM queries generated: %d.", len(rows))
-  return len(rows)
+  logger.info("Total LLM queries generated: %d.", total)
+  return total
@@ -5,6 +5,9 @@ from typing import Annotated
 import duckdb
 import typer
 
+from query_generator.database_connection.duckdb_validation import (
+  WorkerPoolSettings,
+)
 from query_generator.database_connection.factory import build_query_validator
 from query_generator.duckdb_connection.setup import generate_db
 from query_generator.extensions.batch_llm_extension import batch_llm_extension
@@ -30,7 +33,9 @@ from query_generator.tools.histograms import (
   make_redundant_histograms,
   query_histograms,
 )
+from query_generator.tools.validator_benchmark import benchmark_validators
 from query_generator.utils.params import (
+  BenchmarkValidatorsEndpoint,
   ExtensionBatchEndpoint,
   ExtensionOnlineEndpoint,
   FilterEndpoint,
@@ -175,13 +180,21 @@ def synthetic_queries(
     database_path=params.engine.validation_database_path,
     validation_timeout_seconds=params.engine.validation_timeout_seconds,
     validator_engine=params.engine.validator_engine,
-  )
-  generate_synthetic_queries(
-    SyntheticQueriesParams(
-      validator=validator,
-      user_input=params,
+    pool_settings=WorkerPoolSettings(
+      cardinality_cursors=params.engine.concurrent_queries,
+      duckdb_threads=params.engine.duckdb_threads,
     ),
+    spark_params=params.engine.spark,
   )
+  try:
+    generate_synthetic_queries(
+      SyntheticQueriesParams(
+        validator=validator,
+        user_input=params,
+      ),
+    )
+  finally:
+    validator.close()
 
 
 @app.command("filter-synthetic", help=build_help_from_dataclass(FilterEndpoint))
@@ -377,8 +390,29 @@ def add_limit_endpoint(
       flag_value=True,
     ),
   ] = False,
+  workers: Annotated[
+    int | None,
+    typer.Option(
+      "--workers",
+      "-w",
+      help="Number of queries processed at the same time. "
+      "Overrides `workers` of the configuration file.",
+    ),
+  ] = None,
+  resume: Annotated[
+    bool | None,
+    typer.Option(
+      "--resume/--no-resume",
+      help="Skip the queries already traced in the destination folder. "
+      "Overrides `resume` of the configuration file.",
+    ),
+  ] = None,
 ) -> None:
   params = read_and_parse_toml(Path(config_file), FixTransformEndpoint)
+  if workers is not None:
+    params.workers = workers
+  if resume is not None:
+    params.resume = resume
   default_logger(
     params.destination_folder, debug_file=debug, file_name="fix_transform.log"
   )
@@ -418,5 +452,43 @@ def get_metrics_endpoint(
   (Path(params.output_folder) / "metrics_config.toml").write_text(toml_params)
 
 
+@app.command(
+  "benchmark-validators",
+  help=build_help_from_dataclass(BenchmarkValidatorsEndpoint),
+)
+def benchmark_validators_endpoint(
+  config_file: Annotated[
+    str,
+    typer.Option(
+      "--config",
+      "-c",
+      help="The path to the configuration file of the benchmark",
+    ),
+  ],
+  *,
+  debug: Annotated[
+    bool,
+    typer.Option(
+      "-d",
+      "--debug",
+      help="Enable debug logging to file",
+      is_flag=True,
+      flag_value=True,
+    ),
+  ] = False,
+) -> None:
+  """Replay sampled queries through the validators and report throughput,
+  latency percentiles, timeout rate and peak memory."""
+  params = read_and_parse_toml(Path(config_file), BenchmarkValidatorsEndpoint)
+  default_logger(
+    params.output_folder,
+    debug_file=debug,
+    file_name="benchmark_validators.log",
+  )
+  benchmark_validators(params)
+  toml_params = get_toml_from_params(params)
+  (Path(params.output_folder) / "benchmark_config.toml").write_text(toml_params)
+
+
 if __name__ == "__main__":
   main()
@@ -19,6 +19,19 @@ from query_generator.metrics.function_classifier import (
 
 logger = logging.getLogger(__name__)
 
+# DuckDB profiling metrics read by `DuckDBTraceParser`, in the names of the
+# `custom_profiling_settings` setting.
+PARSER_PROFILING_METRICS = (
+  "QUERY_NAME",
+  "LATENCY",
+  "ROWS_RETURNED",
+  "CUMULATIVE_CARDINALITY",
+  "CUMULATIVE_ROWS_SCANNED",
+  "OPERATOR_TYPE",
+  "OPERATOR_CARDINALITY",
+  "EXTRA_INFO",
+)
+
 
 class DuckDBPhysicalOperators(StrEnum):
   """List of all duckdb physical operators."""
@@ -1,11 +1,12 @@
 import random
+import re
 from collections.abc import Iterator
 from typing import Any
 
 from pypika import OracleQuery, Table
 from pypika import functions as fn
 from pypika.queries import QueryBuilder
-from pypika.terms import Criterion
+from pypika.terms import Criterion, Parameter, ValueWrapper
 
 from query_generator.database_schemas.schemas import get_schema
 
@@ -30,6 +31,7 @@ from query_generator.synthetic_queries.predicate_generator import (
 from query_generator.utils.definitions import (
   GeneratedPredicateTypes,
   GeneratedQueryFeatures,
+  ParameterizedQuery,
   PredicateParameters,
   SyntheticQueryGenerationParameters,
 )
@@ -63,6 +65,17 @@ def _build_predicate_tree(
   return remaining[0]
 
 
+PLACEHOLDER_PATTERN = re.compile(r"\$(\d+)")
+
+
+def render_parameterized_query(parameterized: ParameterizedQuery) -> str:
+  """Replace the `$n` placeholders of the template with their literals."""
+  return PLACEHOLDER_PATTERN.sub(
+    lambda match: parameterized.literals[int(match.group(1)) - 1],
+    parameterized.template,
+  )
+
+
 class QueryBuilderPypika:
   def __init__(
     self,
@@ -70,8 +83,13 @@ class QueryBuilderPypika:
     # TODO(Gabriel): http://localhost:8080/tktview/b9400c203a38f3aef46ec250d98563638ba7988b
     tables_schema: Any,
     predicate_params: PredicateParameters,
+    *,
+    parameterized: bool = False,
   ) -> None:
     self.sub_graph_gen = subgraph_generator
+    self.parameterized = parameterized
+    # SQL literals of the placeholders of the last `add_predicates` call.
+    self.literals: list[str] = []
     self.table_to_pypika_table = {
       i: Table(i, alias=tables_schema[i]["alias"]) for i in tables_schema
     }
@@ -120,6 +138,7 @@ class QueryBuilderPypika:
   ) -> tuple[QueryBuilder, GeneratedPredicateTypes]:
     subgraph_tables = self.get_subgraph_tables(subgraph)
     predicate_types = GeneratedPredicateTypes()
+    self.literals = []
     criteria: list[Criterion] = []
     for predicate in self.predicate_gen.get_random_predicates(
       subgraph_tables,
@@ -146,10 +165,18 @@ class QueryBuilderPypika:
       query = query.where(tree)  # type: ignore
     return query, predicate_types
 
+  def _bind(self, value: SupportedHistogramType) -> Any:
+    """Return the value, or a placeholder for it in parameterized mode."""
+    if not self.parameterized:
+      return value
+    self.literals.append(ValueWrapper(value).get_sql())
+    return Parameter(f"${len(self.literals)}")
+
   def _cast_if_needed(
     self, value: SupportedHistogramType, dtype: HistogramDataType
   ) -> Any:
     """Cast the value to the appropriate type if needed."""
+    value = self._bind(value)
     if dtype == HistogramDataType.DATE:
       return fn.Cast(value, "date")
     return value
@@ -170,7 +197,7 @@ class QueryBuilderPypika:
     """Build an equality criterion: col = value."""
     return (  # type: ignore
       self.table_to_pypika_table[predicate.table][predicate.column]
-      == predicate.equality_value
+      == self._bind(predicate.equality_value)
     )
 
   def _build_criterion_in(self, predicate: PredicateIn) -> Criterion:
@@ -182,7 +209,7 @@ class QueryBuilderPypika:
   def _build_criterion_like(self, predicate: PredicateLike) -> Criterion:
     """Build a LIKE criterion: col LIKE pattern."""
     return self.table_to_pypika_table[predicate.table][predicate.column].like(  # type: ignore
-      predicate.pattern
+      self._bind(predicate.pattern)
     )
 
   def _build_criterion_not_like(self, predicate: PredicateNotLike) -> Criterion:
@@ -190,7 +217,7 @@ class QueryBuilderPypika:
     return self.table_to_pypika_table[predicate.table][
       predicate.column
     ].not_like(  # type: ignore
-      predicate.pattern
+      self._bind(predicate.pattern)
     )
 
 
@@ -210,6 +237,7 @@ class QueryGenerator:
       self.subgraph_generator,
       self.tables_schema,
       params.predicate_parameters,
+      parameterized=params.parameterized,
     )
 
   def generate_queries(self) -> Iterator[GeneratedQueryFeatures]:
@@ -227,8 +255,13 @@ class QueryGenerator:
             query,
           )
 
+          sql = query.get_sql()  # type: ignore
+          parameterized = None
+          if self.params.parameterized:
+            parameterized = ParameterizedQuery(sql, self.query_builder.literals)
+            sql = render_parameterized_query(parameterized)
           yield GeneratedQueryFeatures(
-            query=query.get_sql(),  # type: ignore
+            query=sql,
             template_number=cnt,
             predicate_number=idx,
             fact_table=fact_table,
@@ -237,4 +270,5 @@ class QueryGenerator:
             subgraph_signature=self.foreign_key_graph.get_subgraph_signature(
               subgraph
             ),
+            parameterized=parameterized,
           )
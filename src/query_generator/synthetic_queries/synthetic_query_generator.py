@@ -1,10 +1,12 @@
+import contextlib
 import logging
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from itertools import product
+from itertools import islice, product
 from pathlib import Path
-from typing import Any
 
-import polars as pl
 from tqdm import tqdm
 
 from query_generator.database_connection.query_validator_abc import (
@@ -13,9 +15,14 @@ from query_generator.database_connection.query_validator_abc import (
 from query_generator.synthetic_queries.query_builder import (
   QueryGenerator,
 )
+from query_generator.synthetic_queries.utils.query_metadata import (
+  SyntheticBatchSettings,
+  SyntheticQueriesMetadata,
+)
 from query_generator.synthetic_queries.utils.query_writer import Writer
 from query_generator.utils.definitions import (
   BatchGeneratedQueryToWrite,
+  GeneratedQueryFeatures,
   PredicateParameters,
   SyntheticQueryGenerationParameters,
 )
@@ -26,6 +33,9 @@ from query_generator.utils.params import (
 
 logger = logging.getLogger(__name__)
 
+# Queries generated ahead and evaluated together by the executor.
+CARDINALITY_CHUNK_SIZE = 256
+
 
 @dataclass
 class SyntheticQueriesParams:
@@ -55,6 +65,41 @@ def get_total_iterations(search_params: SyntheticQueriesEndpoint) -> int:
   )
 
 
+def get_cardinality(
+  validator: QueryValidator, query: GeneratedQueryFeatures
+) -> int:
+  """Cardinality of a generated query, prepared when it is parameterized."""
+  if query.parameterized is None:
+    return validator.get_synthetic_query_cardinality(query.query)
+  return validator.get_parameterized_query_cardinality(
+    query.query, query.parameterized
+  )
+
+
+def evaluate_cardinalities(
+  validator: QueryValidator,
+  queries: Iterable[GeneratedQueryFeatures],
+  executor: ThreadPoolExecutor | None,
+) -> Iterator[tuple[GeneratedQueryFeatures, int]]:
+  """Pair each query with its cardinality, keeping the generation order.
+
+  Without an executor queries are evaluated one by one as they are
+  generated. With an executor they are evaluated concurrently, in chunks
+  of `CARDINALITY_CHUNK_SIZE`, so only one chunk is kept in memory.
+  """
+  if executor is None:
+    for query in queries:
+      yield query, get_cardinality(validator, query)
+    return
+  query_iterator = iter(queries)
+  while chunk := list(islice(query_iterator, CARDINALITY_CHUNK_SIZE)):
+    yield from zip(
+      chunk,
+      executor.map(lambda q: get_cardinality(validator, q), chunk),
+      strict=True,
+    )
+
+
 def generate_synthetic_queries(
   params: SyntheticQueriesParams,
 ) -> None:
@@ -66,102 +111,109 @@ def generate_synthetic_queries(
 
   """
   writer = Writer(params.user_input.output_folder)
-  rows: list[dict[str, str | int | float]] = []
+  metadata = SyntheticQueriesMetadata()
   total_iterations = get_total_iterations(params.user_input)
   batch_number = 0
   seen_subgraphs: dict[int, bool] = {}
-  for (
-    max_hops,
-    extra_predicates,
-    row_retention_probability,
-    equality_lower_bound_probability,
-    keep_edge_probability,
-    minimum_like_support_probability,
-    or_probability,
-  ) in tqdm(  # type: ignore
-    product(
-      params.user_input.max_hops,
-      params.user_input.extra_predicates,
-      params.user_input.row_retention_probability,
-      params.user_input.equality_lower_bound_probability,
-      params.user_input.keep_edge_probability,
-      params.user_input.minimum_like_support_probability,
-      params.user_input.or_probability,
-    ),
-    total=total_iterations,
-    desc="Batch",
-  ):
-    logger.debug(f"Processing batch {batch_number}")
-    batch_number += 1
-    query_generator = QueryGenerator(
-      SyntheticQueryGenerationParameters(
-        dataset=params.user_input.dataset,
+  concurrent_queries = params.user_input.engine.concurrent_queries
+  evaluated_queries = 0
+  start = time.perf_counter()
+  with (
+    ThreadPoolExecutor(concurrent_queries)
+    if concurrent_queries > 1
+    else contextlib.nullcontext()
+  ) as executor:
+    for (
+      max_hops,
+      extra_predicates,
+      row_retention_probability,
+      equality_lower_bound_probability,
+      keep_edge_probability,
+      minimum_like_support_probability,
+      or_probability,
+    ) in tqdm(  # type: ignore
+      product(
+        params.user_input.max_hops,
+        params.user_input.extra_predicates,
+        params.user_input.row_retention_probability,
+        params.user_input.equality_lower_bound_probability,
+        params.user_input.keep_edge_probability,
+        params.user_input.minimum_like_support_probability,
+        params.user_input.or_probability,
+      ),
+      total=total_iterations,
+      desc="Batch",
+    ):
+      logger.debug(f"Processing batch {batch_number}")
+      batch_number += 1
+      query_generator = QueryGenerator(
+        SyntheticQueryGenerationParameters(
+          dataset=params.user_input.dataset,
+          max_hops=max_hops,
+          max_queries_per_fact_table=params.user_input.max_signatures_per_fact_table,
+          max_queries_per_signature=params.user_input.max_queries_per_signature,
+          keep_edge_probability=keep_edge_probability,
+          seen_subgraphs=seen_subgraphs,
+          parameterized=params.user_input.engine.prepared_statements,
+          predicate_parameters=PredicateParameters(
+            histogram_path=Path(params.user_input.histogram_path),
+            extra_predicates=extra_predicates,
+            row_retention_probability=row_retention_probability,
+            operator_weights=params.user_input.operator_weights,
+            equality_lower_bound_probability=equality_lower_bound_probability,
+            extra_values_for_in=params.user_input.extra_values_for_in,
+            minimum_like_support_probability=minimum_like_support_probability,
+            or_probability=or_probability,
+          ),
+        )
+      )
+      batch_settings = SyntheticBatchSettings(
+        batch_number=batch_number,
         max_hops=max_hops,
-        max_queries_per_fact_table=params.user_input.max_signatures_per_fact_table,
-        max_queries_per_signature=params.user_input.max_queries_per_signature,
+        extra_predicates=extra_predicates,
+        row_retention_probability=row_retention_probability,
+        equality_lower_bound_probability=equality_lower_bound_probability,
         keep_edge_probability=keep_edge_probability,
-        seen_subgraphs=seen_subgraphs,
-        predicate_parameters=PredicateParameters(
-          histogram_path=Path(params.user_input.histogram_path),
-          extra_predicates=extra_predicates,
-          row_retention_probability=row_retention_probability,
-          operator_weights=params.user_input.operator_weights,
-          equality_lower_bound_probability=equality_lower_bound_probability,
-          extra_values_for_in=params.user_input.extra_values_for_in,
-          minimum_like_support_probability=minimum_like_support_probability,
-          or_probability=or_probability,
-        ),
-      )
-    )
-    for query in query_generator.generate_queries():
-      selected_rows = params.validator.get_synthetic_query_cardinality(
-        query.query
       )
-      if selected_rows == -1:
-        logger.debug("Query skipped (validator returned -1):\n%s", query.query)
-        continue  # invalid query
-
-      relative_path = writer.write_query_to_batch(
-        BatchGeneratedQueryToWrite(
-          batch_number=batch_number,
-          fact_table=query.fact_table,
-          template_number=query.template_number,
-          predicate_number=query.predicate_number,
-          query=query.query,
+      for query, selected_rows in evaluate_cardinalities(
+        params.validator, query_generator.generate_queries(), executor
+      ):
+        evaluated_queries += 1
+        if selected_rows == -1:
+          logger.debug(
+            "Query skipped (validator returned -1):\n%s", query.query
+          )
+          continue  # invalid query
+
+        relative_path = writer.write_query_to_batch(
+          BatchGeneratedQueryToWrite(
+            batch_number=batch_number,
+            fact_table=query.fact_table,
+            template_number=query.template_number,
+            predicate_number=query.predicate_number,
+            query=query.query,
+          )
         )
-      )
-      # Adds query to the DataFrame
-      rows.append(
-        {
-          "relative_path": relative_path,
-          "count_star": selected_rows,
-          "batch_number": batch_number,
-          "template_number": query.template_number,
-          "predicate_number": query.predicate_number,
-          "extra_predicates": extra_predicates,
-          "fact_table": query.fact_table,
-          "max_hops": max_hops,
-          "row_retention_probability": row_retention_probability,
-          "equality_lower_bound_probability": equality_lower_bound_probability,
-          "total_subgraph_edges": query.total_subgraph_edges,
-          "predicates_range": query.generated_predicate_types.range,
-          "predicates_in_values": query.generated_predicate_types.in_values,
-          "predicates_equality": query.generated_predicate_types.equality,
-          "keep_edge_probability": keep_edge_probability,
-          # instead of bigint, lets do str
-          "subgraph_signature": str(query.subgraph_signature),
-        },
-      )
-    # Update the seen subgraphs with the new ones
-    if params.user_input.unique_joins:
-      seen_subgraphs = query_generator.subgraph_generator.seen_subgraphs
-    checkpoint_queries_parquet(rows, writer)
-  checkpoint_queries_parquet(rows, writer)
-  logger.info(f"Total queries generated: {len(rows)}.")
+        metadata.append(relative_path, selected_rows, batch_settings, query)
+      # Update the seen subgraphs with the new ones
+      if params.user_input.unique_joins:
+        seen_subgraphs = query_generator.subgraph_generator.seen_subgraphs
+      checkpoint_queries_parquet(metadata, writer)
+  checkpoint_queries_parquet(metadata, writer)
+  elapsed = time.perf_counter() - start
+  logger.info(f"Total queries generated: {len(metadata)}.")
+  logger.info(
+    "Evaluated %d queries in %.1fs (%.1f queries/s, %d concurrent).",
+    evaluated_queries,
+    elapsed,
+    evaluated_queries / elapsed if elapsed > 0 else 0.0,
+    concurrent_queries,
+  )
   toml_params = get_toml_from_params(params.user_input)
   writer.write_toml(toml_params)
 
 
-def checkpoint_queries_parquet(rows: list[Any], query_writer: Writer) -> None:
-  df_queries = pl.DataFrame(rows)
-  query_writer.write_dataframe(df_queries)
+def checkpoint_queries_parquet(
+  metadata: SyntheticQueriesMetadata, query_writer: Writer
+) -> None:
+  query_writer.write_dataframe(metadata.to_dataframe())
@@ -0,0 +1,170 @@
+"""Columnar accumulation of the synthetic query metadata.
+
+Every validated synthetic query adds one row to `output.parquet`. Instead of
+keeping one Python dict per query, values are appended to typed numpy arrays
+(one per column) and the repeated strings (`fact_table`,
+`subgraph_signature`) are dictionary encoded, so a checkpoint only needs to
+wrap the filled part of each array into a polars Series. Each value is
+appended straight to its column, with no intermediate row.
+"""
+
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+import numpy as np
+import polars as pl
+
+from query_generator.utils.definitions import GeneratedQueryFeatures
+
+INITIAL_CAPACITY = 1024
+
+
+@dataclass
+class SyntheticBatchSettings:
+  """Sampling parameters shared by every query of one batch."""
+
+  batch_number: int
+  max_hops: int
+  extra_predicates: int
+  row_retention_probability: float
+  equality_lower_bound_probability: float
+  keep_edge_probability: float
+
+
+class GrowableArray:
+  """Preallocated numpy array that doubles its capacity when full."""
+
+  def __init__(
+    self, dtype: type[np.generic], capacity: int = INITIAL_CAPACITY
+  ) -> None:
+    self._data = np.empty(capacity, dtype=dtype)
+    self._size = 0
+
+  def __len__(self) -> int:
+    return self._size
+
+  def append(self, value: int | float) -> None:
+    if self._size == len(self._data):
+      # Growing allocates a new buffer, so views handed out earlier
+      # keep pointing to valid (and unchanged) memory.
+      self._data = np.concatenate([self._data, np.empty_like(self._data)])
+    self._data[self._size] = value
+    self._size += 1
+
+  def view(self) -> np.ndarray:
+    """Filled part of the array, without copying."""
+    return self._data[: self._size]
+
+  def to_series(self, name: str) -> pl.Series:
+    return pl.Series(name, self.view())
+
+
+class DictionaryColumn:
+  """String column stored as integer codes into a list of unique values.
+
+  Values are only converted to strings once per unique value, when the
+  column is turned into a Series.
+  """
+
+  def __init__(self) -> None:
+    self.codes = GrowableArray(np.uint32)
+    self.values: list[Hashable] = []
+    self._index: dict[Hashable, int] = {}
+
+  def __len__(self) -> int:
+    return len(self.codes)
+
+  def append(self, value: Hashable) -> None:
+    code = self._index.get(value)
+    if code is None:
+      code = len(self.values)
+      self._index[value] = code
+      self.values.append(value)
+    self.codes.append(code)
+
+  def to_series(self, name: str) -> pl.Series:
+    dictionary = pl.Series(
+      name, [str(value) for value in self.values], dtype=pl.String
+    )
+    return dictionary.gather(self.codes.view())
+
+
+class SyntheticQueriesMetadata:
+  """Column store for the rows of the synthetic queries `output.parquet`."""
+
+  # Output order of the columns in the parquet file; each is an attribute.
+  column_order = (
+    "relative_path",
+    "count_star",
+    "batch_number",
+    "template_number",
+    "predicate_number",
+    "extra_predicates",
+    "fact_table",
+    "max_hops",
+    "row_retention_probability",
+    "equality_lower_bound_probability",
+    "total_subgraph_edges",
+    "predicates_range",
+    "predicates_in_values",
+    "predicates_equality",
+    "keep_edge_probability",
+    "subgraph_signature",
+  )
+
+  def __init__(self) -> None:
+    self.relative_path = DictionaryColumn()
+    self.count_star = GrowableArray(np.int64)
+    self.batch_number = GrowableArray(np.int64)
+    self.template_number = GrowableArray(np.int64)
+    self.predicate_number = GrowableArray(np.int64)
+    self.extra_predicates = GrowableArray(np.int64)
+    self.fact_table = DictionaryColumn()
+    self.max_hops = GrowableArray(np.int64)
+    self.row_retention_probability = GrowableArray(np.float64)
+    self.equality_lower_bound_probability = GrowableArray(np.float64)
+    self.total_subgraph_edges = GrowableArray(np.int64)
+    self.predicates_range = GrowableArray(np.int64)
+    self.predicates_in_values = GrowableArray(np.int64)
+    self.predicates_equality = GrowableArray(np.int64)
+    self.keep_edge_probability = GrowableArray(np.float64)
+    # Signatures are bitwise ORs of edge ids and may not fit in 64 bits,
+    # so they are written as strings.
+    self.subgraph_signature = DictionaryColumn()
+
+  def __len__(self) -> int:
+    return len(self.relative_path)
+
+  def append(
+    self,
+    relative_path: str,
+    count_star: int,
+    batch: SyntheticBatchSettings,
+    query: GeneratedQueryFeatures,
+  ) -> None:
+    """Add the metadata of one validated query."""
+    predicate_types = query.generated_predicate_types
+    self.relative_path.append(relative_path)
+    self.count_star.append(count_star)
+    self.batch_number.append(batch.batch_number)
+    self.template_number.append(query.template_number)
+    self.predicate_number.append(query.predicate_number)
+    self.extra_predicates.append(batch.extra_predicates)
+    self.fact_table.append(query.fact_table)
+    self.max_hops.append(batch.max_hops)
+    self.row_retention_probability.append(batch.row_retention_probability)
+    self.equality_lower_bound_probability.append(
+      batch.equality_lower_bound_probability
+    )
+    self.total_subgraph_edges.append(query.total_subgraph_edges)
+    self.predicates_range.append(predicate_types.range)
+    self.predicates_in_values.append(predicate_types.in_values)
+    self.predicates_equality.append(predicate_types.equality)
+    self.keep_edge_probability.append(batch.keep_edge_probability)
+    self.subgraph_signature.append(query.subgraph_signature)
+
+  def to_dataframe(self) -> pl.DataFrame:
+    """Build the DataFrame; numeric columns wrap the arrays without copy."""
+    return pl.DataFrame(
+      [getattr(self, name).to_series(name) for name in self.column_order]
+    )
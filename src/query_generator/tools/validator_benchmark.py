@@ -0,0 +1,278 @@
+"""Throughput benchmark of the query validators.
+
+Replays a sample of generated queries through each configured validator
+engine at several worker counts, and appends one row per configuration to
+`validator_benchmark.parquet` so runs of different releases can be
+compared.
+"""
+
+import importlib.metadata
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from query_generator.database_connection.duckdb_validation import (
+  WorkerPoolSettings,
+)
+from query_generator.database_connection.factory import build_query_validator
+from query_generator.database_connection.query_validator_abc import (
+  QueryValidator,
+)
+from query_generator.utils.definitions import ValidatorEngine
+from query_generator.utils.params import (
+  BenchmarkedValidator,
+  BenchmarkValidatorsEndpoint,
+)
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FILE_NAME = "validator_benchmark.parquet"
+# Seconds between two samples of the memory used by the validators.
+MEMORY_SAMPLE_INTERVAL_SECONDS = 0.1
+PROC_PATH = Path("/proc")
+
+
+@dataclass
+class QueryMeasurement:
+  latency_seconds: float
+  timed_out: bool
+  failed: bool
+
+
+@dataclass
+class ValidatorBenchmarkRow:
+  """Results of one engine at one worker count."""
+
+  run_timestamp: str
+  package_version: str
+  validator_engine: str
+  database_path: str
+  workers: int
+  queries: int
+  elapsed_seconds: float
+  queries_per_second: float
+  latency_p50_seconds: float
+  latency_p90_seconds: float
+  latency_p99_seconds: float
+  latency_max_seconds: float
+  timeout_rate: float
+  error_rate: float
+  peak_memory_mb: float | None
+
+
+def sample_queries(
+  queries_folder: Path, sample_size: int, seed: int
+) -> list[str]:
+  """Sample up to `sample_size` `.sql` files of a folder, reproducibly."""
+  sql_files = sorted(queries_folder.rglob("*.sql"))
+  rng = random.Random(seed)
+  sampled = rng.sample(sql_files, min(sample_size, len(sql_files)))
+  return [path.read_text() for path in sampled]
+
+
+def _process_tree_rss_mb(root_pid: int) -> float | None:
+  """Resident memory of a process and all its descendants, from /proc.
+
+  Returns None where /proc is not available (e.g. macOS).
+  """
+  if not PROC_PATH.is_dir():
+    return None
+  children: dict[int, list[int]] = {}
+  for stat_path in PROC_PATH.glob("[0-9]*/stat"):
+    try:
+      # The process name may contain spaces, fields start after its ")".
+      fields = stat_path.read_text().rsplit(")", 1)[1].split()
+    except OSError:
+      continue
+    children.setdefault(int(fields[1]), []).append(int(stat_path.parent.name))
+  page_size = os.sysconf("SC_PAGE_SIZE")
+  total_bytes = 0
+  pending = [root_pid]
+  while pending:
+    pid = pending.pop()
+    pending.extend(children.get(pid, []))
+    try:
+      resident_pages = int(
+        (PROC_PATH / str(pid) / "statm").read_text().split()[1]
+      )
+    except (OSError, IndexError):
+      continue
+    total_bytes += resident_pages * page_size
+  return total_bytes / 1024**2
+
+
+class PeakMemorySampler:
+  """Background thread tracking the peak memory of this process tree.
+
+  Worker processes and the JVM of Spark are children of this process, so
+  the tree covers every engine.
+  """
+
+  def __init__(self) -> None:
+    self.peak_mb: float | None = None
+    self._stop = threading.Event()
+    self._thread = threading.Thread(
+      target=self._run, name="benchmark-memory-sampler", daemon=True
+    )
+
+  def _sample(self) -> None:
+    rss_mb = _process_tree_rss_mb(os.getpid())
+    if rss_mb is not None:
+      self.peak_mb = max(self.peak_mb or 0.0, rss_mb)
+
+  def _run(self) -> None:
+    while not self._stop.wait(MEMORY_SAMPLE_INTERVAL_SECONDS):
+      self._sample()
+
+  def __enter__(self) -> "PeakMemorySampler":
+    self._sample()
+    self._thread.start()
+    return self
+
+  def __exit__(self, *_: object) -> None:
+    self._stop.set()
+    self._thread.join()
+    self._sample()
+
+
+def _measure(validator: QueryValidator, query: str) -> QueryMeasurement:
+  start = time.perf_counter()
+  output_size, timed_out = validator.get_query_output_size(query)
+  return QueryMeasurement(
+    latency_seconds=time.perf_counter() - start,
+    timed_out=timed_out,
+    failed=output_size is None and not timed_out,
+  )
+
+
+def run_validator_benchmark(
+  validator: QueryValidator, queries: list[str], workers: int
+) -> tuple[list[QueryMeasurement], float]:
+  """Run every query once from `workers` threads.
+
+  Returns the measurement of each query and the elapsed wall time. Every
+  worker of the validator is started first, so worker start-up (process
+  spawn, database load, JVM start) is not measured.
+  """
+  validator.start_workers()
+  with ThreadPoolExecutor(workers) as executor:
+    start = time.perf_counter()
+    measurements = list(executor.map(lambda q: _measure(validator, q), queries))
+    elapsed = time.perf_counter() - start
+  return measurements, elapsed
+
+
+def _package_version() -> str:
+  try:
+    return importlib.metadata.version("query-generator")
+  except importlib.metadata.PackageNotFoundError:
+    return "unknown"
+
+
+def engine_worker_counts(
+  engine: BenchmarkedValidator, worker_counts: list[int]
+) -> list[int]:
+  """Worker counts at which `engine` is benchmarked.
+
+  The PySpark validator runs one query at a time on a single worker, so
+  more workers would only measure that worker again; it runs with one.
+  """
+  if engine.validator_engine != ValidatorEngine.PYSPARK:
+    return worker_counts
+  if any(workers != 1 for workers in worker_counts):
+    logger.info(
+      "The pyspark validator runs one query at a time; benchmarking it "
+      "with 1 worker only."
+    )
+  return [1]
+
+
+def summarize_benchmark(
+  engine: BenchmarkedValidator,
+  workers: int,
+  measurements: list[QueryMeasurement],
+  elapsed_seconds: float,
+  peak_memory_mb: float | None,
+) -> ValidatorBenchmarkRow:
+  latencies = np.array([m.latency_seconds for m in measurements] or [0.0])
+  p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+  queries = len(measurements)
+  return ValidatorBenchmarkRow(
+    run_timestamp=datetime.now(UTC).isoformat(timespec="seconds"),
+    package_version=_package_version(),
+    validator_engine=str(engine.validator_engine),
+    database_path=engine.database_path,
+    workers=workers,
+    queries=queries,
+    elapsed_seconds=elapsed_seconds,
+    queries_per_second=queries / elapsed_seconds if elapsed_seconds else 0.0,
+    latency_p50_seconds=float(p50),
+    latency_p90_seconds=float(p90),
+    latency_p99_seconds=float(p99),
+    latency_max_seconds=float(latencies.max()),
+    timeout_rate=sum(m.timed_out for m in measurements) / max(queries, 1),
+    error_rate=sum(m.failed for m in measurements) / max(queries, 1),
+    peak_memory_mb=peak_memory_mb,
+  )
+
+
+def benchmark_validators(
+  params: BenchmarkValidatorsEndpoint,
+) -> pl.DataFrame:
+  """Benchmark every engine at every worker count and save the results.
+
+  Rows are appended to the results of previous runs in the output folder.
+  """
+  queries = sample_queries(
+    Path(params.queries_folder), params.sample_size, params.seed
+  )
+  logger.info("Benchmarking validators with %d queries.", len(queries))
+  rows: list[ValidatorBenchmarkRow] = []
+  for engine in params.validators:
+    for workers in engine_worker_counts(engine, params.worker_counts):
+      validator = build_query_validator(
+        database_path=engine.database_path,
+        validation_timeout_seconds=params.validation_timeout_seconds,
+        validator_engine=engine.validator_engine,
+        pool_settings=WorkerPoolSettings(workers=workers),
+      )
+      try:
+        with PeakMemorySampler() as memory:
+          measurements, elapsed = run_validator_benchmark(
+            validator, queries, workers
+          )
+      finally:
+        validator.close()
+      row = summarize_benchmark(
+        engine, workers, measurements, elapsed, memory.peak_mb
+      )
+      logger.info(
+        "%s with %d workers: %.1f queries/s, p50 %.3fs, p99 %.3fs, "
+        "%.1f%% timeouts.",
+        engine.validator_engine,
+        workers,
+        row.queries_per_second,
+        row.latency_p50_seconds,
+        row.latency_p99_seconds,
+        row.timeout_rate * 100,
+      )
+      rows.append(row)
+
+  results = pl.DataFrame([asdict(row) for row in rows])
+  output_path = Path(params.output_folder) / BENCHMARK_FILE_NAME
+  output_path.parent.mkdir(parents=True, exist_ok=True)
+  if output_path.exists():
+    results = pl.concat(
+      [pl.read_parquet(output_path), results], how="diagonal_relaxed"
+    )
+  results.write_parquet(output_path)
+  return results
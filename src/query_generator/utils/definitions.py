@@ -11,9 +11,52 @@ class Dataset(Enum):
 
 class ValidatorEngine(StrEnum):
   DUCKDB = "duckdb"
+  DUCKDB_PARQUET = "duckdb_parquet"
   PYSPARK = "pyspark"
 
 
+class ValidationLevel(StrEnum):
+  """How far a query is taken when validating it.
+
+  - parse: only the SQL parser runs.
+  - plan: the query is bound and planned with EXPLAIN, but not executed.
+  - execute: the query is executed (up to the output size limit).
+  """
+
+  PARSE = "parse"
+  PLAN = "plan"
+  EXECUTE = "execute"
+
+
+class TraceCacheMode(StrEnum):
+  """State of the caches when a query is traced.
+
+  - default: whatever the previous queries of the worker left behind.
+  - warm: the tables of the query are scanned into the DuckDB buffer pool
+      of the worker before it runs.
+  - cold: every query runs in a fresh worker process, optionally after
+      dropping the OS page cache.
+  """
+
+  DEFAULT = "default"
+  WARM = "warm"
+  COLD = "cold"
+
+
+class TraceProfilingMode(StrEnum):
+  """Metrics DuckDB collects when a query is traced.
+
+  - detailed: every metric of the DuckDB detailed profiling mode, including
+      the timings of the optimizers and planner.
+  - metrics: only the metrics read by `DuckDBTraceParser`, plus the chosen
+      extras. Traces are smaller and the profiled run is closer to an
+      unprofiled one.
+  """
+
+  DETAILED = "detailed"
+  METRICS = "metrics"
+
+
 class SQLDialect(StrEnum):
   DUCKDB = "duckdb"
   SPARK = "spark"
@@ -56,6 +99,7 @@ class SyntheticQueryGenerationParameters:
   keep_edge_probability: float
   seen_subgraphs: dict[int, bool]
   predicate_parameters: PredicateParameters
+  parameterized: bool = False
 
 
 @dataclass
@@ -69,6 +113,18 @@ class GeneratedPredicateTypes:
   not_like: int = 0
 
 
+@dataclass
+class ParameterizedQuery:
+  """Query with `$n` placeholders and the SQL literals bound to them.
+
+  Queries of the same subgraph and predicate shape share the template, so
+  a validator can prepare it once and execute it with different literals.
+  """
+
+  template: str
+  literals: list[str]
+
+
 @dataclass
 class GeneratedQueryFeatures:
   query: str
@@ -78,6 +134,7 @@ class GeneratedQueryFeatures:
   total_subgraph_edges: int
   generated_predicate_types: GeneratedPredicateTypes
   subgraph_signature: int
+  parameterized: ParameterizedQuery | None = None
 
 
 @dataclass
@@ -19,10 +19,21 @@ class GraphExploredError(Exception):
 
 class DuckDBTimeoutError(Exception):
   def __init__(self, timeout_seconds: float | int) -> None:
+    self.timeout_seconds = timeout_seconds
     super().__init__(
       f"DuckDB query interrupted after {timeout_seconds} seconds."
     )
 
+  def __reduce__(self) -> tuple[type, tuple[float | int]]:
+    # Workers send it through a pipe; rebuild it from the timeout, not the
+    # formatted message.
+    return (self.__class__, (self.timeout_seconds,))
+
+
+class WorkerCrashedError(Exception):
+  def __init__(self, engine: str) -> None:
+    super().__init__(f"{engine} worker process crashed.")
+
 
 class TableNotFoundError(Exception):
   def __init__(self, table_name: str) -> None:
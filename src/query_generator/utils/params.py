@@ -13,6 +13,9 @@ from query_generator.utils.definitions import (
   ComplexQueryLLMPrompt,
   Dataset,
   PredicateOperatorProbability,
+  TraceCacheMode,
+  TraceProfilingMode,
+  ValidationLevel,
   ValidatorEngine,
 )
 from query_generator.utils.toml_examples import TOML_EXAMPLE, EndpointName
@@ -59,6 +62,70 @@ class LLMPrompts:
   weighted_prompts: dict[str, ComplexQueryLLMPrompt]
 
 
+@dataclass
+class ValidationCacheParams:
+  """Disk cache of validation results.
+
+  Attributes:
+  - path (str): SQLite file where the results are stored.
+  - max_entries (int): Least recently used entries are evicted beyond this
+      size. Default is 100000.
+  - bypass (bool): Do not read cached results, only write fresh ones.
+      Default is False.
+  """
+
+  path: str
+  max_entries: int = 100_000
+  bypass: bool = False
+
+
+@dataclass
+class LatencyMeasurementParams:
+  """Repeated latency measurement of the traced queries.
+
+  Attributes:
+  - warmup_runs (int): Untimed runs before the timed ones, on the worker
+      that runs the timed ones. Default is 1.
+  - timed_runs (int): Runs timed with profiling off. Default is 5.
+  """
+
+  warmup_runs: int = 1
+  timed_runs: int = 5
+
+
+@dataclass
+class SparkValidationParams:
+  """Tuning of the SparkSession used by the `"pyspark"` validator.
+
+  Attributes:
+  - cache_tables_max_mb (float): Tables whose parquet files take at most
+      this many MB (the dimension tables) are cached in memory when the
+      session starts, so queries do not rescan their files. Default is 0
+      (no caching).
+  - compute_statistics (bool): Compute table and column statistics of the
+      cached tables once per session and enable the cost-based optimizer
+      and join reordering. Spark only keeps statistics of cached views, so
+      it needs `cache_tables_max_mb` > 0. Default is False.
+  - broadcast_threshold_mb (int | None): `autoBroadcastJoinThreshold` in
+      MB. Broadcasts cost no network in local mode, so a threshold above
+      Spark's 10MB default avoids sort-merge joins of small tables. Default
+      is None (Spark's default).
+  """
+
+  cache_tables_max_mb: float = 0.0
+  compute_statistics: bool = False
+  broadcast_threshold_mb: int | None = None
+
+  def __post_init__(self) -> None:
+    if self.compute_statistics and self.cache_tables_max_mb <= 0:
+      msg = (
+        "compute_statistics needs cache_tables_max_mb > 0: only cached "
+        "views get statistics, and the cost-based optimizer would run "
+        "without any."
+      )
+      raise ValueError(msg)
+
+
 @define
 class LLMEngineParams:
   """Engine specific parameters for LLM augmentation."""
@@ -69,6 +136,10 @@ class LLMEngineParams:
   prompts: LLMPrompts = field(init=False)
   validator_engine: ValidatorEngine = ValidatorEngine.DUCKDB
   validation_timeout_seconds: float = 20.0
+  validation_level: ValidationLevel = ValidationLevel.EXECUTE
+  validation_cache: ValidationCacheParams | None = None
+  in_memory_database: bool = False
+  spark: SparkValidationParams | None = None
   function_examples_path: Path | None = field(
     default=None, converter=lambda v: Path(v) if v is not None else None
   )
@@ -110,6 +181,7 @@ class LLMParams:
   statistics_parquet: str | None = None
   batch_size: int = 100
   batch_poll_interval_seconds: float = 30.0
+  concurrent_queries: int = 1
 
 
 @dataclass
@@ -169,6 +241,10 @@ class SyntheticQueriesEngine:
   validation_database_path: str
   validator_engine: ValidatorEngine = ValidatorEngine.DUCKDB
   validation_timeout_seconds: float = 5.0
+  concurrent_queries: int = 1
+  duckdb_threads: int | None = None
+  prepared_statements: bool = False
+  spark: SparkValidationParams | None = None
 
 
 @dataclass
@@ -294,7 +370,19 @@ class FixTransformEndpoint:
   max_output_size: int = 1000
   make_select_group_by_disjoint: bool = False
   make_count_statement_diverse: bool = False
-  max_memory_gb: int = 5
+  max_memory_gb: float = 5
+  in_memory_database: bool = False
+  write_trace_files: bool = False
+  workers: int = 1
+  queries_metadata: str | None = None
+  latency_measurement: LatencyMeasurementParams | None = None
+  trace_cache_mode: TraceCacheMode = TraceCacheMode.DEFAULT
+  drop_os_page_cache: bool = False
+  resume: bool = False
+  trace_profiling_mode: TraceProfilingMode = TraceProfilingMode.DETAILED
+  extra_profiling_metrics: list[str] = dc_field(default_factory=list)
+  max_threads: int | None = None
+  serialize_memory_heavy_queries: bool = False
 
 
 @dataclass
@@ -316,6 +404,34 @@ class GetMetricsEndpoint:
   y_axis_limits: dict[str, list[float]] = dc_field(default_factory=dict)
 
 
+@dataclass
+class BenchmarkedValidator:
+  """One validator engine of the benchmark, with its database."""
+
+  validator_engine: ValidatorEngine
+  database_path: str
+
+
+@dataclass
+class BenchmarkValidatorsEndpoint:
+  __doc__ = f"""Measure the throughput of the query validators.
+{get_markdown_documentation(EndpointName.BENCHMARK_VALIDATORS)}
+
+# Example
+
+```toml
+{TOML_EXAMPLE[EndpointName.BENCHMARK_VALIDATORS]}
+```
+  """
+  queries_folder: str
+  output_folder: str
+  validators: list[BenchmarkedValidator]
+  sample_size: int = 100
+  seed: int = 42
+  worker_counts: list[int] = dc_field(default_factory=lambda: [1])
+  validation_timeout_seconds: float = 5.0
+
+
 T = TypeVar("T")
 
 
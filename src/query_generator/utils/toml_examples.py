@@ -11,6 +11,7 @@ class EndpointName(StrEnum):
   FIX_TRANSFORM = "fix_transform"
   PROMPTS = "prompts"
   GET_METRICS = "get_metrics"
+  BENCHMARK_VALIDATORS = "benchmark_validators"
 
 
 class Provider(StrEnum):
@@ -148,5 +149,20 @@ template_1 = 100
 cumulative_cardinality_duckdb = [1, 5e6]
 [y_axis_limits]
 cumulative_cardinality_duckdb = [0, 200]
+""",
+  EndpointName.BENCHMARK_VALIDATORS: """\
+queries_folder = "tmp/synthetic_queries"
+output_folder = "tmp/validator_benchmark"
+sample_size = 200
+worker_counts = [1, 2, 4]
+validation_timeout_seconds = 5.0
+
+[[validators]]
+validator_engine = "duckdb"
+database_path = "data/duckdb/TPCDS/0.db"
+
+[[validators]]
+validator_engine = "duckdb_parquet"
+database_path = "tmp/database_parquet/TPCDS_0.1"
 """,
 }
@@ -4,6 +4,7 @@ from pathlib import Path
 from cattrs import structure
 
 from query_generator.utils.params import (
+  BenchmarkValidatorsEndpoint,
   ExtensionBatchEndpoint,
   ExtensionOnlineEndpoint,
   FilterEndpoint,
@@ -27,6 +28,7 @@ mapping = {
   EndpointName.FIX_TRANSFORM: FixTransformEndpoint,
   EndpointName.PROMPTS: LLMPrompts,
   EndpointName.GET_METRICS: GetMetricsEndpoint,
+  EndpointName.BENCHMARK_VALIDATORS: BenchmarkValidatorsEndpoint,
 }
 
 
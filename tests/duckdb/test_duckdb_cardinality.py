@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from query_generator.database_connection.duckdb_cardinality import (
+  CardinalityCursorPool,
+)
+from query_generator.database_connection.duckdb_validation import (
+  DuckDBQueryExecutor,
+  WorkerPoolSettings,
+)
+from query_generator.synthetic_queries.query_builder import (
+  render_parameterized_query,
+)
+from query_generator.utils.definitions import ParameterizedQuery
+
+LONG_RUNNING_QUERY = """
+SELECT COUNT(*)
+FROM range(0, 100000000) t1(i)
+CROSS JOIN range(0, 100000000) t2(j);
+"""
+
+
+@pytest.fixture
+def database_path(tmp_path: Path) -> str:
+  path = tmp_path / "cardinality.duckdb"
+  con = duckdb.connect(str(path))
+  con.execute("CREATE TABLE t AS SELECT range AS i FROM range(100)")
+  con.close()
+  return str(path)
+
+
+def test_concurrent_counts_keep_their_results(database_path: str):
+  executor = DuckDBQueryExecutor(
+    database_path,
+    10,
+    pool_settings=WorkerPoolSettings(cardinality_cursors=4, duckdb_threads=2),
+  )
+  queries = [f"SELECT COUNT(*) FROM t WHERE i < {n}" for n in range(50)]
+  with ThreadPoolExecutor(8) as pool:
+    results = list(pool.map(executor.get_synthetic_query_cardinality, queries))
+  assert results == list(range(50))
+  assert executor.get_synthetic_query_cardinality("SELECT * FROM nope") == -1
+  executor.close()
+
+
+def test_one_watchdog_interrupts_every_timed_out_cursor(database_path: str):
+  con = duckdb.connect(database_path, read_only=True)
+  pool = CardinalityCursorPool(con, timeout_seconds=0.5, cursors=3)
+  threads_before = threading.active_count()
+  start = time.perf_counter()
+  with ThreadPoolExecutor(3) as executor:
+    results = list(executor.map(pool.count, [LONG_RUNNING_QUERY] * 3))
+  assert results == [-1, -1, -1]
+  assert time.perf_counter() - start < 5
+  # No timer thread is left behind and the cursors are reusable.
+  assert threading.active_count() == threads_before
+  assert pool.count("SELECT COUNT(*) FROM t") == 100
+  pool.close()
+  con.close()
+
+
+def test_repeated_templates_run_as_prepared_statements(database_path: str):
+  con = duckdb.connect(database_path, read_only=True)
+  pool = CardinalityCursorPool(con, timeout_seconds=10, cursors=1)
+  template = "SELECT COUNT(*) FROM t WHERE i >= $1 AND i < $2"
+  for low, high in [(0, 10), (5, 50), (90, 200)]:
+    parameterized = ParameterizedQuery(template, [str(low), str(high)])
+    query = render_parameterized_query(parameterized)
+    assert pool.count_parameterized(query, parameterized) == pool.count(query)
+  (prepared,) = pool._prepared.values()
+  assert list(prepared) == [template]
+  pool.close()
+  con.close()
@@ -0,0 +1,331 @@
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from query_generator.database_connection.duckdb_validation import (
+  DuckDBQueryExecutor,
+  DuckDBWorkerPool,
+  QueryWorkerInput,
+  WorkerPoolSettings,
+)
+from query_generator.database_connection.factory import build_query_validator
+from query_generator.duckdb_connection.setup import (
+  export_duckdb_con_to_parquet,
+)
+from query_generator.utils.definitions import ValidationLevel, ValidatorEngine
+from query_generator.utils.exceptions import DuckDBTimeoutError
+
+LONG_RUNNING_QUERY = """
+SELECT COUNT(*)
+FROM range(0, 100000000) t1(i)
+CROSS JOIN range(0, 100000000) t2(j);
+"""
+
+
+@pytest.fixture
+def executor(tmp_path: Path):
+  db_path = tmp_path / "validation.duckdb"
+  con = duckdb.connect(str(db_path))
+  con.execute("CREATE TABLE t AS SELECT range AS i FROM range(10)")
+  con.close()
+  validator = DuckDBQueryExecutor(str(db_path), 1)
+  yield validator
+  validator.close()
+
+
+def _worker_pids(validator: DuckDBQueryExecutor) -> set[int | None]:
+  return {w.process.pid for w in list(validator.worker_pool._idle)}
+
+
+def test_worker_is_reused_between_queries(executor: DuckDBQueryExecutor):
+  """Consecutive queries are served by the same worker process."""
+  assert executor.is_query_valid("SELECT * FROM t") == (True, None)
+  pids = _worker_pids(executor)
+  assert executor.get_query_output_size("SELECT * FROM t") == (10, False)
+  assert _worker_pids(executor) == pids
+  valid, exception = executor.is_query_valid("SELECT * FROM missing_table")
+  assert not valid
+  assert isinstance(exception, duckdb.CatalogException)
+  assert _worker_pids(executor) == pids
+
+
+def test_timeout_interrupts_without_respawn(executor: DuckDBQueryExecutor):
+  """Timeouts are enforced by interrupt and keep the worker alive."""
+  executor.is_query_valid("SELECT 1")
+  pids = _worker_pids(executor)
+  valid, exception = executor.is_query_valid(LONG_RUNNING_QUERY)
+  assert not valid
+  assert isinstance(exception, DuckDBTimeoutError)
+  assert str(exception) == "DuckDB query interrupted after 1 seconds."
+  assert _worker_pids(executor) == pids
+  assert executor.is_query_valid("SELECT 1") == (True, None)
+
+
+def test_worker_startup_is_not_part_of_the_query_deadline(tmp_path: Path):
+  """Spawning and connecting a worker may take longer than a query."""
+  db_path = tmp_path / "validation.duckdb"
+  con = duckdb.connect(str(db_path))
+  con.execute("CREATE TABLE t AS SELECT range AS i FROM range(1000000)")
+  con.close()
+  pool = DuckDBWorkerPool(
+    QueryWorkerInput(
+      database_path=str(db_path),
+      memory_gb=1,
+      timeout_seconds=0.2,
+      limit_output_size=10,
+      in_memory=True,
+    ),
+    hang_grace_seconds=0,
+  )
+  try:
+    execution = pool.execute("SELECT COUNT(*) FROM t", "startup")
+    assert execution.exception is None
+    assert not execution.timed_out
+  finally:
+    pool.close()
+
+
+def test_prewarm_is_not_part_of_the_query_deadline(tmp_path: Path):
+  """Scanning the tables of a query has its own budget and timeouts."""
+  db_path = tmp_path / "validation.duckdb"
+  con = duckdb.connect(str(db_path))
+  for view in ("slow_a", "slow_b"):
+    con.execute(
+      f"CREATE VIEW {view} AS "
+      "SELECT * FROM range(100000000) a, range(100000000) b"
+    )
+  con.close()
+  pool = DuckDBWorkerPool(
+    QueryWorkerInput(
+      database_path=str(db_path),
+      memory_gb=1,
+      timeout_seconds=0.5,
+      limit_output_size=10,
+      prewarm_tables=True,
+    ),
+    hang_grace_seconds=1,
+  )
+  try:
+    pool.start_workers()
+    # The prewarm budget grows with the tables, not with the start-up one.
+    pool.startup_timeout_seconds = 0.7
+    execution = pool.execute("SELECT * FROM slow_a, slow_b LIMIT 0", "prewarm")
+    assert execution.exception is None
+    assert not execution.timed_out
+    assert execution.prewarm_failed
+    assert pool._spawned == 1
+  finally:
+    pool.close()
+
+
+def test_waiting_caller_spawns_a_worker_when_one_stops(tmp_path: Path):
+  """A stopped or discarded worker wakes a caller waiting for a worker."""
+  db_path = tmp_path / "validation.duckdb"
+  duckdb.connect(str(db_path)).close()
+  pool = DuckDBWorkerPool(
+    QueryWorkerInput(
+      database_path=str(db_path),
+      memory_gb=1,
+      timeout_seconds=10,
+      limit_output_size=10,
+    ),
+    recycle_workers=True,
+  )
+  try:
+    with ThreadPoolExecutor(3) as executor:
+      futures = [
+        executor.submit(pool.execute, "SELECT 1", f"query {i}")
+        for i in range(3)
+      ]
+      executions = [future.result(timeout=60) for future in futures]
+    assert all(execution.exception is None for execution in executions)
+    assert pool._spawned == 0
+  finally:
+    pool.close()
+
+
+def test_worker_that_cannot_connect_reports_its_error(tmp_path: Path):
+  pool = DuckDBWorkerPool(
+    QueryWorkerInput(
+      database_path=str(tmp_path / "missing.duckdb"),
+      memory_gb=1,
+      timeout_seconds=1,
+      limit_output_size=10,
+    )
+  )
+  execution = pool.execute("SELECT 1", "missing database")
+  assert isinstance(execution.exception, duckdb.IOException)
+  assert pool._spawned == 0
+
+
+def test_start_workers_spawns_the_whole_pool(tmp_path: Path):
+  """All workers are connected before the first query, e.g. for timing."""
+  db_path = tmp_path / "validation.duckdb"
+  duckdb.connect(str(db_path)).close()
+  validator = DuckDBQueryExecutor(
+    str(db_path), 1, pool_settings=WorkerPoolSettings(workers=3)
+  )
+  try:
+    validator.start_workers()
+    pids = _worker_pids(validator)
+    assert len(pids) == 3
+    assert all(w.ready for w in list(validator.worker_pool._idle))
+    validator.start_workers()
+    assert _worker_pids(validator) == pids
+    assert validator.is_query_valid("SELECT 1") == (True, None)
+    assert _worker_pids(validator) == pids
+  finally:
+    validator.close()
+
+
+def test_dead_worker_is_respawned(executor: DuckDBQueryExecutor):
+  """A worker that died while idle is replaced transparently."""
+  executor.is_query_valid("SELECT 1")
+  (pid,) = _worker_pids(executor)
+  assert pid is not None
+  os.kill(pid, signal.SIGKILL)
+  executor.worker_pool._idle[0].process.join()
+  assert executor.is_query_valid("SELECT * FROM t") == (True, None)
+  assert _worker_pids(executor) != {pid}
+
+
+@pytest.mark.parametrize(
+  "level, query, expected_valid",
+  [
+    (ValidationLevel.PARSE, "SELECT * FROM t", True),
+    (ValidationLevel.PARSE, "SELECT * FROM missing_table", True),
+    (ValidationLevel.PARSE, "SELEC 1", False),
+    (ValidationLevel.PARSE, "", False),
+    (ValidationLevel.PLAN, "SELECT * FROM t;", True),
+    (ValidationLevel.PLAN, "SELECT * FROM missing_table", False),
+    (ValidationLevel.PLAN, "SELECT 1; SELECT * FROM missing_table", False),
+    (ValidationLevel.PLAN, "SELECT 1 / (SELECT 0) :: DATE", False),
+    (ValidationLevel.EXECUTE, "SELECT * FROM t", True),
+    (ValidationLevel.EXECUTE, "SELECT * FROM missing_table", False),
+  ],
+)
+def test_validation_levels(
+  executor: DuckDBQueryExecutor,
+  level: ValidationLevel,
+  query: str,
+  expected_valid: bool,
+):
+  """Each validation level catches the errors of its stage."""
+  valid, exception = executor.is_query_valid(query, level)
+  assert valid == expected_valid
+  assert (exception is None) == expected_valid
+
+
+def test_plan_level_does_not_execute(executor: DuckDBQueryExecutor):
+  """Planning an expensive query returns before the timeout."""
+  valid, exception = executor.is_query_valid(
+    LONG_RUNNING_QUERY, ValidationLevel.PLAN
+  )
+  assert valid
+  assert exception is None
+
+
+def test_in_memory_workers_answer_like_disk_workers(tmp_path: Path):
+  """The in-memory copy returns the same results and stays read-only."""
+  db_path = tmp_path / "validation.duckdb"
+  con = duckdb.connect(str(db_path))
+  con.execute("CREATE TABLE t AS SELECT range AS i FROM range(10)")
+  con.execute("CREATE VIEW v AS SELECT i FROM t WHERE i < 5")
+  con.close()
+  validator = DuckDBQueryExecutor(
+    str(db_path), 1, pool_settings=WorkerPoolSettings(in_memory=True)
+  )
+  try:
+    assert validator.in_memory
+    assert validator.get_query_output_size("SELECT * FROM v") == (5, False)
+    valid, exception = validator.is_query_valid("DROP TABLE t")
+    assert not valid
+    assert isinstance(exception, duckdb.InvalidInputException)
+    for explain in (
+      "EXPLAIN ANALYZE DELETE FROM t",
+      "/* c */ explain (analyze, format json) DELETE FROM t",
+    ):
+      valid, exception = validator.is_query_valid(explain)
+      assert not valid
+      assert isinstance(exception, duckdb.InvalidInputException)
+    assert validator.is_query_valid("EXPLAIN ANALYZE SELECT * FROM t")[0]
+    assert validator.is_query_valid("EXPLAIN DELETE FROM t")[0]
+    assert validator.get_query_output_size("SELECT * FROM t") == (10, False)
+  finally:
+    validator.close()
+
+
+def test_in_memory_falls_back_to_disk_when_too_big(tmp_path: Path):
+  db_path = tmp_path / "validation.duckdb"
+  duckdb.connect(str(db_path)).close()
+  validator = DuckDBQueryExecutor(
+    str(db_path),
+    1,
+    memory_gb=0,
+    pool_settings=WorkerPoolSettings(in_memory=True),
+  )
+  assert not validator.in_memory
+  validator.close()
+
+
+def test_rows_are_returned_as_arrow_only_on_request(
+  executor: DuckDBQueryExecutor,
+):
+  """Counting sends no rows back; fetching returns an Arrow table."""
+  assert executor.get_query_output_size("SELECT * FROM t") == (10, False)
+  table, timed_out = executor.get_query_output("SELECT i FROM t ORDER BY i")
+  assert not timed_out
+  assert table is not None
+  assert table.column("i").to_pylist() == list(range(10))
+  table, _ = executor.get_query_output("SELECT * FROM missing_table")
+  assert table is None
+
+
+def test_output_size_is_capped_at_the_limit(tmp_path: Path):
+  db_path = tmp_path / "validation.duckdb"
+  duckdb.connect(str(db_path)).close()
+  validator = DuckDBQueryExecutor(str(db_path), 5, limit_output_size=5000)
+  query = "SELECT * FROM range(1000000)"
+  assert validator.get_query_output_size(query) == (5100, False)
+  table, _ = validator.get_query_output(query)
+  assert table is not None
+  assert table.num_rows == 5100
+  validator.close()
+
+
+def test_parquet_engine_queries_the_exported_tables(tmp_path: Path):
+  """DUCKDB_PARQUET validates against views over `table/data.parquet`."""
+  con = duckdb.connect()
+  con.execute("CREATE TABLE t AS SELECT range AS i FROM range(10)")
+  con.execute("CREATE TABLE u AS SELECT range AS j FROM range(3)")
+  export_duckdb_con_to_parquet(con, str(tmp_path / "parquet"))
+  con.close()
+  validator = build_query_validator(
+    str(tmp_path / "parquet"), 5, ValidatorEngine.DUCKDB_PARQUET
+  )
+  try:
+    assert validator.get_query_output_size("SELECT * FROM t, u") == (30, False)
+    assert validator.is_query_valid("SELECT j FROM u") == (True, None)
+    valid, _ = validator.is_query_valid("SELECT * FROM missing_table")
+    assert not valid
+    valid, _ = validator.is_query_valid("DROP VIEW t")
+    assert not valid
+    assert (
+      validator.get_synthetic_query_cardinality(
+        "SELECT COUNT(*) FROM t WHERE i < 4"
+      )
+      == 4
+    )
+  finally:
+    validator.close()
+
+
+def test_parquet_engine_requires_a_directory(tmp_path: Path):
+  db_path = tmp_path / "validation.duckdb"
+  duckdb.connect(str(db_path)).close()
+  with pytest.raises(ValueError, match="directory"):
+    build_query_validator(str(db_path), 5, ValidatorEngine.DUCKDB_PARQUET)
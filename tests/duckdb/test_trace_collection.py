@@ -0,0 +1,219 @@
+import json
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from query_generator.duckdb_connection import trace_collection
+from query_generator.duckdb_connection.trace_collection import (
+  DuckDBTraceCollector,
+  DuckDBTraceParams,
+)
+from query_generator.metrics.duckdb_parser import DuckDBTraceParser
+from query_generator.utils.definitions import (
+  TraceCacheMode,
+  TraceProfilingMode,
+)
+
+
+@pytest.fixture
+def trace_params(tmp_path: Path) -> DuckDBTraceParams:
+  db_path = tmp_path / "trace.duckdb"
+  con = duckdb.connect(str(db_path))
+  con.execute("CREATE TABLE t AS SELECT range AS i FROM range(10)")
+  con.close()
+  (tmp_path / "queries" / "batch").mkdir(parents=True)
+  return DuckDBTraceParams(
+    queries_path=str(tmp_path / "queries"),
+    duckdb_path=str(db_path),
+    timeout_seconds=2,
+    fetch_limit=100,
+    output_folder=str(tmp_path / "output"),
+    max_memory_gb=1,
+  )
+
+
+def _pids(collector: DuckDBTraceCollector) -> set[int | None]:
+  return {w.process.pid for w in list(collector.worker_pool._idle)}
+
+
+def test_traces_are_collected_in_memory(trace_params: DuckDBTraceParams):
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    row = collector.collect("SELECT i FROM t WHERE i < 3", sql_file)
+    assert row.trace_success
+    assert row.error == ""
+    assert row.relative_path == "batch/q1.sql"
+    assert row.query_folder == "batch"
+    assert row.query_name == "q1"
+    assert len(row.duckdb_output) == 3
+    assert all(isinstance(r, str) for r in row.duckdb_output)
+    assert "children" in json.loads(row.duckdb_trace)
+    assert not (Path(trace_params.output_folder) / "DUCKDB_TRACES").exists()
+  finally:
+    collector.close()
+
+
+def test_worker_is_reused_between_traces(trace_params: DuckDBTraceParams):
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    assert collector.collect("SELECT * FROM t", sql_file).trace_success
+    pids = _pids(collector)
+    row = collector.collect("SELECT * FROM missing_table", sql_file)
+    assert not row.trace_success
+    assert "missing_table" in row.error
+    assert row.duckdb_trace == ""
+    assert collector.collect("SELECT 1", sql_file).trace_success
+    assert _pids(collector) == pids
+  finally:
+    collector.close()
+
+
+def test_trace_files_are_written_on_request(trace_params: DuckDBTraceParams):
+  trace_params.write_trace_files = True
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    row = collector.collect("SELECT COUNT(*) FROM t", sql_file)
+  finally:
+    collector.close()
+  trace_file = Path(trace_params.output_folder) / "DUCKDB_TRACES" / "batch"
+  assert (trace_file / "q1.json").read_text() == row.duckdb_trace
+
+
+def test_timeout_marks_the_trace_as_failed(trace_params: DuckDBTraceParams):
+  trace_params.timeout_seconds = 0.5
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    row = collector.collect(
+      "SELECT COUNT(*) FROM range(100000000) a, range(100000000) b", sql_file
+    )
+    assert not row.trace_success
+    assert collector.collect("SELECT 1", sql_file).trace_success
+  finally:
+    collector.close()
+
+
+def test_latency_is_measured_without_profiling(
+  trace_params: DuckDBTraceParams,
+):
+  trace_params.warmup_runs = 2
+  trace_params.timed_runs = 3
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    trace = collector.collect("SELECT SUM(i) FROM t", sql_file)
+    measured = collector.measure_latency(
+      trace, "SELECT SUM(i) FROM t", sql_file
+    )
+    assert len(measured.latency_runs_seconds) == 3
+    assert measured.latency_min_seconds == min(measured.latency_runs_seconds)
+    assert measured.latency_median_seconds is not None
+    assert measured.latency_stddev_seconds is not None
+    assert measured.duckdb_trace == trace.duckdb_trace
+    # Profiling is back on for the next trace.
+    assert collector.collect("SELECT 1", sql_file).duckdb_trace != ""
+    failed = collector.measure_latency(trace, "SELECT * FROM missing", sql_file)
+    assert failed == trace
+  finally:
+    collector.close()
+
+
+def test_cold_mode_starts_a_fresh_worker_per_query(
+  trace_params: DuckDBTraceParams,
+  tmp_path: Path,
+  monkeypatch: pytest.MonkeyPatch,
+):
+  drop_caches = tmp_path / "drop_caches"
+  monkeypatch.setattr(trace_collection, "DROP_CACHES_PATH", drop_caches)
+  trace_params.cache_mode = TraceCacheMode.COLD
+  trace_params.drop_os_page_cache = True
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    row = collector.collect("SELECT * FROM t", sql_file)
+    assert row.trace_success
+    assert row.cache_mode == "cold"
+    assert _pids(collector) == set()
+    assert collector.worker_pool._spawned == 0
+    assert drop_caches.read_text() == "1\n"
+  finally:
+    collector.close()
+
+
+def test_warm_mode_keeps_the_worker(trace_params: DuckDBTraceParams):
+  trace_params.cache_mode = TraceCacheMode.WARM
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    row = collector.collect(
+      "WITH c AS (SELECT * FROM t) SELECT SUM(i) FROM c", sql_file
+    )
+    assert row.trace_success
+    assert row.cache_mode == "warm"
+    assert "children" in json.loads(row.duckdb_trace)
+    pids = _pids(collector)
+    assert collector.collect("SELECT * FROM missing", sql_file).error
+    assert _pids(collector) == pids
+  finally:
+    collector.close()
+
+
+def test_failed_prewarm_is_not_recorded_as_warm(
+  trace_params: DuckDBTraceParams,
+):
+  con = duckdb.connect(trace_params.duckdb_path)
+  con.execute(
+    "CREATE VIEW slow AS SELECT * FROM range(100000000) a, range(100000000) b"
+  )
+  con.close()
+  trace_params.cache_mode = TraceCacheMode.WARM
+  trace_params.timeout_seconds = 1
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    row = collector.collect("SELECT * FROM slow LIMIT 0", sql_file)
+    assert row.trace_success
+    assert row.cache_mode == "default"
+    assert collector.collect("SELECT * FROM t", sql_file).cache_mode == "warm"
+  finally:
+    collector.close()
+
+
+def test_metrics_mode_profiles_only_the_parser_metrics(
+  trace_params: DuckDBTraceParams,
+):
+  sql_file = Path(trace_params.queries_path) / "batch" / "q1.sql"
+  detailed = DuckDBTraceCollector(trace_params)
+  try:
+    full = detailed.collect("SELECT SUM(i) FROM t WHERE i > 2", sql_file)
+  finally:
+    detailed.close()
+  trace_params.profiling_mode = TraceProfilingMode.METRICS
+  trace_params.extra_profiling_metrics = ["cpu_time"]
+  collector = DuckDBTraceCollector(trace_params)
+  try:
+    row = collector.collect("SELECT SUM(i) FROM t WHERE i > 2", sql_file)
+  finally:
+    collector.close()
+
+  assert len(row.duckdb_trace) < len(full.duckdb_trace)
+  trace = json.loads(row.duckdb_trace)
+  assert "cpu_time" in trace
+  assert "cumulative_optimizer_timing" not in trace
+  metrics = DuckDBTraceParser(row.duckdb_trace).get_metrics()
+  assert metrics == DuckDBTraceParser(full.duckdb_trace).get_metrics() | {
+    "latency_duckdb": metrics["latency_duckdb"]
+  }
+
+
+def test_unknown_profiling_metric_is_rejected(
+  trace_params: DuckDBTraceParams,
+):
+  trace_params.profiling_mode = TraceProfilingMode.METRICS
+  trace_params.extra_profiling_metrics = ["NOT_A_METRIC"]
+  with pytest.raises(ValueError, match="NOT_A_METRIC"):
+    DuckDBTraceCollector(trace_params)
@@ -0,0 +1,148 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from query_generator.database_connection.query_validator_abc import (
+  QueryValidator,
+)
+from query_generator.database_connection.validation_cache import (
+  CachedQueryValidator,
+  ValidationCache,
+  normalize_query,
+)
+from query_generator.utils.definitions import ValidationLevel
+from query_generator.utils.exceptions import (
+  DuckDBTimeoutError,
+  WorkerCrashedError,
+)
+
+
+@pytest.fixture
+def database_path(tmp_path: Path) -> str:
+  path = tmp_path / "db.duckdb"
+  path.write_bytes(b"database")
+  return str(path)
+
+
+def _inner_validator() -> MagicMock:
+  validator = MagicMock(spec=QueryValidator)
+  validator.settings_fingerprint.return_value = "inner"
+  validator.is_query_valid.return_value = (True, None)
+  validator.get_query_output_size_and_error.return_value = (7, None)
+  return validator
+
+
+def test_normalize_query_ignores_comments_and_whitespace():
+  assert normalize_query("SELECT  1\n-- comment\nFROM t;") == normalize_query(
+    "SELECT 1 FROM t"
+  )
+
+
+def test_repeated_queries_are_served_from_cache(
+  tmp_path: Path, database_path: str
+):
+  inner = _inner_validator()
+  cache = ValidationCache(str(tmp_path / "cache.sqlite"))
+  validator = CachedQueryValidator(inner, database_path, cache)
+  assert validator.is_query_valid("SELECT 1") == (True, None)
+  assert validator.is_query_valid("SELECT 1;  -- again") == (True, None)
+  assert validator.get_query_output_size("SELECT 1") == (7, False)
+  assert validator.get_query_output_size("SELECT 1") == (7, False)
+  assert inner.is_query_valid.call_count == 1
+  assert inner.get_query_output_size_and_error.call_count == 1
+  # Levels are cached independently.
+  validator.is_query_valid("SELECT 1", ValidationLevel.PLAN)
+  assert inner.is_query_valid.call_count == 2
+  validator.close()
+
+  # The cache survives the process and is keyed by the database state.
+  inner = _inner_validator()
+  cache = ValidationCache(str(tmp_path / "cache.sqlite"))
+  validator = CachedQueryValidator(inner, database_path, cache)
+  assert validator.get_query_output_size("SELECT 1") == (7, False)
+  assert inner.get_query_output_size_and_error.call_count == 0
+  Path(database_path).write_bytes(b"another database")
+  validator = CachedQueryValidator(inner, database_path, cache)
+  validator.get_query_output_size("SELECT 1")
+  assert inner.get_query_output_size_and_error.call_count == 1
+
+
+def test_invalid_queries_keep_their_error(tmp_path: Path, database_path: str):
+  inner = _inner_validator()
+  inner.is_query_valid.return_value = (False, ValueError("no such table"))
+  cache = ValidationCache(str(tmp_path / "cache.sqlite"))
+  validator = CachedQueryValidator(inner, database_path, cache)
+  validator.is_query_valid("SELECT * FROM x")
+  valid, exception = validator.is_query_valid("SELECT * FROM x")
+  assert not valid
+  assert str(exception) == "no such table"
+  assert inner.is_query_valid.call_count == 1
+
+
+def test_timeouts_are_not_cached(tmp_path: Path, database_path: str):
+  inner = _inner_validator()
+  inner.is_query_valid.return_value = (False, DuckDBTimeoutError(1))
+  inner.get_query_output_size_and_error.return_value = (
+    None,
+    DuckDBTimeoutError(1),
+  )
+  cache = ValidationCache(str(tmp_path / "cache.sqlite"))
+  validator = CachedQueryValidator(inner, database_path, cache)
+  for _ in range(2):
+    validator.is_query_valid("SELECT 1")
+    validator.get_query_output_size("SELECT 1")
+  assert inner.is_query_valid.call_count == 2
+  assert inner.get_query_output_size_and_error.call_count == 2
+  assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+  "exception", [WorkerCrashedError("DuckDB"), TimeoutError(), None]
+)
+def test_failed_output_sizes_are_cached_only_with_a_query_error(
+  tmp_path: Path, database_path: str, exception: Exception | None
+):
+  """Crashes and failures of unknown cause are retried, not cached."""
+  inner = _inner_validator()
+  inner.get_query_output_size_and_error.return_value = (None, exception)
+  cache = ValidationCache(str(tmp_path / "cache.sqlite"))
+  validator = CachedQueryValidator(inner, database_path, cache)
+  assert validator.get_query_output_size("SELECT 1") == (
+    None,
+    isinstance(exception, TimeoutError),
+  )
+  assert len(cache) == 0
+
+  inner.get_query_output_size_and_error.return_value = (
+    None,
+    ValueError("no such table"),
+  )
+  for _ in range(2):
+    assert validator.get_query_output_size("SELECT 1") == (None, False)
+  assert inner.get_query_output_size_and_error.call_count == 2
+  assert len(cache) == 1
+
+
+def test_bypass_skips_reads_but_writes(tmp_path: Path, database_path: str):
+  inner = _inner_validator()
+  cache = ValidationCache(str(tmp_path / "cache.sqlite"))
+  validator = CachedQueryValidator(inner, database_path, cache, bypass=True)
+  validator.is_query_valid("SELECT 1")
+  validator.is_query_valid("SELECT 1")
+  assert inner.is_query_valid.call_count == 2
+  assert len(cache) == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path, database_path: str):
+  inner = _inner_validator()
+  cache = ValidationCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+  validator = CachedQueryValidator(inner, database_path, cache)
+  for i in range(11):
+    validator.is_query_valid(f"SELECT {i}")
+  assert len(cache) <= 10
+  # The oldest entry was evicted, the newest one is still cached.
+  validator.is_query_valid("SELECT 10")
+  assert inner.is_query_valid.call_count == 11
+  validator.is_query_valid("SELECT 0")
+  assert inner.is_query_valid.call_count == 12
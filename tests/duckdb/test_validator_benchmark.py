@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import duckdb
+import polars as pl
+
+from query_generator.tools.validator_benchmark import (
+  BENCHMARK_FILE_NAME,
+  benchmark_validators,
+  engine_worker_counts,
+  sample_queries,
+)
+from query_generator.utils.definitions import ValidatorEngine
+from query_generator.utils.params import (
+  BenchmarkedValidator,
+  BenchmarkValidatorsEndpoint,
+)
+
+
+def _write_queries(folder: Path) -> None:
+  queries = {
+    "a/1.sql": "SELECT COUNT(*) FROM t",
+    "a/2.sql": "SELECT * FROM t WHERE i < 5",
+    "b/1.sql": "SELECT * FROM missing_table",
+  }
+  for relative_path, query in queries.items():
+    (folder / relative_path).parent.mkdir(parents=True, exist_ok=True)
+    (folder / relative_path).write_text(query)
+
+
+def test_sample_queries_is_reproducible(tmp_path: Path):
+  _write_queries(tmp_path)
+  assert sample_queries(tmp_path, 2, seed=1) == sample_queries(
+    tmp_path, 2, seed=1
+  )
+  assert len(sample_queries(tmp_path, 10, seed=1)) == 3
+
+
+def test_benchmark_appends_one_row_per_configuration(tmp_path: Path):
+  db_path = tmp_path / "validation.duckdb"
+  con = duckdb.connect(str(db_path))
+  con.execute("CREATE TABLE t AS SELECT range AS i FROM range(10)")
+  con.close()
+  _write_queries(tmp_path / "queries")
+  params = BenchmarkValidatorsEndpoint(
+    queries_folder=str(tmp_path / "queries"),
+    output_folder=str(tmp_path / "benchmark"),
+    validators=[BenchmarkedValidator(ValidatorEngine.DUCKDB, str(db_path))],
+    worker_counts=[1, 2],
+  )
+  results = benchmark_validators(params)
+  assert results["workers"].to_list() == [1, 2]
+  assert (results["queries"] == 3).all()
+  assert (results["queries_per_second"] > 0).all()
+  assert results["error_rate"].to_list() == [1 / 3, 1 / 3]
+  assert (results["timeout_rate"] == 0).all()
+  assert (
+    results["latency_p50_seconds"] <= results["latency_max_seconds"]
+  ).all()
+
+  benchmark_validators(params)
+  saved = pl.read_parquet(tmp_path / "benchmark" / BENCHMARK_FILE_NAME)
+  assert saved.height == 4
+
+
+def test_pyspark_is_only_benchmarked_with_one_worker():
+  duckdb_engine = BenchmarkedValidator(ValidatorEngine.DUCKDB, "db.duckdb")
+  spark_engine = BenchmarkedValidator(ValidatorEngine.PYSPARK, "parquet")
+  assert engine_worker_counts(duckdb_engine, [1, 2, 4]) == [1, 2, 4]
+  assert engine_worker_counts(spark_engine, [1, 2, 4]) == [1]
+  assert engine_worker_counts(spark_engine, [4]) == [1]
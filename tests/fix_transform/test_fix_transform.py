@@ -1,4 +1,25 @@
-from query_generator.extensions.fix_transform import apply_replace_min_max
+import random
+from pathlib import Path
+
+import duckdb
+import polars as pl
+import pytest
+
+from query_generator.duckdb_connection.trace_collection import (
+  DuckDBTraceCollector,
+  ParquetPartWriter,
+)
+from query_generator.extensions.fix_transform import (
+  fix_transform,
+  get_worker_resources,
+  parse_query,
+  transform_query,
+  wrap_query_with_limit,
+)
+from query_generator.utils.params import (
+  FixTransformEndpoint,
+  LatencyMeasurementParams,
+)
 
 UNPARSABLE_QUERY = """
 WITH RECURSIVE recursive_promo_chain AS (
@@ -129,8 +150,285 @@ HAVING COUNT(*) > 0 OR COUNT(*) = 0
 """
 
 
+def _count_diverse_params() -> FixTransformEndpoint:
+  return FixTransformEndpoint(
+    queries_folder="",
+    destination_folder="",
+    duckdb_database="",
+    timeout_seconds=1,
+    make_count_statement_diverse=True,
+  )
+
+
 def test_min_max_unparsable_query():
-  result = apply_replace_min_max(
-    UNPARSABLE_QUERY, None, apply_transformation=True
+  query = "SELECT COUNT(a FROM t WHERE ("
+  result = transform_query(query, {}, random.Random(0), _count_diverse_params())
+  assert result.sql == query
+  assert result.tree is None
+
+
+def test_min_max_keeps_counts_of_unknown_columns():
+  """COUNTs of columns missing from the schema are left as they are.
+
+  Whether sqlglot parses this query depends on its version; either way
+  the query is not changed.
+  """
+  result = transform_query(
+    UNPARSABLE_QUERY, {}, random.Random(0), _count_diverse_params()
+  )
+  if result.tree is None:
+    assert result.sql == UNPARSABLE_QUERY
+  else:
+    assert result.tree == parse_query(UNPARSABLE_QUERY)
+
+
+@pytest.fixture
+def fix_transform_params(tmp_path: Path) -> FixTransformEndpoint:
+  db_path = tmp_path / "fix.duckdb"
+  con = duckdb.connect(str(db_path))
+  con.execute(
+    "CREATE TABLE t AS SELECT range AS a, range % 7 AS b, "
+    "'x' || range AS c FROM range(100)"
+  )
+  con.close()
+  for i in range(12):
+    query_file = tmp_path / "queries" / f"template_{i % 3}" / f"q{i}.sql"
+    query_file.parent.mkdir(parents=True, exist_ok=True)
+    query_file.write_text(
+      f"SELECT b, COUNT(a), COUNT(c) FROM t WHERE a > {i} GROUP BY b"
+      if i % 4
+      else f"SELECT * FROM t WHERE a >= {i * 30}"
+    )
+  return FixTransformEndpoint(
+    queries_folder=str(tmp_path / "queries"),
+    destination_folder=str(tmp_path / "output"),
+    duckdb_database=str(db_path),
+    timeout_seconds=5,
+    max_output_size=20,
+    filter_empty_set=True,
+    make_count_statement_diverse=True,
+    max_memory_gb=1,
+  )
+
+
+@pytest.fixture
+def collected_queries(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+  """Names of the query files traced by DuckDBTraceCollector.collect."""
+  collected: list[str] = []
+  collect = DuckDBTraceCollector.collect
+
+  def counting_collect(self, sql, sql_file):
+    collected.append(sql_file.stem)
+    return collect(self, sql, sql_file)
+
+  monkeypatch.setattr(DuckDBTraceCollector, "collect", counting_collect)
+  return collected
+
+
+def test_parallel_fix_transform_matches_sequential(
+  fix_transform_params: FixTransformEndpoint, tmp_path: Path
+):
+  """Random transformations do not depend on the number of workers."""
+  fix_transform(fix_transform_params)
+  sequential = pl.read_parquet(
+    tmp_path / "output" / "transformation_log.parquet"
+  )
+  fix_transform_params.workers = 4
+  fix_transform_params.destination_folder = str(tmp_path / "parallel")
+  fix_transform(fix_transform_params)
+  parallel = pl.read_parquet(
+    tmp_path / "parallel" / "transformation_log.parquet"
+  )
+  traces = pl.read_parquet(tmp_path / "parallel" / "traces_duckdb.parquet")
+
+  assert sequential.height == 10
+  assert parallel.equals(sequential)
+  assert (
+    traces["relative_path"].to_list() == sequential["relative_path"].to_list()
+  )
+
+
+def test_worker_resources_split_the_budget(
+  fix_transform_params: FixTransformEndpoint,
+):
+  single = get_worker_resources(fix_transform_params)
+  assert single.memory_gb == 1
+  assert single.threads is None
+  fix_transform_params.workers = 4
+  shared = get_worker_resources(fix_transform_params)
+  assert shared.memory_gb == 0.25
+  assert shared.threads is not None
+  assert shared.threads >= 1
+
+
+def test_only_oversized_queries_are_run_twice(
+  fix_transform_params: FixTransformEndpoint,
+  tmp_path: Path,
+  collected_queries: list[str],
+):
+  """Output size and trace come from one execution per query."""
+  fix_transform(fix_transform_params)
+
+  # q0 returns 100 rows and is run again with the LIMIT.
+  assert sorted(collected_queries) == sorted(
+    ["q0", "q0"] + [f"q{i}" for i in range(1, 12)]
+  )
+  limited = (tmp_path / "output" / "template_0" / "q0.sql").read_text()
+  assert "LIMIT 20" in limited
+  traces = pl.read_parquet(tmp_path / "output" / "traces_duckdb.parquet")
+  q0_trace = traces.filter(pl.col("query_name") == "q0")
+  assert q0_trace["duckdb_output"].list.len().item() == 20
+  assert q0_trace["duckdb_trace"].item() != ""
+
+
+def test_wrap_query_with_limit_runs():
+  query = wrap_query_with_limit("SELECT * FROM range(100)", 20)
+  assert duckdb.sql(query).fetchall() == [(i,) for i in range(20)]
+
+
+def test_empty_count_star_skips_execution(
+  fix_transform_params: FixTransformEndpoint,
+  tmp_path: Path,
+  collected_queries: list[str],
+):
+  """Queries with a count_star of 0 are dropped without running them."""
+  pl.DataFrame(
+    {
+      "relative_path": ["template_1/q1.sql", "template_2/q2.sql"],
+      "count_star": [0, 5],
+    }
+  ).write_parquet(tmp_path / "queries" / "output.parquet")
+  fix_transform_params.queries_metadata = str(
+    tmp_path / "queries" / "output.parquet"
   )
-  assert result == UNPARSABLE_QUERY
+  fix_transform(fix_transform_params)
+
+  assert "q1" not in collected_queries
+  assert "q2" in collected_queries
+  assert not (tmp_path / "output" / "template_1" / "q1.sql").exists()
+
+
+def test_transformations_share_one_parse_tree():
+  """Both transformations edit the same tree, rendered once at the end."""
+  schema = {"t": {"a": "INT", "b": "INT", "c": "TEXT"}}
+  params = FixTransformEndpoint(
+    queries_folder="",
+    destination_folder="",
+    duckdb_database="",
+    timeout_seconds=1,
+    make_select_group_by_disjoint=True,
+    make_count_statement_diverse=True,
+  )
+  query = "SELECT t.b, COUNT(a) FROM t GROUP BY t.b"
+  result = transform_query(query, schema, random.Random(3), params)
+  assert result.exception_group_by is None
+  assert result.tree is not None
+  assert result.sql == result.tree.sql(pretty=True)
+  assert "t.c" in result.sql
+  assert "GROUP BY\n  t.b" in result.sql
+  assert parse_query(query).sql() == "SELECT t.b, COUNT(a) FROM t GROUP BY t.b"
+
+
+def test_latency_measurement_is_stored_with_the_traces(
+  fix_transform_params: FixTransformEndpoint, tmp_path: Path
+):
+  fix_transform_params.latency_measurement = LatencyMeasurementParams(
+    warmup_runs=1, timed_runs=2
+  )
+  fix_transform(fix_transform_params)
+  traces = pl.read_parquet(tmp_path / "output" / "traces_duckdb.parquet")
+  assert traces["latency_runs_seconds"].list.len().to_list() == [2] * 10
+  assert traces["latency_median_seconds"].null_count() == 0
+
+
+def test_part_writer_flushes_and_compacts(tmp_path: Path):
+  output = tmp_path / "rows.parquet"
+  schema = pl.Schema({"name": pl.String, "value": pl.Int64})
+  writer = ParquetPartWriter(output, schema, flush_every=2)
+  for i in range(5):
+    writer.append({"name": f"r{i}", "value": i})
+  assert len(list(writer.parts_folder.iterdir())) == 2
+  writer.compact()
+  assert not writer.parts_folder.exists()
+  assert pl.read_parquet(output)["value"].to_list() == list(range(5))
+
+  resumed = ParquetPartWriter(output, schema, flush_every=2, resume=True)
+  assert resumed.written_values("name") == {f"r{i}" for i in range(5)}
+  resumed.append({"name": "r5", "value": 5})
+  resumed.compact()
+  assert pl.read_parquet(output)["value"].to_list() == list(range(6))
+
+  ParquetPartWriter(output, schema).compact()
+  assert pl.read_parquet(output).schema == schema
+  assert pl.read_parquet(output).is_empty()
+
+
+def test_interrupted_run_is_resumed(
+  fix_transform_params: FixTransformEndpoint,
+  tmp_path: Path,
+  monkeypatch: pytest.MonkeyPatch,
+  collected_queries: list[str],
+):
+  """Traces written before a crash are kept and not collected again."""
+  counting_collect = DuckDBTraceCollector.collect
+
+  def crashing_collect(self, sql, sql_file):
+    if sql_file.stem == "q7":
+      raise KeyboardInterrupt
+    return counting_collect(self, sql, sql_file)
+
+  monkeypatch.setattr(DuckDBTraceCollector, "collect", crashing_collect)
+  with pytest.raises(KeyboardInterrupt):
+    fix_transform(fix_transform_params)
+  output = tmp_path / "output"
+  assert not (output / "traces_duckdb.parquet").exists()
+  assert (output / "traces_duckdb.parquet.parts").is_dir()
+  first_run = set(collected_queries)
+
+  collected_queries.clear()
+  monkeypatch.setattr(DuckDBTraceCollector, "collect", counting_collect)
+  fix_transform_params.resume = True
+  fix_transform(fix_transform_params)
+
+  # Sorted by path, q0, q3, q6, q9, q1, q10 and q4 run before q7. The
+  # empty q4 has no trace and is tried again.
+  traced_before = {"q0", "q3", "q6", "q9", "q1", "q10"}
+  assert traced_before <= first_run
+  assert set(collected_queries) == {"q2", "q4", "q5", "q7", "q8", "q11"}
+  traces = pl.read_parquet(output / "traces_duckdb.parquet")
+  log = pl.read_parquet(output / "transformation_log.parquet")
+  assert traces.height == log.height == 10
+  assert traces["relative_path"].n_unique() == 10
+  assert not (output / "traces_duckdb.parquet.parts").exists()
+
+
+def test_worker_threads_follow_the_thread_budget(
+  fix_transform_params: FixTransformEndpoint,
+):
+  fix_transform_params.max_threads = 6
+  assert get_worker_resources(fix_transform_params).threads == 6
+  fix_transform_params.workers = 4
+  assert get_worker_resources(fix_transform_params).threads == 1
+  fix_transform_params.workers = 3
+  assert get_worker_resources(fix_transform_params).threads == 2
+
+
+def test_memory_heavy_queries_are_retried_alone(
+  fix_transform_params: FixTransformEndpoint, tmp_path: Path
+):
+  """A query too big for a worker's share runs with the whole budget."""
+  heavy = tmp_path / "queries" / "template_0" / "heavy.sql"
+  # The list of 10M integers does not fit in 100MB but fits in 400MB.
+  heavy.write_text("SELECT len(list(range)) AS n FROM range(10000000)")
+  fix_transform_params.workers = 4
+  fix_transform_params.max_memory_gb = 0.4
+  fix_transform(fix_transform_params)
+  traces = pl.read_parquet(tmp_path / "output" / "traces_duckdb.parquet")
+  assert "heavy" not in traces["query_name"].to_list()
+
+  fix_transform_params.serialize_memory_heavy_queries = True
+  fix_transform(fix_transform_params)
+  traces = pl.read_parquet(tmp_path / "output" / "traces_duckdb.parquet")
+  assert traces.height == 11
+  heavy_trace = traces.filter(pl.col("query_name") == "heavy")
+  assert heavy_trace["duckdb_output"].item().to_list() == ["(10000000,)"]
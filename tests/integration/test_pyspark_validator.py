@@ -1,13 +1,44 @@
 """Integration tests for PySparkQueryValidator."""
 
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from pyspark.sql import SparkSession
 
 from query_generator.database_connection.pyspark_validation import (
   PySparkQueryValidator,
+  SparkSessionSettings,
+  _cache_table,
 )
+from query_generator.utils.definitions import ValidationLevel
+from query_generator.utils.params import SparkValidationParams
 from tests.integration.conftest import PARQUET_PATH
 
+TPCDS_JOIN_QUERIES = [
+  """SELECT d_year, i_brand, SUM(ss_ext_sales_price)
+  FROM store_sales
+  JOIN date_dim ON ss_sold_date_sk = d_date_sk
+  JOIN item ON ss_item_sk = i_item_sk
+  WHERE i_manager_id = 1 AND d_moy = 11
+  GROUP BY d_year, i_brand""",
+  """SELECT s_store_name, COUNT(*)
+  FROM store_sales
+  JOIN store ON ss_store_sk = s_store_sk
+  JOIN household_demographics ON ss_hdemo_sk = hd_demo_sk
+  JOIN time_dim ON ss_sold_time_sk = t_time_sk
+  WHERE t_hour = 20 AND hd_dep_count = 7
+  GROUP BY s_store_name""",
+  """SELECT ca_state, COUNT(*)
+  FROM catalog_sales
+  JOIN customer ON cs_bill_customer_sk = c_customer_sk
+  JOIN customer_address ON c_current_addr_sk = ca_address_sk
+  JOIN date_dim ON cs_sold_date_sk = d_date_sk
+  WHERE d_qoy = 2
+  GROUP BY ca_state""",
+]
+
 
 @pytest.mark.integration
 def test_get_synthetic_query_cardinality(spark: SparkSession) -> None:
@@ -40,3 +71,138 @@ def test_get_synthetic_query_cardinality_returns_minus_one_on_error(
     "SELECT COUNT(*) FROM nonexistent_table"
   )
   assert result == -1
+
+
+@pytest.mark.integration
+def test_validation_reuses_one_spark_worker() -> None:
+  """Validation calls share one worker process and its SparkSession."""
+  validator = PySparkQueryValidator(
+    parquet_path=str(PARQUET_PATH),
+    timeout_seconds=30.0,
+  )
+  try:
+    assert validator.is_query_valid("SELECT * FROM customer") == (True, None)
+    assert validator.worker.process is not None
+    pid = validator.worker.process.pid
+    valid, _ = validator.is_query_valid("SELECT * FROM nonexistent_table")
+    assert not valid
+    output_size, timed_out = validator.get_query_output_size(
+      "SELECT * FROM customer"
+    )
+    assert output_size == validator.limit_output_size
+    assert not timed_out
+    assert validator.worker.process.pid == pid
+  finally:
+    validator.close()
+
+
+@pytest.mark.integration
+def test_concurrent_cardinality_queries(spark: SparkSession) -> None:
+  """Concurrent COUNT(*) queries share the session and keep their results."""
+  validator = PySparkQueryValidator(
+    parquet_path=str(PARQUET_PATH),
+    timeout_seconds=30.0,
+    session_settings=SparkSessionSettings(concurrent_jobs=4),
+  )
+  validator._spark = spark
+  queries = [
+    "SELECT COUNT(*) FROM customer",
+    "SELECT COUNT(*) FROM nonexistent_table",
+  ] * 4
+  with ThreadPoolExecutor(4) as executor:
+    results = list(
+      executor.map(validator.get_synthetic_query_cardinality, queries)
+    )
+  assert results == [10000, -1] * 4
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+  "level, query, expected_valid",
+  [
+    (ValidationLevel.PARSE, "SELECT * FROM nonexistent_table", True),
+    (ValidationLevel.PARSE, "SELEC 1", False),
+    (ValidationLevel.PARSE, "DROP VIEW customer", False),
+    (ValidationLevel.PLAN, "SELECT c_customer_sk FROM customer;", True),
+    (ValidationLevel.PLAN, "SELECT * FROM nonexistent_table", False),
+    (ValidationLevel.PLAN, "SELECT missing_column FROM customer", False),
+    (ValidationLevel.EXECUTE, "DROP VIEW customer", False),
+    # Counting alone could prune the failing output column.
+    (
+      ValidationLevel.EXECUTE,
+      "SELECT c_customer_sk, raise_error('boom') FROM customer",
+      False,
+    ),
+  ],
+)
+def test_validation_levels(
+  level: ValidationLevel, query: str, expected_valid: bool
+) -> None:
+  """Parse and plan levels catch their errors without running a job."""
+  validator = PySparkQueryValidator(
+    parquet_path=str(PARQUET_PATH),
+    timeout_seconds=30.0,
+  )
+  try:
+    valid, exception = validator.is_query_valid(query, level)
+    assert valid == expected_valid
+    assert (exception is None) == expected_valid
+    assert validator.is_query_valid("SELECT * FROM customer") == (True, None)
+  finally:
+    validator.close()
+
+
+def test_statistics_need_cached_tables() -> None:
+  with pytest.raises(ValueError, match="cache_tables_max_mb"):
+    SparkValidationParams(compute_statistics=True)
+
+
+@pytest.mark.integration
+def test_cached_tables_get_column_statistics(spark: SparkSession) -> None:
+  """Cached views are in memory and carry column statistics for the CBO."""
+  tuning = SparkValidationParams(
+    cache_tables_max_mb=16, compute_statistics=True
+  )
+  _cache_table(spark, "date_dim", tuning)
+  try:
+    assert spark.catalog.isCached("date_dim")
+    plan = spark.table("date_dim")._jdf.queryExecution().optimizedPlan()
+    assert plan.stats().attributeStats().nonEmpty()
+  finally:
+    spark.catalog.uncacheTable("date_dim")
+
+
+@pytest.mark.integration
+def test_table_caching_and_statistics_benchmark() -> None:
+  """Cached dimension tables with statistics return the same output sizes.
+
+  Logs the validation throughput with and without the tuning.
+  """
+  output_sizes = []
+  for tuning in [
+    SparkValidationParams(),
+    SparkValidationParams(
+      cache_tables_max_mb=16,
+      compute_statistics=True,
+      broadcast_threshold_mb=64,
+    ),
+  ]:
+    validator = PySparkQueryValidator(
+      parquet_path=str(PARQUET_PATH),
+      timeout_seconds=60.0,
+      session_settings=SparkSessionSettings(tuning=tuning),
+    )
+    try:
+      # The first call starts the worker, so it is not timed.
+      validator.is_query_valid("SELECT 1")
+      start = time.perf_counter()
+      output_sizes.append(
+        [validator.get_query_output_size(q) for q in TPCDS_JOIN_QUERIES * 3]
+      )
+      elapsed = time.perf_counter() - start
+    finally:
+      validator.close()
+    logging.getLogger(__name__).info(
+      "%s: %.2f queries/s", tuning, len(TPCDS_JOIN_QUERIES) * 3 / elapsed
+    )
+  assert output_sizes[0] == output_sizes[1]
@@ -1,24 +1,37 @@
 """Tests for llm_extension using mocked OllamaLLMClient."""
 
+import asyncio
 import random
+import threading
+import time
 from pathlib import Path
 from typing import Any
 from unittest.mock import MagicMock, patch
 
 import duckdb
+import polars as pl
+import pytest
 
+from query_generator.database_connection.async_validator import (
+  AsyncQueryValidator,
+)
 from query_generator.extensions.llm_clients import (
   LLM_Message,
   LLMClientFactory,
   OllamaLLMClient,
 )
+from query_generator.extensions import llm_extension as llm_extension_module
 from query_generator.extensions.llm_extension import (
   QueryResult,
+  SampledQuery,
   format_function_examples,
   get_random_prompt,
   get_random_queries,
   llm_extension,
+  process_queries,
+  validate_query,
 )
+from query_generator.utils.definitions import ValidationLevel
 from query_generator.utils.params import LLMEngineParams, LLMParams
 
 VALID_SQL = "SELECT 1"
@@ -460,3 +473,133 @@ def test_pyspark_validator_with_mocked_llm(
   )
 
   assert result == 1
+
+
+def test_validate_query_plan_level_executes_only_valid_plans() -> None:
+  """Plan-only failures skip execution; passing plans are executed once."""
+  validator = MagicMock()
+  plan_error = Exception("Binder Error")
+  validator.is_query_valid.return_value = (False, plan_error)
+  assert validate_query(validator, "SELECT x", ValidationLevel.PLAN) == (
+    False,
+    plan_error,
+  )
+  validator.is_query_valid.assert_called_once_with(
+    "SELECT x", ValidationLevel.PLAN
+  )
+
+  validator.reset_mock()
+  validator.is_query_valid.return_value = (True, None)
+  assert validate_query(validator, "SELECT 1", ValidationLevel.PLAN) == (
+    True,
+    None,
+  )
+  assert [c.args for c in validator.is_query_valid.call_args_list] == [
+    ("SELECT 1", ValidationLevel.PLAN),
+    ("SELECT 1", ValidationLevel.EXECUTE),
+  ]
+
+
+@patch("query_generator.extensions.llm_clients.Client")
+def test_concurrent_queries_produce_all_results(
+  mock_client_cls: MagicMock, tmp_path: Path
+) -> None:
+  """Several queries in flight give the same results as one at a time."""
+  queries_dir = tmp_path / "queries"
+  queries_dir.mkdir()
+  _setup_queries_dir(queries_dir, count=4)
+  dest = tmp_path / "output"
+  dest.mkdir()
+  db_path = str(tmp_path / "test.duckdb")
+  duckdb.connect(db_path).close()
+  mock_client_cls.return_value.chat.return_value = _make_mock_chat_response(
+    VALID_RESPONSE
+  )
+  params = _make_llm_params(db_path, total_queries=6, retry=1)
+  params.concurrent_queries = 3
+
+  result = llm_extension(
+    llm_params=params,
+    llm_client_factory=LLMClientFactory(
+      factory=OllamaLLMClient, init_kwargs={}
+    ),
+    llm_config_params="test-model",
+    input_queries_base_path=queries_dir,
+    destination_path=dest,
+  )
+
+  assert result == 6
+  assert len(list(dest.rglob("*.sql"))) == 6
+
+
+def test_results_keep_the_order_of_the_sampled_queries(
+  tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+  """Later queries finish first, rows still follow the input order."""
+
+  async def process_single_query(
+    processor: Any, cnt: int, sampled: SampledQuery
+  ) -> QueryResult:
+    await asyncio.sleep(0.01 * (4 - cnt))
+    return QueryResult(
+      valid=cnt % 2 == 0,
+      query=f"SELECT {cnt}",
+      extension_type="group_by",
+      original_path=sampled.path,
+      cnt=cnt,
+      retries=1,
+      duckdb_exception=None,
+      messages=[],
+      client_logs={"calls": 1},
+      function_names=[],
+    )
+
+  monkeypatch.setattr(
+    llm_extension_module, "process_single_query", process_single_query
+  )
+  processor = MagicMock()
+  processor.llm_params.concurrent_queries = 4
+  sampled = [
+    SampledQuery(
+      query="SELECT 1",
+      path=f"q{i}.sql",
+      extension_type="group_by",
+      function_samples=[],
+    )
+    for i in range(4)
+  ]
+  assert asyncio.run(process_queries(processor, sampled, tmp_path)) == 2
+  logs = pl.read_parquet(tmp_path / "logs.parquet")
+  assert logs["original_path"].to_list() == [f"q{i}.sql" for i in range(4)]
+  rows = pl.read_parquet(tmp_path / "llm_extension.parquet")
+  assert rows.height == 2
+
+
+def test_async_validator_runs_validations_concurrently() -> None:
+  """Validations overlap up to the concurrency limit."""
+  running = 0
+  peak = 0
+  lock = threading.Lock()
+
+  def is_query_valid(query: str, level: ValidationLevel):
+    nonlocal running, peak
+    with lock:
+      running += 1
+      peak = max(peak, running)
+    time.sleep(0.05)
+    with lock:
+      running -= 1
+    return True, None
+
+  validator = MagicMock()
+  validator.is_query_valid.side_effect = is_query_valid
+  async_validator = AsyncQueryValidator(validator, max_concurrency=2)
+
+  async def validate_all() -> list[tuple[bool, Exception | None]]:
+    return await asyncio.gather(
+      *(async_validator.is_query_valid(f"SELECT {i}") for i in range(6))
+    )
+
+  assert asyncio.run(validate_all()) == [(True, None)] * 6
+  async_validator.close()
+  assert peak == 2
@@ -1,15 +1,22 @@
 from unittest import mock
 
+from pypika.terms import Criterion
+
 from query_generator.database_schemas.schemas import get_schema
 from query_generator.synthetic_queries.query_builder import (
   QueryBuilderPypika,
+  render_parameterized_query,
 )
 from query_generator.synthetic_queries.predicate_generator import (
   HistogramDataType,
+  PredicateEquality,
+  PredicateIn,
+  PredicateLike,
   PredicateRange,
 )
 from query_generator.utils.definitions import (
   Dataset,
+  ParameterizedQuery,
   PredicateParameters,
 )
 from query_generator.utils.exceptions import UnkownDatasetError
@@ -41,3 +48,55 @@ def test_add_range_supports_all_histogram_types():
         dtype=dtype,
       ),
     )
+
+
+def test_parameterized_criteria_render_like_literal_criteria():
+  tables_schema, _ = get_schema(Dataset.TPCH)
+  builders = [
+    QueryBuilderPypika(
+      None,
+      tables_schema,
+      PredicateParameters(
+        histogram_path=get_precomputed_histograms(Dataset.TPCH),
+        extra_predicates=None,
+        row_retention_probability=0.2,
+        operator_weights=None,
+        equality_lower_bound_probability=None,
+        extra_values_for_in=None,
+        minimum_like_support_probability=None,
+      ),
+      parameterized=parameterized,
+    )
+    for parameterized in (False, True)
+  ]
+  predicates = [
+    PredicateRange("lineitem", "l_quantity", HistogramDataType.FLOAT, 1.5, 9),
+    PredicateRange(
+      "orders", "o_orderdate", HistogramDataType.DATE, "1995-01-01", "1996"
+    ),
+    PredicateEquality("orders", "o_comment", HistogramDataType.STRING, "it's"),
+    PredicateIn("orders", "o_custkey", HistogramDataType.INT, [1, 2, 3]),
+    PredicateLike("orders", "o_comment", HistogramDataType.STRING, "%a$1%"),
+  ]
+  literal, parameterized = builders
+
+  def build(builder: QueryBuilderPypika) -> Criterion:
+    range_number, range_date, equality, in_values, like = predicates
+    return Criterion.all(
+      [
+        builder._build_criterion_range(range_number),
+        builder._build_criterion_range(range_date),
+        builder._build_criterion_equality(equality),
+        builder._build_criterion_in(in_values),
+        builder._build_criterion_like(like),
+      ]
+    )
+
+  template = build(parameterized).get_sql()
+  assert "$8" in template
+  assert (
+    render_parameterized_query(
+      ParameterizedQuery(template, parameterized.literals)
+    )
+    == build(literal).get_sql()
+  )
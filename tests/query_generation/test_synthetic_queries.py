@@ -1,4 +1,6 @@
 import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, islice
 from unittest import mock
 from unittest.mock import MagicMock
 
@@ -8,10 +10,20 @@ from cattrs import structure
 
 from query_generator.filter.filter import make_bins
 from query_generator.synthetic_queries.synthetic_query_generator import (
+  CARDINALITY_CHUNK_SIZE,
   SyntheticQueriesParams,
+  evaluate_cardinalities,
   generate_synthetic_queries,
 )
-from query_generator.utils.definitions import Dataset
+from query_generator.synthetic_queries.utils.query_metadata import (
+  SyntheticBatchSettings,
+  SyntheticQueriesMetadata,
+)
+from query_generator.utils.definitions import (
+  Dataset,
+  GeneratedPredicateTypes,
+  GeneratedQueryFeatures,
+)
 from query_generator.utils.params import SyntheticQueriesEndpoint
 from tests.utils import get_precomputed_histograms
 
@@ -108,3 +120,84 @@ def test_binning_calls(extra_predicates, expected_call_count, unique_joins):
       f"Expected {expected_call_count} calls to write_query, "
       f"but got {mock_writer.call_count}"
     )
+
+
+def test_query_metadata_matches_row_dicts():
+  """Columnar metadata produces the same frame as one dict per query."""
+  metadata = SyntheticQueriesMetadata()
+  rows = []
+  batch = SyntheticBatchSettings(
+    batch_number=1,
+    max_hops=2,
+    extra_predicates=3,
+    row_retention_probability=0.2,
+    equality_lower_bound_probability=0.0,
+    keep_edge_probability=0.5,
+  )
+  # More queries than the initial capacity to exercise array growth.
+  for idx in range(3000):
+    query = GeneratedQueryFeatures(
+      query="SELECT 1",
+      template_number=idx % 7,
+      predicate_number=idx,
+      fact_table=f"fact_{idx % 3}",
+      total_subgraph_edges=idx % 4,
+      generated_predicate_types=GeneratedPredicateTypes(
+        equality=1, range=2, in_values=idx % 2
+      ),
+      subgraph_signature=(1 << 70) + idx % 5,
+    )
+    metadata.append(f"batch_1/{idx}.sql", idx * 10, batch, query)
+    rows.append(
+      {
+        "relative_path": f"batch_1/{idx}.sql",
+        "count_star": idx * 10,
+        "batch_number": 1,
+        "template_number": idx % 7,
+        "predicate_number": idx,
+        "extra_predicates": 3,
+        "fact_table": f"fact_{idx % 3}",
+        "max_hops": 2,
+        "row_retention_probability": 0.2,
+        "equality_lower_bound_probability": 0.0,
+        "total_subgraph_edges": idx % 4,
+        "predicates_range": 2,
+        "predicates_in_values": idx % 2,
+        "predicates_equality": 1,
+        "keep_edge_probability": 0.5,
+        "subgraph_signature": str((1 << 70) + idx % 5),
+      }
+    )
+
+  assert len(metadata) == len(rows)
+  assert len(metadata.fact_table.values) == 3
+  assert len(metadata.subgraph_signature.values) == 5
+  # Signatures are only turned into strings once per unique value.
+  assert all(isinstance(v, int) for v in metadata.subgraph_signature.values)
+  assert len(metadata.relative_path.values) == len(rows)
+  assert metadata.to_dataframe().equals(pl.DataFrame(rows))
+
+
+def test_concurrent_cardinalities_keep_generation_order():
+  mock_validator = MagicMock()
+  mock_validator.get_synthetic_query_cardinality.side_effect = len
+  queries = [MagicMock(query="x" * n, parameterized=None) for n in range(20)]
+  with ThreadPoolExecutor(4) as executor:
+    results = list(evaluate_cardinalities(mock_validator, queries, executor))
+  assert results == [(q, n) for n, q in enumerate(queries)]
+
+
+def test_concurrent_cardinalities_stream_the_queries():
+  """Queries are evaluated in chunks, not collected upfront."""
+  mock_validator = MagicMock()
+  mock_validator.get_synthetic_query_cardinality.return_value = 1
+  queries = (MagicMock(query="x", parameterized=None) for _ in count())
+  with ThreadPoolExecutor(4) as executor:
+    results = list(
+      islice(evaluate_cardinalities(mock_validator, queries, executor), 10)
+    )
+  assert len(results) == 10
+  assert (
+    mock_validator.get_synthetic_query_cardinality.call_count
+    <= CARDINALITY_CHUNK_SIZE
+  )